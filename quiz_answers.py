@@ -0,0 +1,114 @@
+import re
+from quiz_database import QuestionType
+from quiz_similarity import normalize_text
+
+# Vérification des réponses.
+#
+# Les formes acceptées de la bonne réponse sont calculées une seule fois, quand
+# la question est chargée (AnswerKey) : texte normalisé sans accents, casse ni
+# ponctuation, sans article en tête, plus les variantes séparées par « / » ou
+# écrites sans la partie entre parenthèses. À la soumission, seule la réponse
+# du joueur est normalisée, une fois. Les questions ouvertes tolèrent quelques
+# fautes de frappe (distance d'édition bornée, calculée sur une bande
+# diagonale et abandonnée dès que la borne est dépassée) ; les réponses
+# courtes ou contenant des chiffres doivent être exactes, et la première
+# lettre n'est jamais corrigée (Iran / Iraq, Lyon / Leon sont des réponses
+# différentes, pas des fautes).
+
+ARTICLES = frozenset(('le', 'la', 'les', 'l', 'un', 'une', 'des', 'du', 'de', 'd',
+                      'the', 'a', 'an'))
+ALTERNATIVES = re.compile(r'[/;]')
+PARENTHESES = re.compile(r'\([^)]*\)')
+# Fautes tolérées selon la longueur de la forme attendue : (longueur minimale, fautes)
+TYPO_TOLERANCE = ((10, 2), (6, 1))
+
+
+def canonical_answer(text):
+    """Forme comparée d'une réponse : normalisée et sans article en tête"""
+    words = normalize_text(text).split()
+    if len(words) > 1 and words[0] in ARTICLES:
+        words = words[1:]
+    return ' '.join(words)
+
+
+def typo_tolerance(form):
+    """Nombre de fautes tolérées pour une forme attendue"""
+    if any(char.isdigit() for char in form):
+        return 0
+    for length, tolerance in TYPO_TOLERANCE:
+        if len(form) >= length:
+            return tolerance
+    return 0
+
+
+def within_distance(first, second, limit):
+    """Vrai si la distance d'édition (Levenshtein) entre les deux textes est au plus `limit`
+
+    Seules les cases à moins de `limit` de la diagonale sont calculées, et le
+    calcul s'arrête dès qu'une ligne entière dépasse la borne.
+    """
+    if abs(len(first) - len(second)) > limit:
+        return False
+    if first == second:
+        return True
+    if len(first) > len(second):
+        first, second = second, first
+    beyond = limit + 1
+    width = len(second)
+    previous = [j if j <= limit else beyond for j in range(width + 1)]
+    for i in range(1, len(first) + 1):
+        current = [beyond] * (width + 1)
+        current[0] = i if i <= limit else beyond
+        row_min = current[0]
+        char = first[i - 1]
+        for j in range(max(1, i - limit), min(width, i + limit) + 1):
+            value = min(previous[j - 1] + (char != second[j - 1]),
+                        previous[j] + 1,
+                        current[j - 1] + 1)
+            current[j] = value
+            if value < row_min:
+                row_min = value
+        if row_min > limit:
+            return False
+        previous = current
+    return previous[width] <= limit
+
+
+class AnswerKey:
+    """Bonne réponse d'une question, prête à être comparée aux réponses des joueurs"""
+
+    __slots__ = ('correct_answer', 'lowered', 'forms')
+
+    def __init__(self, correct_answer, fuzzy=False):
+        self.correct_answer = correct_answer
+        self.lowered = correct_answer.lower()
+        self.forms = None
+        if fuzzy:
+            variants = [correct_answer, PARENTHESES.sub(' ', correct_answer)]
+            variants += ALTERNATIVES.split(correct_answer)
+            forms = {}
+            for variant in variants:
+                form = canonical_answer(variant)
+                if form:
+                    forms[form] = typo_tolerance(form)
+            self.forms = tuple(forms.items())
+
+    @classmethod
+    def for_question(cls, row):
+        """Clé de la question `row` (tolérance aux fautes pour les questions ouvertes)"""
+        return cls(row[5], row[2] == QuestionType.OPEN.value)
+
+    def matches(self, answer):
+        if answer == self.correct_answer:
+            return True
+        # Questions à choix : le texte d'une des propositions, à la casse près
+        if self.forms is None:
+            return answer.lower() == self.lowered
+        answer = canonical_answer(answer)
+        if not answer:
+            return False
+        for form, tolerance in self.forms:
+            if answer == form or (tolerance and answer[0] == form[0]
+                                  and within_distance(answer, form, tolerance)):
+                return True
+        return False
@@ -0,0 +1,177 @@
+import heapq
+import math
+import random
+import threading
+import time
+from collections import OrderedDict
+from quiz_sampler import UsageSampler
+
+
+class ThemeEntry:
+    """Questions d'un thème gardées en mémoire, avec un échantillonneur par type
+
+    Chaque ligne chargée se termine par le groupe de doublons de la question,
+    gardé à part : une partie ne reçoit qu'une question par groupe.
+
+    Un thème de plus de `limit` questions n'est gardé qu'en partie
+    (`partial`) : les questions les moins utilisées de chaque type, en
+    proportion du nombre de questions du type.
+    """
+
+    def __init__(self, rows, pending, limit=None):
+        by_type = {}
+        for row in rows:
+            question_id, question_type, used_count = row[0], row[2], row[9] or 0
+            # Tient compte des utilisations pas encore écrites sur le disque
+            if question_id in pending:
+                used_count += pending[question_id][0]
+            by_type.setdefault(question_type, []).append((used_count, random.random(), row))
+
+        self.partial = limit is not None and len(rows) > limit
+        self.loaded_at = time.monotonic()
+        self.rows = {}
+        self.clusters = {}   # question_id -> groupe de doublons
+        self.samplers = {}
+        for question_type, items in by_type.items():
+            if self.partial:
+                items = heapq.nsmallest(math.ceil(limit * len(items) / len(rows)), items)
+            for _, _, row in items:
+                self.rows[row[0]] = row[:-1]
+                self.clusters[row[0]] = row[-1]
+            self.samplers[question_type] = UsageSampler([(row[0], used_count) for used_count, _, row in items])
+
+
+class QuestionCache:
+    """Cache des questions par thème et type, avec compteurs d'utilisation différés
+
+    Les thèmes sont chargés à la demande puis servis depuis la mémoire ; les
+    thèmes les moins récemment joués sont évincés dès que le nombre total de
+    questions en cache dépasse `max_rows`. Un thème n'occupe jamais plus de
+    `max_rows / 2` questions : au-delà, seules les moins utilisées sont
+    gardées, et cette sélection est refaite toutes les `partial_refresh`
+    secondes. Un thème sans question n'est pas gardé. Un tirage ne compte
+    l'utilisation qu'en mémoire, dans l'échantillonneur ; les questions
+    réellement jouées sont signalées par `record_usage`. Les incréments de
+    `used_count` et `last_used` sont cumulés en mémoire et écrits en bloc par
+    un thread toutes les `flush_interval` secondes.
+    """
+
+    def __init__(self, load_theme, flush_usage, max_rows=50000, flush_interval=5.0,
+                 partial_refresh=600.0):
+        self.load_theme = load_theme      # theme_id -> lignes de questions, suivies du groupe
+        self.flush_usage = flush_usage    # [(incrément, last_used, question_id)] -> None
+        self.max_rows = max_rows
+        self.max_theme_rows = max(1, max_rows // 2)
+        self.partial_refresh = partial_refresh
+        self.flush_interval = flush_interval
+        self.themes = OrderedDict()       # theme_id -> ThemeEntry, du plus ancien au plus récent
+        self.cached_rows = 0
+        self.pending = {}                 # question_id -> [incrément, last_used]
+        self.lock = threading.RLock()
+        self.stop_event = threading.Event()
+        self.flush_thread = None
+
+    def start(self):
+        """Démarre le thread d'écriture périodique des compteurs"""
+        if self.flush_thread is None:
+            self.flush_thread = threading.Thread(target=self.flush_loop, daemon=True)
+            self.flush_thread.start()
+
+    def flush_loop(self):
+        while not self.stop_event.wait(self.flush_interval):
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"Erreur lors de l'écriture des compteurs d'utilisation: {e}")
+
+    def get_theme(self, theme_id):
+        """Retourne l'entrée d'un thème, en la chargeant si nécessaire"""
+        with self.lock:
+            entry = self.themes.get(theme_id)
+            if entry is not None:
+                # Sélection d'un grand thème refaite de temps en temps, pour
+                # que les questions laissées de côté finissent par être tirées
+                if not entry.partial or time.monotonic() - entry.loaded_at < self.partial_refresh:
+                    self.themes.move_to_end(theme_id)
+                    return entry
+                self.invalidate(theme_id)
+
+            entry = ThemeEntry(self.load_theme(theme_id), self.pending, self.max_theme_rows)
+            if not entry.rows:
+                return entry
+            self.themes[theme_id] = entry
+            self.cached_rows += len(entry.rows)
+            self.evict()
+            return entry
+
+    def evict(self):
+        """Évince les thèmes froids tant que le cache dépasse sa taille maximale"""
+        while self.cached_rows > self.max_rows and len(self.themes) > 1:
+            _, entry = self.themes.popitem(last=False)
+            self.cached_rows -= len(entry.rows)
+
+    def sample(self, theme_id, counts):
+        """Tire les questions d'une partie : {QuestionType: nombre} -> {QuestionType: [lignes]}"""
+        selected = {}
+        with self.lock:
+            entry = self.get_theme(theme_id)
+            used_clusters = set()
+
+            def accept(question_id):
+                # Une seule question par groupe de doublons, sans comparer les textes
+                cluster_id = entry.clusters[question_id]
+                if cluster_id in used_clusters:
+                    return False
+                used_clusters.add(cluster_id)
+                return True
+
+            for q_type, count in counts.items():
+                sampler = entry.samplers.get(q_type.value)
+                ids = sampler.sample(count, accept) if sampler else []
+                selected[q_type] = [entry.rows[question_id] for question_id in ids]
+        return selected
+
+    def record_usage(self, question_ids):
+        """Compte une utilisation des questions d'une partie qui commence"""
+        current_time = time.strftime('%Y-%m-%d %H:%M:%S')
+        with self.lock:
+            for question_id in question_ids:
+                usage = self.pending.setdefault(question_id, [0, None])
+                usage[0] += 1
+                usage[1] = current_time
+
+    def invalidate(self, theme_id=None):
+        """Oublie un thème (ou tout le cache) ; il sera rechargé au prochain tirage"""
+        with self.lock:
+            if theme_id is None:
+                self.themes.clear()
+                self.cached_rows = 0
+            else:
+                entry = self.themes.pop(theme_id, None)
+                if entry is not None:
+                    self.cached_rows -= len(entry.rows)
+
+    def flush(self):
+        """Écrit en bloc les compteurs d'utilisation cumulés"""
+        with self.lock:
+            pending, self.pending = self.pending, {}
+        if not pending:
+            return
+        updates = [(usage[0], usage[1], question_id) for question_id, usage in pending.items()]
+        try:
+            self.flush_usage(updates)
+        except Exception:
+            # Remet les compteurs en attente pour la prochaine tentative
+            with self.lock:
+                for question_id, (increment, last_used) in pending.items():
+                    usage = self.pending.setdefault(question_id, [0, last_used])
+                    usage[0] += increment
+            raise
+
+    def close(self):
+        """Arrête le thread et écrit les derniers compteurs"""
+        self.stop_event.set()
+        if self.flush_thread is not None:
+            self.flush_thread.join()
+            self.flush_thread = None
+        self.flush()
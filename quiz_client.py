@@ -5,9 +5,15 @@ import json
 import random
 import time
 
+# Reconnexion automatique quand le serveur redémarre (les parties en cours sont reprises)
+RECONNECT_ATTEMPTS = 15
+RECONNECT_DELAY = 1.0  # secondes entre deux tentatives
+
 class QuizClient:
     def __init__(self, host='localhost', port=12345):
         """Initialisation de la connexion au serveur"""
+        self.host = host
+        self.port = port
         self.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
         try:
             print(f"Tentative de connexion au serveur {host}:{port}")
@@ -25,7 +31,12 @@ class QuizClient:
         
         self.socket.settimeout(10.0)  # Timeout de 10 secondes
         self.user_id = None
+        self.username = None
+        self.token = None  # Jeton de session reçu à la connexion
         self.current_game_id = None
+        self.question_index = None  # Position de la question affichée, renvoyée avec la réponse
+        self.buffer = b''   # Données reçues pas encore découpées en messages (un par ligne)
+        self.events = []    # Messages poussés par le serveur (questions passées d'office)
 
     def send_command(self, command_type, data=None):
         """Envoie une commande au serveur"""
@@ -36,13 +47,23 @@ class QuizClient:
             'type': command_type,
             'data': data
         }
+        if self.token:
+            command['token'] = self.token
         
         try:
             print(f"Envoi de la commande: {command_type}")
-            self.socket.send(json.dumps(command).encode('utf-8'))
-            response = self.socket.recv(4096).decode('utf-8')
+            try:
+                response = self.exchange(command)
+            except ConnectionError:
+                # Serveur redémarré : on se reconnecte et on renvoie la commande
+                if not self.reconnect():
+                    raise
+                response = self.exchange(command)
             print(f"Réponse reçue: {response}")
-            return json.loads(response)
+            response = json.loads(response)
+            if 'question_index' in response:
+                self.question_index = response['question_index']
+            return response
         except socket.timeout:
             print("Timeout de la connexion")
             return {'status': 'error', 'message': 'Le serveur ne répond pas'}
@@ -50,12 +71,71 @@ class QuizClient:
             print(f"Erreur lors de l'envoi/réception: {e}")
             return {'status': 'error', 'message': str(e)}
 
+    def exchange(self, command):
+        """Envoie une commande et retourne la réponse brute (un message JSON par ligne)"""
+        self.socket.sendall((json.dumps(command) + '\n').encode('utf-8'))
+        while True:
+            line, separator, rest = self.buffer.partition(b'\n')
+            if separator:
+                self.buffer = rest
+                # Message poussé arrivé avant la réponse : gardé pour pending_events
+                message = json.loads(line)
+                if 'event' in message:
+                    self.events.append(message)
+                    continue
+                return line.decode('utf-8')
+            data = self.socket.recv(4096)
+            if not data:
+                raise ConnectionError("Connexion fermée par le serveur")
+            self.buffer += data
+
+    def pending_events(self):
+        """Retourne les messages poussés par le serveur depuis le dernier appel, sans attendre"""
+        try:
+            self.socket.setblocking(False)
+            while True:
+                data = self.socket.recv(4096)
+                if not data:
+                    break
+                self.buffer += data
+        except OSError:
+            pass  # Rien de plus à lire pour le moment
+        finally:
+            self.socket.settimeout(10.0)
+        while b'\n' in self.buffer:
+            line, _, self.buffer = self.buffer.partition(b'\n')
+            message = json.loads(line)
+            if 'event' in message:
+                self.events.append(message)
+        events, self.events = self.events, []
+        for event in events:
+            if 'question_index' in event:
+                self.question_index = event['question_index']
+        return events
+
+    def reconnect(self):
+        """Rouvre la connexion au serveur ; le jeton de session reste valable après un redémarrage"""
+        self.socket.close()
+        self.buffer = b''
+        for _ in range(RECONNECT_ATTEMPTS):
+            try:
+                self.socket = socket.create_connection((self.host, self.port), timeout=10.0)
+                print("Reconnexion au serveur réussie")
+                return True
+            except OSError:
+                time.sleep(RECONNECT_DELAY)
+        return False
+
     def login(self, username, password):
         """Connexion au serveur"""
-        return self.send_command('login', {
+        response = self.send_command('login', {
             'username': username,
             'password': password
         })
+        if response.get('status') == 'success':
+            self.token = response.get('token')
+            self.username = username
+        return response
 
     def register(self, username, password):
         """Inscription sur le serveur"""
@@ -83,7 +163,8 @@ class QuizClient:
         request_data = {
             'game_id': self.current_game_id,
             'answer': answer_data.get('answer') if isinstance(answer_data, dict) else answer_data,
-            'time_taken': answer_data.get('time_taken', 30) if isinstance(answer_data, dict) else 30
+            'time_taken': answer_data.get('time_taken', 30) if isinstance(answer_data, dict) else 30,
+            'question_index': self.question_index
         }
         
         # Ajoute le theme_id si disponible (important pour le mode duel)
@@ -110,6 +191,35 @@ class QuizClient:
         return self.send_command('get_leaderboard', {
             'theme_id': theme_id
         })
+    def get_scores_page(self, theme_id=None, cursor=None, limit=20, since=None, until=None):
+        """Récupère une page de tous les scores (cursor : 'next_cursor' de la page précédente)"""
+        return self.send_command('get_scores_page', {
+            'theme_id': theme_id,
+            'cursor': cursor,
+            'limit': limit,
+            'since': since,
+            'until': until
+        })
+    def get_user_stats(self):
+        """Récupère les statistiques du joueur connecté"""
+        return self.send_command('get_user_stats', {
+            'user_id': self.user_id
+        })
+    def get_user_rank(self, theme_id=None, count=5):
+        """Récupère le rang du joueur connecté et les joueurs classés autour de lui"""
+        return self.send_command('get_user_rank', {
+            'user_id': self.user_id,
+            'theme_id': theme_id,
+            'count': count
+        })
+    def search_questions(self, query, theme_id=None, limit=20, offset=0):
+        """Recherche des questions dans la banque (texte et réponses)"""
+        return self.send_command('search_questions', {
+            'query': query,
+            'theme_id': theme_id,
+            'limit': limit,
+            'offset': offset
+        })
     def create_duel_room(self, theme_id):
         """Crée un salon de duel"""
         return self.send_command('create_duel_room', {
@@ -181,6 +291,12 @@ class QuizGUI:
             command=self.show_leaderboard,
             font=('Arial', 12)
         ).pack(side=tk.RIGHT, padx=20)
+        tk.Button(
+            header_frame,
+            text="Mon profil",
+            command=self.show_profile,
+            font=('Arial', 12)
+        ).pack(side=tk.RIGHT, padx=20)
         tk.Button(
             header_frame,
             text="Mode Duel",
@@ -439,6 +555,13 @@ class QuizGUI:
 
     def update_timer(self):
         """Met à jour le chronomètre"""
+        # Question passée d'office par le serveur (réponse jamais arrivée)
+        for event in self.client.pending_events():
+            if (event.get('event') == 'question_timeout' and hasattr(self, 'time_left')
+                    and event.get('game_id') == self.client.current_game_id):
+                del self.time_left
+                self.show_answer_result(event, None, event['time_taken'])
+                return
         if hasattr(self, 'time_left') and self.time_left > 0:
             self.time_left -= 1
             self.timer_label.config(text=f"Temps: {self.time_left}s")
@@ -466,9 +589,25 @@ class QuizGUI:
                 'answer': answer,
                 'time_taken': time_taken
             })
-            
+            self.show_answer_result(response, answer, time_taken)
+        except Exception as e:
+            print(f"Erreur lors du traitement de la réponse: {e}")
+            messagebox.showerror(
+                "Erreur",
+                "Une erreur est survenue. Retour à la sélection des thèmes."
+            )
+            self.show_theme_selection()
+
+    def show_answer_result(self, response, answer, time_taken):
+        """Affiche le résultat d'une réponse puis la question suivante ou le résumé"""
+        try:
             if response['status'] == 'success':
-                if answer is None:
+                if response.get('timed_out'):
+                    messagebox.showinfo(
+                        "Temps écoulé",
+                        f"La bonne réponse était: {response['correct_answer']}"
+                    )
+                elif answer is None:
                     messagebox.showinfo("Info", "Question passée")
                 elif response['is_correct']:
                     self.score += response['points']
@@ -721,6 +860,185 @@ class QuizGUI:
                 fg='red'
             ).grid(row=1, column=0, columnspan=len(columns), pady=20)
         
+        # Tous les scores, page par page
+        tk.Button(
+            self.main_frame,
+            text="Tous les scores",
+            command=lambda: self.show_all_scores(theme_id),
+            font=('Arial', 14),
+            width=20
+        ).pack(pady=5)
+
+        # Bouton retour
+        tk.Button(
+            self.main_frame,
+            text="Retour",
+            command=self.show_theme_selection,
+            font=('Arial', 14),
+            width=20
+        ).pack(pady=20)
+
+    def show_all_scores(self, theme_id=None, cursor=None, first_position=1):
+        """Affiche tous les scores page par page"""
+        self.clear_frame()
+
+        tk.Label(
+            self.main_frame,
+            text="Tous les scores",
+            font=('Arial', 24, 'bold')
+        ).pack(pady=20)
+
+        scores_frame = tk.Frame(self.main_frame)
+        scores_frame.pack(pady=10, padx=20)
+
+        columns = ["Position", "Joueur", "Thème", "Score", "Temps", "Date"]
+        for col, header in enumerate(columns):
+            tk.Label(
+                scores_frame,
+                text=header,
+                font=('Arial', 12, 'bold')
+            ).grid(row=0, column=col, padx=10, sticky='w')
+
+        response = self.client.get_scores_page(theme_id, cursor)
+        next_cursor = None
+        if response['status'] != 'success':
+            tk.Label(
+                scores_frame,
+                text="Impossible de récupérer les scores",
+                font=('Arial', 12),
+                fg='red'
+            ).grid(row=1, column=0, columnspan=len(columns), pady=20)
+        elif not response.get('scores'):
+            tk.Label(
+                scores_frame,
+                text="Aucun score enregistré",
+                font=('Arial', 12),
+                fg='gray'
+            ).grid(row=1, column=0, columnspan=len(columns), pady=20)
+        else:
+            scores = response['scores']
+            next_cursor = response.get('next_cursor')
+            for i, (username, theme_name, score, total_time, played_at) in enumerate(scores, 1):
+                values = [
+                    str(first_position + i - 1),
+                    username,
+                    theme_name,
+                    str(score),
+                    f"{total_time:.1f}s",
+                    (played_at or '')[:10]
+                ]
+                for col, value in enumerate(values):
+                    tk.Label(
+                        scores_frame,
+                        text=value,
+                        font=('Arial', 12)
+                    ).grid(row=i, column=col, padx=10, pady=3, sticky='w')
+
+        button_frame = tk.Frame(self.main_frame)
+        button_frame.pack(pady=10)
+        if cursor is not None:
+            tk.Button(
+                button_frame,
+                text="Première page",
+                command=lambda: self.show_all_scores(theme_id),
+                font=('Arial', 12)
+            ).pack(side=tk.LEFT, padx=5)
+        if next_cursor is not None:
+            tk.Button(
+                button_frame,
+                text="Page suivante",
+                command=lambda: self.show_all_scores(theme_id, next_cursor,
+                                                     first_position + len(response['scores'])),
+                font=('Arial', 12)
+            ).pack(side=tk.LEFT, padx=5)
+
+        # Bouton retour
+        tk.Button(
+            self.main_frame,
+            text="Retour",
+            command=lambda: self.show_leaderboard(theme_id),
+            font=('Arial', 14),
+            width=20
+        ).pack(pady=20)
+
+    def show_profile(self):
+        """Affiche les statistiques du joueur"""
+        self.clear_frame()
+
+        tk.Label(
+            self.main_frame,
+            text="Mon profil",
+            font=('Arial', 24, 'bold')
+        ).pack(pady=20)
+
+        response = self.client.get_user_stats()
+        stats_frame = tk.Frame(self.main_frame)
+        stats_frame.pack(pady=10, padx=20)
+
+        if response['status'] != 'success':
+            tk.Label(
+                stats_frame,
+                text="Impossible de récupérer les statistiques",
+                font=('Arial', 12),
+                fg='red'
+            ).grid(row=0, column=0, pady=20)
+        elif not response.get('stats'):
+            tk.Label(
+                stats_frame,
+                text="Aucune partie jouée",
+                font=('Arial', 12),
+                fg='gray'
+            ).grid(row=0, column=0, pady=20)
+        else:
+            def format_accuracy(value):
+                return f"{value * 100:.0f}%" if value is not None else "-"
+
+            columns = ["Thème", "Parties", "Meilleur", "Moyenne", "Temps moyen", "2 choix", "4 choix", "Ouvertes"]
+            for col, header in enumerate(columns):
+                tk.Label(
+                    stats_frame,
+                    text=header,
+                    font=('Arial', 12, 'bold')
+                ).grid(row=0, column=col, padx=8, sticky='w')
+
+            rows = [dict(response['stats'], theme_name="Tous les thèmes")] + response.get('themes', [])
+            for i, stats in enumerate(rows, 1):
+                values = [
+                    stats['theme_name'],
+                    str(stats['games_played']),
+                    str(stats['best_score']),
+                    f"{stats['average_score']:.1f}",
+                    f"{stats['average_answer_time']:.1f}s",
+                    format_accuracy(stats['accuracy']['DUAL']),
+                    format_accuracy(stats['accuracy']['QUAD']),
+                    format_accuracy(stats['accuracy']['OPEN'])
+                ]
+                for col, value in enumerate(values):
+                    tk.Label(
+                        stats_frame,
+                        text=value,
+                        font=('Arial', 12)
+                    ).grid(row=i, column=col, padx=8, pady=5, sticky='w')
+
+            # Rang au classement général et joueurs proches
+            rank_response = self.client.get_user_rank()
+            if rank_response['status'] == 'success' and rank_response.get('rank'):
+                tk.Label(
+                    self.main_frame,
+                    text=f"Classement général : {rank_response['rank']} sur {rank_response['total']}",
+                    font=('Arial', 14, 'bold')
+                ).pack(pady=(20, 5))
+                around_frame = tk.Frame(self.main_frame)
+                around_frame.pack()
+                for i, (position, username, best_score) in enumerate(rank_response['around']):
+                    is_me = username == self.client.username
+                    for col, value in enumerate((str(position), username, str(best_score))):
+                        tk.Label(
+                            around_frame,
+                            text=value,
+                            font=('Arial', 12, 'bold' if is_me else 'normal')
+                        ).grid(row=i, column=col, padx=10, sticky='w')
+
         # Bouton retour
         tk.Button(
             self.main_frame,
@@ -729,6 +1047,7 @@ class QuizGUI:
             font=('Arial', 14),
             width=20
         ).pack(pady=20)
+
     def show_duel_menu(self):
         """Affiche le menu des duels"""
         self.clear_frame()
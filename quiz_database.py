@@ -1,197 +1,442 @@
+import asyncio
+import re
 import sqlite3
-import hashlib
-import time
+from datetime import datetime, timedelta, timezone
 from enum import Enum
+from quiz_cache import QuestionCache
+from quiz_score_writer import ScoreWriter
+from quiz_leaderboard import Leaderboard
+from quiz_ranking import RankIndex
+from quiz_queries import ReaderPool, connect
+from quiz_writer import DatabaseWriter
+from quiz_sessions import PasswordHasher
+from quiz_snapshot import ReadSnapshot
+from quiz_similarity import DuplicateMatcher, QuestionFeatures
+from quiz_migrations import migrate
+from quiz_storage import QuizStorage
+
+# Taille maximale d'une page de get_scores_page
+MAX_SCORES_PAGE = 100
+# Nombre maximal de joueurs listés de chaque côté par get_user_rank
+MAX_RANK_NEIGHBOURS = 25
+# Valeur de départ du curseur des scores (supérieure à tout score possible)
+SCORE_CURSOR_START = 2 ** 62
+
+
+# Taille maximale d'une page de search_questions
+MAX_SEARCH_PAGE = 100
+
 
 class QuestionType(Enum):
     DUAL = 1      # Questions à 2 choix (1 point)
     QUAD = 3      # Questions à 4 choix (3 points)
     OPEN = 5      # Questions sans proposition (5 points)
 
-class QuizDatabase:
-    def __init__(self, db_name='quiz.db'):
-        """Initialise la connexion à la base de données"""
-        self.conn = sqlite3.connect(db_name, check_same_thread=False)  # Permet l'accès multi-thread
-        self.cursor = self.conn.cursor()
+def current_week_start():
+    """Lundi de la semaine en cours (UTC), au format de date('now', '-6 days', 'weekday 1')"""
+    today = datetime.now(timezone.utc).date()
+    return (today - timedelta(days=today.weekday())).isoformat()
+
+def user_stats_params(user_id, theme_id, score, total_time, answers):
+    """Paramètres de upsert_user_stats pour une partie : ligne du thème et ligne globale (0)
+
+    `answers` : [(valeur du QuestionType, bonne réponse, temps de réponse)] ;
+    sans ce détail, la partie compte pour une réponse de durée `total_time`.
+    """
+    correct = {q_type.value: 0 for q_type in QuestionType}
+    total = {q_type.value: 0 for q_type in QuestionType}
+    if answers is not None:
+        answer_time = 0
+        for question_type, is_correct, time_taken in answers:
+            total[question_type] += 1
+            correct[question_type] += 1 if is_correct else 0
+            answer_time += time_taken
+        answers_count = len(answers)
+    else:
+        answer_time, answers_count = total_time, 1
+
+    values = (score, score, answer_time, answers_count,
+              correct[QuestionType.DUAL.value], total[QuestionType.DUAL.value],
+              correct[QuestionType.QUAD.value], total[QuestionType.QUAD.value],
+              correct[QuestionType.OPEN.value], total[QuestionType.OPEN.value])
+    return [(user_id, theme_id) + values, (user_id, 0) + values]
+
+def fts_query(text):
+    """Traduit une saisie libre en requête FTS5 : tous les mots doivent être présents
+
+    Chaque mot est mis entre guillemets pour que la saisie ne soit pas
+    interprétée comme la syntaxe de FTS5 (AND, NEAR, etc.) ; un mot suivi
+    de `*` est cherché comme préfixe.
+    """
+    terms = [f'"{word}"{star}' for word, star in re.findall(r'(\w+)(\*?)', text or '')]
+    return ' '.join(terms) or None
+
+
+def format_user_stats(row):
+    """Met en forme une ligne de user_stats pour le client"""
+    (theme_id, theme_name, games_played, best_score, total_score, total_answer_time, answers_count,
+     correct_dual, total_dual, correct_quad, total_quad, correct_open, total_open) = row
+    return {
+        'theme_id': theme_id,
+        'theme_name': theme_name,
+        'games_played': games_played,
+        'best_score': best_score,
+        'average_score': total_score / games_played if games_played else 0,
+        'average_answer_time': total_answer_time / answers_count if answers_count else 0,
+        'accuracy': {
+            QuestionType.DUAL.name: correct_dual / total_dual if total_dual else None,
+            QuestionType.QUAD.name: correct_quad / total_quad if total_quad else None,
+            QuestionType.OPEN.name: correct_open / total_open if total_open else None,
+        }
+    }
+
+class QuizDatabase(QuizStorage):
+    """Stockage SQLite (voir QuizStorage ; MemoryStorage pour le stockage en mémoire)"""
+
+    def __init__(self, db_name='quiz.db', read_snapshot=None):
+        """Initialise la connexion à la base de données
+
+        `read_snapshot` : options de ReadSnapshot (dict) pour servir les
+        lectures de classements, thèmes et statistiques depuis une copie en
+        mémoire ; None pour lire directement la base.
+        """
+        super().__init__()
+        self.conn = connect(db_name)  # Connexion d'administration (migrations)
         self.create_tables()
+        # Toutes les écritures passent par un thread unique, les lectures par un groupe de connexions
+        self.writer = DatabaseWriter(db_name)
+        self.queries = ReaderPool(db_name)
+        # Lectures tolérant un léger retard : copie en mémoire si elle est activée
+        self.snapshot = None
+        self.reads = self.queries
+        if read_snapshot is not None:
+            self.snapshot = self.reads = ReadSnapshot(db_name, self.queries, **read_snapshot)
+        # Hachage des mots de passe (PBKDF2) dans un pool de processus
+        self.password_hasher = PasswordHasher()
+        # Questions servies depuis la mémoire, compteurs d'utilisation écrits en différé
+        self.question_cache = QuestionCache(self.load_theme_questions, self.apply_usage_updates)
+        self.question_cache.start()
+        # Scores écrits par groupes plutôt qu'un commit par partie
+        self.score_writer = ScoreWriter(self.insert_scores)
+        # Classements en mémoire, reconstruits depuis la table scores
+        self.usernames = {}
+        self.theme_names = {}
+        self.leaderboard = Leaderboard()
+        self.load_leaderboard()
+        # Rang de chaque joueur selon son meilleur score (user_stats), tenu à jour en mémoire
+        self.rank_index = RankIndex()
+        self.rank_index.load(self.queries.fetchall('user_best_scores'))
+
+    def write(self, job, leaderboard=False):
+        """Confie une écriture au thread d'écriture ; retourne un Future
+
+        `leaderboard` : l'écriture modifie des tables copiées par ReadSnapshot
+        (joueurs, thèmes, scores et agrégats) et compte pour son renouvellement.
+        """
+        future = self.writer.submit(job)
+        if leaderboard and self.snapshot is not None:
+            # Comptée une fois validée : le résultat n'est publié qu'après le commit
+            future.add_done_callback(lambda _: self.snapshot.note_write())
+        return future
+
+    async def write_async(self, job, leaderboard=False):
+        """Version asyncio de write : `await db.write_async(job)`"""
+        return await asyncio.wrap_future(self.write(job, leaderboard))
 
     def create_tables(self):
-        """Création des tables de la base de données"""
-        # Table des utilisateurs
-        self.cursor.execute('''
-        CREATE TABLE IF NOT EXISTS users (
-            user_id INTEGER PRIMARY KEY AUTOINCREMENT,
-            username TEXT UNIQUE NOT NULL,
-            password_hash TEXT NOT NULL,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-        ''')
-
-        # Table des thèmes
-        self.cursor.execute('''
-        CREATE TABLE IF NOT EXISTS themes (
-            theme_id INTEGER PRIMARY KEY AUTOINCREMENT,
-            theme_name TEXT UNIQUE NOT NULL
-        )
-        ''')
-
-        # Table des questions
-        self.cursor.execute('''
-        CREATE TABLE IF NOT EXISTS questions (
-            question_id INTEGER PRIMARY KEY AUTOINCREMENT,
-            theme_id INTEGER,
-            question_type INTEGER NOT NULL,
-            points INTEGER NOT NULL,
-            question_text TEXT NOT NULL,
-            correct_answer TEXT NOT NULL,
-            wrong_answer1 TEXT,
-            wrong_answer2 TEXT,
-            wrong_answer3 TEXT,
-            used_count INTEGER DEFAULT 0,
-            last_used TIMESTAMP,
-            FOREIGN KEY (theme_id) REFERENCES themes (theme_id)
-        )
-        ''')
-
-        # Table des scores
-        self.cursor.execute('''
-        CREATE TABLE IF NOT EXISTS scores (
-            score_id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id INTEGER,
-            theme_id INTEGER,
-            score INTEGER NOT NULL,
-            total_time FLOAT NOT NULL,
-            played_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (user_id) REFERENCES users (user_id),
-            FOREIGN KEY (theme_id) REFERENCES themes (theme_id)
-        )
-        ''')
-
-        self.conn.commit()
+        """Création ou mise à jour des tables (migrations versionnées)"""
+        migrate(self.conn)
 
     def add_user(self, username, password):
         """Ajoute un nouvel utilisateur"""
-        password_hash = hashlib.sha256(password.encode()).hexdigest()
+        password_hash = self.password_hasher.hash(password)
         try:
-            self.cursor.execute('''
-            INSERT INTO users (username, password_hash)
-            VALUES (?, ?)
-            ''', (username, password_hash))
-            self.conn.commit()
+            self.write(lambda queries: queries.execute('insert_user', (username, password_hash)),
+                       leaderboard=True).result()
             return True
         except sqlite3.IntegrityError:
             return False
 
     def verify_user(self, username, password):
         """Vérifie les identifiants d'un utilisateur"""
-        password_hash = hashlib.sha256(password.encode()).hexdigest()
-        self.cursor.execute('''
-        SELECT user_id FROM users
-        WHERE username = ? AND password_hash = ?
-        ''', (username, password_hash))
-        result = self.cursor.fetchone()
-        return result[0] if result else None
+        credentials = self.queries.fetchone('user_credentials', (username,))
+        if credentials is None:
+            return None
+        user_id, stored_hash = credentials
+        valid, needs_rehash = self.password_hasher.check(password, stored_hash)
+        if not valid:
+            return None
+        if needs_rehash:
+            # Remplace une ancienne empreinte SHA-256 par une empreinte PBKDF2
+            new_hash = self.password_hasher.hash(password)
+            self.write(lambda queries: queries.execute('update_password_hash', (new_hash, user_id)))
+        return user_id
 
     def add_question(self, theme_id, question_type, question_text, correct_answer, wrong_answers=None):
-        """Ajoute une nouvelle question"""
+        """Ajoute une nouvelle question (False si elle existe déjà à la normalisation près)"""
         try:
-            wrong_answer1 = wrong_answers[0] if wrong_answers else None
-            wrong_answer2 = wrong_answers[1] if wrong_answers and len(wrong_answers) > 1 else None
-            wrong_answer3 = wrong_answers[2] if wrong_answers and len(wrong_answers) > 2 else None
-
-            self.cursor.execute('''
-            INSERT INTO questions (
-                theme_id, question_type, points, question_text, 
-                correct_answer, wrong_answer1, wrong_answer2, wrong_answer3
-            )
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (theme_id, question_type.value, question_type.value, question_text,
-                 correct_answer, wrong_answer1, wrong_answer2, wrong_answer3))
-            self.conn.commit()
-            return True
+            return self.add_questions([(theme_id, question_type, question_text,
+                                        correct_answer, wrong_answers)]) == 1
         except Exception as e:
             print(f"Erreur lors de l'ajout de la question: {e}")
             return False
 
+    def add_questions(self, rows):
+        """Ajoute un lot de questions en une seule transaction
+
+        `rows` : [(theme_id, QuestionType, question_text, correct_answer, wrong_answers)]
+        Les doublons exacts (même texte et même réponse à la normalisation
+        près, dans le même thème) sont ignorés ; les quasi-doublons sont
+        ajoutés dans le groupe de la question la plus proche. Retourne le
+        nombre de questions ajoutées.
+        """
+        prepared = []
+        theme_ids = set()
+        for theme_id, question_type, question_text, correct_answer, wrong_answers in rows:
+            wrong_answers = list(wrong_answers or [])[:3]
+            wrong_answers += [None] * (3 - len(wrong_answers))
+            params = (theme_id, question_type.value, question_type.value, question_text,
+                      correct_answer, *wrong_answers)
+            # Signatures calculées ici, hors du thread d'écriture
+            prepared.append((params, QuestionFeatures(theme_id, question_text, correct_answer)))
+            theme_ids.add(theme_id)
+
+        def insert(queries):
+            matcher = DuplicateMatcher(queries)
+            inserted = 0
+            for params, features in prepared:
+                if matcher.exact_duplicate(features) is not None:
+                    continue
+                cluster_id = matcher.similar_cluster(features)
+                question_id = queries.execute('insert_question',
+                                              params + (features.fingerprint, features.signature, cluster_id))
+                matcher.add(question_id, features)
+                inserted += 1
+            return inserted
+
+        inserted = self.write(insert).result()
+        for theme_id in theme_ids:
+            self.question_cache.invalidate(theme_id)
+        self.notify_questions_changed(theme_ids)
+        return inserted
+
+    def get_or_create_theme(self, theme_name):
+        """Retourne l'identifiant d'un thème, en le créant s'il n'existe pas"""
+        def create_theme(queries):
+            queries.execute('insert_theme', (theme_name,))
+            return queries.fetchone('theme_id', (theme_name,))
+
+        theme_id = self.write(create_theme, leaderboard=True).result()
+        self.theme_names[theme_id] = theme_name
+        return theme_id
+
+    def get_seed_hash(self, seed_name):
+        """Retourne l'empreinte de la dernière version chargée d'un fichier de données"""
+        return self.queries.fetchone('seed_hash', (seed_name,))
+
+    def set_seed_hash(self, seed_name, content_hash):
+        """Enregistre la version chargée d'un fichier de données"""
+        self.write(lambda queries: queries.execute('set_seed_hash', (seed_name, content_hash))).result()
+
+    def load_theme_questions(self, theme_id):
+        """Charge toutes les questions d'un thème (utilisé par le cache)"""
+        return self.queries.fetchall('theme_questions', (theme_id,))
+
+    def apply_usage_updates(self, updates):
+        """Écrit en une transaction les compteurs d'utilisation cumulés par le cache"""
+        self.write(lambda queries: queries.executemany('update_usage', updates)).result()
+
     def get_questions_for_game(self, theme_id):
         """Récupère les questions pour une partie en évitant les répétitions"""
-        questions = {
-            QuestionType.OPEN: [],
-            QuestionType.QUAD: [],
-            QuestionType.DUAL: []
-        }
-        
-        current_time = time.strftime('%Y-%m-%d %H:%M:%S')
-        
-        for q_type in QuestionType:
-            # Sélectionne les questions les moins utilisées en priorité
-            self.cursor.execute('''
-            SELECT * FROM questions 
-            WHERE theme_id = ? AND question_type = ?
-            ORDER BY used_count ASC, last_used ASC, RANDOM()
-            LIMIT ?
-            ''', (theme_id, q_type.value, 
-                 5 if q_type == QuestionType.OPEN else 
-                 10 if q_type == QuestionType.QUAD else 20))
-            
-            selected_questions = self.cursor.fetchall()
-            questions[q_type] = selected_questions
-            
-            # Met à jour le compteur d'utilisation pour les questions sélectionnées
-            for question in selected_questions:
-                self.cursor.execute('''
-                UPDATE questions 
-                SET used_count = used_count + 1,
-                    last_used = ?
-                WHERE question_id = ?
-                ''', (current_time, question[0]))
-            
-            self.conn.commit()
-            
-        return questions
+        # Sélectionne les questions les moins utilisées en priorité, sans accès disque
+        # une fois le thème en cache
+        return self.question_cache.sample(theme_id, {
+            QuestionType.OPEN: 5,
+            QuestionType.QUAD: 10,
+            QuestionType.DUAL: 20
+        })
+
+    def record_question_usage(self, question_ids):
+        """Compte une utilisation des questions d'une partie qui commence"""
+        self.question_cache.record_usage(question_ids)
+
+    def search_questions(self, text, theme_id=None, limit=20, offset=0):
+        """Recherche des questions (texte et réponses), par pertinence
+
+        Retourne (lignes, il reste des résultats) ; une ligne est
+        (question_id, theme_name, question_type, question_text, correct_answer).
+        """
+        query = fts_query(text)
+        if query is None:
+            return [], False
+        limit = max(1, min(int(limit), MAX_SEARCH_PAGE))
+        offset = max(0, int(offset))
+        if theme_id:
+            rows = self.queries.fetchall('search_questions_theme', (query, theme_id, limit + 1, offset))
+        else:
+            rows = self.queries.fetchall('search_questions_all', (query, limit + 1, offset))
+        return rows[:limit], len(rows) > limit
+
+    def get_username(self, user_id):
+        """Retourne le nom d'un utilisateur (mis en cache, les noms ne changent pas)"""
+        username = self.usernames.get(user_id)
+        if username is None:
+            username = self.queries.fetchone('username', (user_id,))
+            if username is not None:
+                self.usernames[user_id] = username
+        return username
+
+    def get_theme_name(self, theme_id):
+        """Retourne le nom d'un thème (mis en cache)"""
+        theme_name = self.theme_names.get(theme_id)
+        if theme_name is None:
+            theme_name = self.queries.fetchone('theme_name', (theme_id,))
+            if theme_name is not None:
+                self.theme_names[theme_id] = theme_name
+        return theme_name
 
     def get_all_themes(self):
         """Récupère tous les thèmes"""
-        self.cursor.execute("SELECT theme_id, theme_name FROM themes")
-        return self.cursor.fetchall()
+        return self.reads.fetchall('all_themes')
 
-    def save_score(self, user_id, theme_id, score, total_time):
-        """Enregistre un score"""
+    def save_score(self, user_id, theme_id, score, total_time, answers=None):
+        """Enregistre un score (écrit en base avec le prochain groupe)
+
+        `answers` : détail facultatif des réponses [(valeur du QuestionType,
+        bonne réponse, temps de réponse)] pour les statistiques du joueur.
+        """
         try:
-            self.cursor.execute('''
-            INSERT INTO scores (user_id, theme_id, score, total_time)
-            VALUES (?, ?, ?, ?)
-            ''', (user_id, theme_id, score, total_time))
-            self.conn.commit()
-            return True
+            self.score_writer.add(user_id, theme_id, score, total_time, answers)
         except Exception:
             return False
 
+        self.rank_index.add_score(user_id, theme_id, score)
+        username = self.get_username(user_id)
+        if username is not None:
+            self.leaderboard.add_score(user_id, current_week_start(), username, theme_id,
+                                       self.get_theme_name(theme_id), score, total_time)
+        return True
+
+    def insert_scores(self, scores):
+        """Insère un groupe de scores et met à jour les agrégats en une seule transaction"""
+        rows = [record[:4] for record in scores]
+        rollups = [(user_id, theme_id, score, total_time, total_time)
+                   for user_id, theme_id, score, total_time in rows]
+        stats = [params for record in scores for params in user_stats_params(*record)]
+
+        def insert(queries):
+            queries.executemany('insert_score', rows)
+            queries.executemany('rollup_day', rollups)
+            queries.executemany('rollup_week', rollups)
+            queries.executemany('upsert_user_stats', stats)
+
+        self.write(insert, leaderboard=True).result()
+
+    def archive_old_scores(self, max_age_days, chunk_size=1000):
+        """Déplace vers scores_archive les scores bruts plus anciens que `max_age_days`
+
+        Les agrégats de score_rollups sont conservés. Le travail est découpé
+        en tranches de `chunk_size` scores, chacune dans sa propre écriture.
+        Retourne le nombre de scores archivés.
+        """
+        cutoff = self.queries.fetchone('retention_cutoff', (f'-{int(max_age_days)} days',))
+
+        def archive_chunk(queries):
+            bound = queries.fetchone('archive_bound', (cutoff, chunk_size))
+            if bound is None:
+                return 0
+            queries.execute('archive_scores', (bound, cutoff))
+            return queries.execute_count('delete_archived_scores', (bound, cutoff))
+
+        archived = 0
+        while True:
+            count = self.write(archive_chunk).result()
+            if not count:
+                return archived
+            archived += count
+
+    def get_user_stats(self, user_id):
+        """Statistiques d'un joueur : globales et par thème (lecture des agrégats de user_stats)"""
+        overall = None
+        themes = []
+        for row in self.reads.fetchall('user_stats', (user_id,)):
+            stats = format_user_stats(row)
+            if stats['theme_id'] == 0:
+                overall = stats
+            else:
+                themes.append(stats)
+        return {'overall': overall, 'themes': themes}
+
+    def get_user_rank(self, user_id, theme_id=None, count=5):
+        """Rang d'un joueur selon son meilleur score (thème, ou tous thèmes si None)
+
+        Retourne {'rank', 'total', 'around'} ; `around` liste jusqu'à `count`
+        joueurs de part et d'autre : [(rang, username, meilleur score)].
+        `rank` vaut None si le joueur n'a pas encore de score.
+        """
+        count = max(0, min(int(count), MAX_RANK_NEIGHBOURS))
+        rank, total, around = self.rank_index.get(user_id, theme_id, count)
+        return {
+            'rank': rank,
+            'total': total,
+            'around': [(position, self.get_username(other), score) for position, other, score in around]
+        }
+
     def get_top_scores(self, theme_id=None, limit=10):
         """Récupère les meilleurs scores"""
         if theme_id:
-            self.cursor.execute('''
-            SELECT users.username, scores.score, scores.total_time
-            FROM scores
-            JOIN users ON scores.user_id = users.user_id
-            WHERE scores.theme_id = ?
-            ORDER BY scores.score DESC, scores.total_time ASC
-            LIMIT ?
-            ''', (theme_id, limit))
+            return self.reads.fetchall('top_scores_theme', (theme_id, limit))
+        return self.reads.fetchall('top_scores_all', (limit,))
+
+    def get_scores_page(self, theme_id=None, cursor=None, limit=20, since=None, until=None):
+        """Une page de tous les scores, du meilleur au moins bon (pagination par curseur)
+
+        `cursor` : curseur renvoyé avec la page précédente, None pour la
+        première page. `since` / `until` : bornes facultatives de la date de
+        partie ('AAAA-MM-JJ' ou 'AAAA-MM-JJ HH:MM:SS', `until` exclue).
+        Retourne (lignes, curseur suivant ou None) ; une ligne est
+        (username, theme_name, score, total_time, played_at).
+        """
+        limit = max(1, min(int(limit), MAX_SCORES_PAGE))
+        if cursor is None:
+            # Aucun score n'atteint cette valeur : la page commence au meilleur score
+            score, total_time, score_id = SCORE_CURSOR_START, 0, 0
         else:
-            self.cursor.execute('''
-            SELECT users.username, themes.theme_name, scores.score, scores.total_time
-            FROM scores
-            JOIN users ON scores.user_id = users.user_id
-            JOIN themes ON scores.theme_id = themes.theme_id
-            ORDER BY scores.score DESC, scores.total_time ASC
-            LIMIT ?
-            ''', (limit,))
-        return self.cursor.fetchall()
+            score, total_time, score_id = int(cursor[0]), float(cursor[1]), int(cursor[2])
+        params = {'theme_id': theme_id, 'score': score, 'total_time': total_time,
+                  'score_id': score_id, 'since': since, 'until': until, 'limit': limit + 1}
+        # Table brute des scores : lue sur la base, elle n'est pas dans la copie en mémoire
+        rows = self.queries.fetchall('scores_page_theme' if theme_id else 'scores_page_all', params)
+
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            last = rows[-1]
+            next_cursor = [last[2], last[3], last[5]]
+        return [row[:5] for row in rows], next_cursor
+
+    def load_leaderboard(self):
+        """Reconstruit les classements en mémoire à partir de la base"""
+        capacity = self.leaderboard.capacity
+        theme_rows = {theme_id: self.queries.fetchall('leaderboard_theme_rows', (theme_id, capacity))
+                      for theme_id, _ in self.get_all_themes()}
+        self.leaderboard.load(theme_rows, self.queries.fetchall('leaderboard_all_rows', (capacity,)))
+
     def get_leaderboard(self, theme_id=None, limit=10):
-        """Récupère le classement en utilisant get_top_scores"""
-        return self.get_top_scores(theme_id, limit)
+        """Récupère le classement depuis la mémoire (get_top_scores au-delà du top K)"""
+        scores = self.leaderboard.get(theme_id, limit)
+        if scores is None:
+            self.score_writer.flush()
+            scores = self.get_top_scores(theme_id, limit)
+        return scores
 
     def close(self):
         """Ferme la connexion à la base de données"""
+        self.question_cache.close()
+        self.score_writer.close()
+        self.writer.close()
+        if self.snapshot is not None:
+            self.snapshot.close()
+        self.queries.close()
+        self.password_hasher.close()
         self.conn.close()
\ No newline at end of file
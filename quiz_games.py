@@ -0,0 +1,193 @@
+import struct
+import threading
+import time
+from array import array
+from quiz_answers import AnswerKey
+
+# Réponse donnée à une question, dans l'historique d'une partie :
+# 0 = bonne réponse, 1 à 3 = mauvaise réponse proposée n°1 à 3,
+# OTHER_ANSWER = autre texte saisi (gardé à part), SKIPPED = question passée
+SKIPPED = -1
+OTHER_ANSWER = 4
+
+# Une réponse de l'historique : (réponse, points, temps de réponse), 7 octets
+HISTORY_RECORD = struct.Struct('<bHf')
+
+
+class QuestionStore:
+    """Lignes de questions partagées par toutes les parties, par question_id
+
+    Les lignes sont des tuples immuables ; les parties ne gardent que les
+    identifiants de leurs questions. La clé de réponse (AnswerKey) de chaque
+    question est préparée à son arrivée dans le magasin.
+
+    Chaque liste d'identifiants en vie (paquet prêt, partie, salon) compte
+    comme une référence sur ses questions ; une question n'est gardée que
+    tant qu'une référence la tient.
+    """
+
+    def __init__(self):
+        self.rows = {}
+        self.answer_keys = {}
+        self.references = {}    # question_id -> nombre de listes qui la contiennent
+        self.lock = threading.Lock()
+
+    def add(self, rows):
+        """Enregistre des lignes, avec une référence pour la liste retournée
+
+        Retourne (identifiants, lignes nouvelles pour le magasin).
+        """
+        question_ids = array('I')
+        new_rows = []
+        with self.lock:
+            for row in rows:
+                question_id = row[0]
+                if question_id not in self.rows:
+                    self.rows[question_id] = tuple(row)
+                    self.answer_keys[question_id] = AnswerKey.for_question(row)
+                    new_rows.append(self.rows[question_id])
+                self.references[question_id] = self.references.get(question_id, 0) + 1
+                question_ids.append(question_id)
+        return question_ids, new_rows
+
+    def acquire(self, question_ids):
+        """Ajoute une référence sur des questions déjà présentes (nouvelle partie d'un duel, reprise)"""
+        with self.lock:
+            for question_id in question_ids:
+                self.references[question_id] = self.references.get(question_id, 0) + 1
+
+    def release(self, question_ids):
+        """Retire une référence ; retourne les identifiants des questions retirées du magasin"""
+        removed = []
+        with self.lock:
+            for question_id in question_ids:
+                count = self.references.get(question_id, 0) - 1
+                if count > 0:
+                    self.references[question_id] = count
+                else:
+                    self.references.pop(question_id, None)
+                    if self.rows.pop(question_id, None) is not None:
+                        del self.answer_keys[question_id]
+                        removed.append(question_id)
+        return removed
+
+    def prune(self):
+        """Retire les questions sans référence (après une reprise) ; retourne leurs identifiants"""
+        with self.lock:
+            removed = [question_id for question_id in self.rows if question_id not in self.references]
+            for question_id in removed:
+                del self.rows[question_id]
+                del self.answer_keys[question_id]
+        return removed
+
+    def load(self, rows):
+        """Reprend des lignes sauvegardées (listes JSON), sans référence"""
+        with self.lock:
+            for row in rows:
+                self.rows[row[0]] = tuple(row)
+                self.answer_keys[row[0]] = AnswerKey.for_question(row)
+
+    def get(self, question_id):
+        return self.rows[question_id]
+
+    def answer_key(self, question_id):
+        return self.answer_keys[question_id]
+
+
+def answer_choice(row, answer, is_correct):
+    """Code de la réponse donnée à la question `row`, et texte saisi à garder (ou None)"""
+    if answer is None:
+        return SKIPPED, None
+    if is_correct:
+        return 0, None if answer == row[5] else answer
+    for choice in (1, 2, 3):
+        if answer == row[5 + choice]:
+            return choice, None
+    return OTHER_ANSWER, answer
+
+
+class GameSession:
+    """Partie en cours : identifiants des questions et historique compact des réponses
+
+    `question_ids` (array) pointe dans le QuestionStore du serveur et peut
+    être partagé par tous les joueurs d'un duel. L'historique est une suite
+    d'enregistrements HISTORY_RECORD ; seuls les textes saisis qui ne sont
+    pas une des réponses de la question sont gardés, dans `typed`.
+    """
+
+    __slots__ = ('user_id', 'theme_id', 'room_code', 'question_ids', 'current_index',
+                 'score', 'start_time', 'history', 'typed', 'saved', 'question_started')
+
+    def __init__(self, user_id, theme_id, question_ids, room_code=None, start_time=None):
+        self.user_id = user_id
+        self.theme_id = theme_id
+        self.room_code = room_code
+        self.question_ids = question_ids
+        self.current_index = 0
+        self.score = 0
+        self.start_time = time.time() if start_time is None else start_time
+        self.history = bytearray()
+        self.typed = None          # position -> texte saisi, créé au premier besoin
+        self.saved = False         # score déjà enregistré
+        self.question_started = time.time()  # heure à laquelle la question en cours a été servie
+
+    def current_question_id(self):
+        """Identifiant de la question en cours, ou None si la partie est terminée"""
+        if self.current_index < len(self.question_ids):
+            return self.question_ids[self.current_index]
+        return None
+
+    def is_finished(self):
+        return self.current_index >= len(self.question_ids)
+
+    def record_answer(self, choice, points, time_taken, typed=None):
+        """Ajoute la réponse à la question en cours et passe à la suivante"""
+        if typed is not None:
+            if self.typed is None:
+                self.typed = {}
+            self.typed[self.current_index] = typed
+        self.history += HISTORY_RECORD.pack(choice, points, time_taken)
+        self.current_index += 1
+
+    def answers(self):
+        """Réponses données : [(position, réponse, points, temps de réponse)]"""
+        # Temps arrondis : ils sont stockés en float sur 32 bits
+        records = HISTORY_RECORD.iter_unpack(self.history)
+        return [(position, choice, points, round(time_taken, 3))
+                for position, (choice, points, time_taken) in enumerate(records)]
+
+    def answer_text(self, position, row, choice):
+        """Texte de la réponse donnée à la question `position` (None si passée)"""
+        if self.typed is not None and position in self.typed:
+            return self.typed[position]
+        if choice == SKIPPED:
+            return None
+        return row[5 + choice]
+
+    def to_state(self):
+        """Forme sauvegardée de la partie (JSON)"""
+        return {
+            'user_id': self.user_id,
+            'theme_id': self.theme_id,
+            'room_code': self.room_code,
+            'question_ids': self.question_ids.tolist(),
+            'current_index': self.current_index,
+            'score': self.score,
+            'start_time': self.start_time,
+            'history': [list(record) for record in HISTORY_RECORD.iter_unpack(self.history)],
+            'typed': self.typed or {},
+            'saved': self.saved,
+        }
+
+    @classmethod
+    def from_state(cls, state):
+        game = cls(state['user_id'], state['theme_id'], array('I', state['question_ids']),
+                   state.get('room_code'), state['start_time'])
+        for record in state['history']:
+            game.history += HISTORY_RECORD.pack(*record)
+        game.current_index = state['current_index']
+        game.score = state['score']
+        game.saved = state.get('saved', False)
+        # Clés JSON : les positions redeviennent des entiers
+        game.typed = {int(position): text for position, text in state['typed'].items()} or None
+        return game
@@ -0,0 +1,234 @@
+import argparse
+import csv
+import hashlib
+import json
+import os
+from quiz_database import QuizDatabase, QuestionType
+
+# Nombre minimal de mauvaises réponses selon le type de question
+REQUIRED_WRONG_ANSWERS = {
+    QuestionType.DUAL: 1,
+    QuestionType.QUAD: 3,
+    QuestionType.OPEN: 0,
+}
+
+CSV_WRONG_COLUMNS = ('wrong1', 'wrong2', 'wrong3')
+
+# Questions chargées au premier démarrage du serveur
+SEED_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'questions_initiales.jsonl')
+
+
+class InvalidRow(ValueError):
+    """Ligne refusée à l'import"""
+
+
+class ImportReport:
+    """Bilan d'un import : questions insérées et lignes refusées"""
+
+    def __init__(self, max_rejected=1000):
+        self.lines_read = 0
+        self.inserted = 0
+        self.duplicates = 0          # doublons d'une question déjà en base, ignorés
+        self.rejected_count = 0
+        self.rejected = []           # (numéro de ligne, raison), limité à max_rejected
+        self.max_rejected = max_rejected
+
+    def reject(self, line_number, reason):
+        self.rejected_count += 1
+        if len(self.rejected) < self.max_rejected:
+            self.rejected.append((line_number, reason))
+
+
+def parse_question_type(value):
+    """Accepte le nom (DUAL, QUAD, OPEN) ou la valeur (1, 3, 5) d'un QuestionType"""
+    if isinstance(value, QuestionType):
+        return value
+    text = str(value if value is not None else '').strip()
+    if text.upper() in QuestionType.__members__:
+        return QuestionType[text.upper()]
+    try:
+        return QuestionType(int(text))
+    except ValueError:
+        raise InvalidRow(f"type de question inconnu: {value!r}")
+
+
+def text_field(record, name):
+    """Champ texte d'un enregistrement, sans espaces autour ('' s'il est absent)"""
+    value = record.get(name)
+    if value is None:
+        return ''
+    if not isinstance(value, str):
+        raise InvalidRow(f"{name} doit être un texte: {value!r}")
+    return value.strip()
+
+
+def wrong_answers(record):
+    """Mauvaises réponses non vides d'un enregistrement (liste de textes attendue)"""
+    values = record.get('wrong')
+    if values is None:
+        return []
+    if not isinstance(values, list):
+        raise InvalidRow(f"wrong doit être une liste: {values!r}")
+    wrong = []
+    for value in values:
+        if value is None:
+            continue
+        if not isinstance(value, str):
+            raise InvalidRow(f"mauvaise réponse invalide: {value!r}")
+        if value.strip():
+            wrong.append(value.strip())
+    return wrong
+
+
+def validate_record(record):
+    """Valide un enregistrement et retourne (thème, type, question, réponse, mauvaises réponses)"""
+    theme = text_field(record, 'theme')
+    question = text_field(record, 'question')
+    correct = text_field(record, 'correct')
+    if not theme:
+        raise InvalidRow("thème manquant")
+    if not question:
+        raise InvalidRow("texte de question manquant")
+    if not correct:
+        raise InvalidRow("bonne réponse manquante")
+
+    question_type = parse_question_type(record.get('type'))
+    wrong = wrong_answers(record)
+    required = REQUIRED_WRONG_ANSWERS[question_type]
+    if len(wrong) < required:
+        raise InvalidRow(f"{question_type.name} attend au moins {required} mauvaise(s) réponse(s)")
+    if question_type == QuestionType.OPEN:
+        wrong = []
+    return theme, question_type, question, correct, wrong[:3]
+
+
+def read_csv(file):
+    """Lit un CSV (colonnes theme, type, question, correct, wrong1..wrong3) ligne par ligne"""
+    for record in csv.DictReader(file):
+        record['wrong'] = [record.get(column) for column in CSV_WRONG_COLUMNS]
+        yield record
+
+
+def read_jsonl(file):
+    """Lit un fichier JSON Lines (un objet par ligne, clés comme le CSV, `wrong` en liste)"""
+    for line in file:
+        line = line.strip()
+        if not line:
+            yield None
+            continue
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError as e:
+            record = InvalidRow(f"JSON invalide: {e.msg}")
+        if not isinstance(record, (dict, InvalidRow)):
+            record = InvalidRow("objet JSON attendu")
+        yield record
+
+
+class QuestionImporter:
+    """Import en flux de fichiers de questions, inséré par lots dans des transactions
+
+    Le fichier est lu ligne par ligne et seules `batch_size` questions sont
+    gardées en mémoire avant d'être insérées avec un seul `executemany`.
+    """
+
+    def __init__(self, db, batch_size=5000, progress=None):
+        self.db = db
+        self.batch_size = batch_size
+        self.progress = progress     # appelé après chaque lot avec l'ImportReport
+        self.theme_ids = {}
+
+    def theme_id(self, theme_name):
+        theme_id = self.theme_ids.get(theme_name)
+        if theme_id is None:
+            theme_id = self.theme_ids[theme_name] = self.db.get_or_create_theme(theme_name)
+        return theme_id
+
+    def import_records(self, records, first_line=1):
+        """Importe une suite d'enregistrements (dict, None pour une ligne vide ou InvalidRow)"""
+        report = ImportReport()
+        batch = []
+        for line_number, record in enumerate(records, start=first_line):
+            report.lines_read += 1
+            if record is None:
+                continue
+            try:
+                if isinstance(record, InvalidRow):
+                    raise record
+                theme, question_type, question, correct, wrong = validate_record(record)
+            except InvalidRow as e:
+                report.reject(line_number, str(e))
+                continue
+
+            # Questions déjà en base : écartées par add_questions (empreinte), comptées en doublons
+            batch.append((self.theme_id(theme), question_type, question, correct, wrong))
+            if len(batch) >= self.batch_size:
+                self.flush(batch, report)
+                batch = []
+        self.flush(batch, report)
+        return report
+
+    def flush(self, batch, report):
+        if batch:
+            inserted = self.db.add_questions(batch)
+            report.inserted += inserted
+            report.duplicates += len(batch) - inserted
+        if self.progress:
+            self.progress(report)
+
+    def import_file(self, path, file_format=None):
+        """Importe un fichier .csv ou .jsonl"""
+        file_format = file_format or os.path.splitext(path)[1].lstrip('.').lower()
+        with open(path, newline='', encoding='utf-8') as file:
+            if file_format == 'csv':
+                # La ligne 1 du CSV est l'en-tête
+                return self.import_records(read_csv(file), first_line=2)
+            if file_format in ('jsonl', 'json'):
+                return self.import_records(read_jsonl(file))
+        raise ValueError(f"Format de fichier non pris en charge: {file_format}")
+
+
+def import_seed_file(db, path=SEED_FILE):
+    """Charge un fichier de données initiales s'il a changé depuis le dernier chargement
+
+    Le fichier est identifié par l'empreinte SHA-256 de son contenu : un
+    redémarrage avec le même fichier ne fait qu'un calcul d'empreinte. Une
+    nouvelle version n'ajoute que les questions absentes de la base.
+    Retourne l'ImportReport, ou None si le fichier était déjà chargé.
+    """
+    with open(path, 'rb') as file:
+        content_hash = hashlib.sha256(file.read()).hexdigest()
+    seed_name = os.path.basename(path)
+    if db.get_seed_hash(seed_name) == content_hash:
+        return None
+
+    report = QuestionImporter(db).import_file(path)
+    db.set_seed_hash(seed_name, content_hash)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Importe des questions depuis un fichier CSV ou JSONL")
+    parser.add_argument('fichier')
+    parser.add_argument('--db', default='quiz.db')
+    parser.add_argument('--lot', type=int, default=5000, help="taille des lots d'insertion")
+    args = parser.parse_args()
+
+    def show_progress(report):
+        print(f"{report.lines_read} lignes lues, {report.inserted} questions ajoutées, "
+              f"{report.rejected_count} refusées")
+
+    db = QuizDatabase(args.db)
+    try:
+        report = QuestionImporter(db, args.lot, show_progress).import_file(args.fichier)
+    finally:
+        db.close()
+
+    for line_number, reason in report.rejected:
+        print(f"Ligne {line_number} refusée: {reason}")
+    print(f"Import terminé: {report.inserted} questions ajoutées, {report.duplicates} doublons ignorés, "
+          f"{report.rejected_count} refusées")
+
+
+if __name__ == "__main__":
+    main()
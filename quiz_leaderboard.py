@@ -0,0 +1,99 @@
+import bisect
+import itertools
+import threading
+
+
+class TopScores:
+    """Liste bornée des K meilleurs scores, triée par score décroissant puis temps croissant
+
+    Chaque ligne a un identifiant (joueur et semaine) : un nouveau score pour
+    le même identifiant remplace l'ancien s'il est meilleur, comme dans la
+    table score_rollups.
+    """
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.keys = []     # (-score, total_time, ordre d'arrivée), triés
+        self.rows = []     # lignes renvoyées au client, dans le même ordre
+        self.ids = []      # identifiant de chaque ligne, dans le même ordre
+        self.key_by_id = {}
+
+    def add(self, entry_id, key, row):
+        """Insère ou améliore un score s'il entre dans le top K (O(log K) + décalage)"""
+        if len(self.keys) >= self.capacity and key >= self.keys[-1]:
+            return
+        old_key = self.key_by_id.get(entry_id)
+        if old_key is not None:
+            if key >= old_key:
+                return
+            index = bisect.bisect_left(self.keys, old_key)
+            del self.keys[index], self.rows[index], self.ids[index]
+
+        index = bisect.bisect_right(self.keys, key)
+        self.keys.insert(index, key)
+        self.rows.insert(index, row)
+        self.ids.insert(index, entry_id)
+        self.key_by_id[entry_id] = key
+        if len(self.keys) > self.capacity:
+            self.keys.pop()
+            self.rows.pop()
+            del self.key_by_id[self.ids.pop()]
+
+    def top(self, limit):
+        return self.rows[:limit]
+
+
+class Leaderboard:
+    """Classements en mémoire : un top K par thème et un top K global
+
+    Reconstruit depuis la base au démarrage puis tenu à jour à chaque
+    score enregistré ; l'ordre est le même que `get_top_scores`
+    (meilleur score de la semaine décroissant, puis temps croissant).
+    """
+
+    def __init__(self, capacity=100):
+        self.capacity = capacity
+        self.by_theme = {}                 # theme_id -> TopScores
+        self.overall = TopScores(capacity)
+        self.counter = itertools.count()   # départage les ex aequo par ordre d'arrivée
+        self.lock = threading.Lock()
+
+    def load(self, theme_rows, overall_rows):
+        """Initialise les classements à partir de lignes déjà triées
+
+        `theme_rows` : {theme_id: [(user_id, période, username, score, total_time)]}
+        `overall_rows` : [(user_id, période, theme_id, username, theme_name, score, total_time)]
+        """
+        with self.lock:
+            self.by_theme = {}
+            self.overall = TopScores(self.capacity)
+            for theme_id, rows in theme_rows.items():
+                top = self.by_theme[theme_id] = TopScores(self.capacity)
+                for user_id, period, username, score, total_time in rows:
+                    top.add((user_id, period), (-score, total_time, next(self.counter)),
+                            (username, score, total_time))
+            for user_id, period, theme_id, username, theme_name, score, total_time in overall_rows:
+                self.overall.add((user_id, period, theme_id), (-score, total_time, next(self.counter)),
+                                 (username, theme_name, score, total_time))
+
+    def add_score(self, user_id, period, username, theme_id, theme_name, score, total_time):
+        """Prend en compte un nouveau score de `user_id` pour la semaine `period`"""
+        with self.lock:
+            key = (-score, total_time, next(self.counter))
+            top = self.by_theme.get(theme_id)
+            if top is None:
+                top = self.by_theme[theme_id] = TopScores(self.capacity)
+            top.add((user_id, period), key, (username, score, total_time))
+            if theme_name is not None:
+                self.overall.add((user_id, period, theme_id), key,
+                                 (username, theme_name, score, total_time))
+
+    def get(self, theme_id=None, limit=10):
+        """Retourne le classement d'un thème (ou global), ou None si `limit` dépasse K"""
+        if limit > self.capacity:
+            return None
+        with self.lock:
+            if theme_id:
+                top = self.by_theme.get(theme_id)
+                return top.top(limit) if top else []
+            return self.overall.top(limit)
@@ -0,0 +1,80 @@
+import heapq
+import threading
+import time
+
+
+class SessionLifecycle:
+    """Durée de vie des parties et salons gardés en mémoire
+
+    Chaque entrée (clé libre, par exemple ('games', game_id)) a une
+    échéance, repoussée à chaque activité avec `touch`. Un thread retire
+    toutes les `sweep_interval` secondes les entrées arrivées à échéance en
+    appelant `on_expire(clé)` : un tas trié par échéance évite de parcourir
+    toutes les entrées, comme pour les jetons de SessionStore.
+    """
+
+    def __init__(self, on_expire, sweep_interval=30.0):
+        self.on_expire = on_expire
+        self.sweep_interval = sweep_interval
+        self.deadlines = {}    # clé -> échéance actuelle
+        self.heap = []         # tas de (échéance, clé), avec des échéances périmées
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    def touch(self, key, ttl):
+        """Note une activité : l'entrée expire dans `ttl` secondes"""
+        deadline = time.monotonic() + ttl
+        with self.lock:
+            current = self.deadlines.get(key)
+            self.deadlines[key] = deadline
+            # Une échéance repoussée est reprise au passage de l'ancienne ;
+            # une échéance avancée (partie terminée) doit être ajoutée au tas
+            if current is None or deadline < current:
+                heapq.heappush(self.heap, (deadline, key))
+
+    def forget(self, key):
+        with self.lock:
+            self.deadlines.pop(key, None)
+
+    def expired(self):
+        """Retire et retourne les clés arrivées à échéance"""
+        now = time.monotonic()
+        keys = []
+        with self.lock:
+            while self.heap and self.heap[0][0] <= now:
+                _, key = heapq.heappop(self.heap)
+                deadline = self.deadlines.get(key)
+                if deadline is None:
+                    continue
+                if deadline <= now:
+                    del self.deadlines[key]
+                    keys.append(key)
+                else:
+                    heapq.heappush(self.heap, (deadline, key))
+        return keys
+
+    def sweep(self):
+        """Expire les entrées arrivées à échéance ; retourne leur nombre"""
+        keys = self.expired()
+        for key in keys:
+            try:
+                self.on_expire(key)
+            except Exception as e:
+                print(f"Erreur lors de l'expiration de {key}: {e}")
+        return len(keys)
+
+    def start(self):
+        if self.thread is None:
+            self.thread = threading.Thread(target=self.run, daemon=True)
+            self.thread.start()
+
+    def run(self):
+        while not self.stop_event.wait(self.sweep_interval):
+            self.sweep()
+
+    def close(self):
+        self.stop_event.set()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
@@ -0,0 +1,381 @@
+import bisect
+import itertools
+import re
+import threading
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from quiz_cache import QuestionCache
+from quiz_database import (QuestionType, MAX_RANK_NEIGHBOURS, MAX_SCORES_PAGE, MAX_SEARCH_PAGE,
+                           SCORE_CURSOR_START, current_week_start, format_user_stats, user_stats_params)
+from quiz_leaderboard import Leaderboard
+from quiz_ranking import RankIndex
+from quiz_sessions import PasswordHasher
+from quiz_similarity import (BUCKET_SCAN, ESTIMATE_MARGIN, MAX_CANDIDATES, SIMILARITY_THRESHOLD,
+                             QuestionFeatures, estimated_similarity, jaccard, normalize_text)
+from quiz_storage import QuizStorage
+
+# Poids d'un mot trouvé dans la question, la bonne réponse et les mauvaises
+# réponses pour le tri de search_questions (mêmes rapports que bm25 en SQLite)
+SEARCH_WEIGHTS = (10, 4, 1)
+
+
+def utc_timestamp(moment=None):
+    """Date au format de CURRENT_TIMESTAMP ('AAAA-MM-JJ HH:MM:SS', UTC)"""
+    return (moment or datetime.now(timezone.utc)).strftime('%Y-%m-%d %H:%M:%S')
+
+
+class MemoryStorage(QuizStorage):
+    """Stockage entièrement en mémoire (dictionnaires et listes triées)
+
+    Mêmes résultats que QuizDatabase, sans fichier ni fsync : pour les
+    tests, les mesures de performance et les séances ponctuelles (cours,
+    événements). Tout est perdu à l'arrêt du serveur.
+
+    Les scores sont gardés dans des listes triées par (score décroissant,
+    temps, score_id), une pour tous les thèmes (clé 0) et une par thème,
+    pour paginer par curseur comme la base ; les agrégats par semaine et
+    par joueur sont tenus à jour à chaque score.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.lock = threading.RLock()
+        self.password_hasher = PasswordHasher()
+        self.user_ids = itertools.count(1)
+        self.theme_ids = itertools.count(1)
+        self.question_ids = itertools.count(1)
+        self.score_ids = itertools.count(1)
+
+        self.users = {}          # username -> [user_id, empreinte du mot de passe]
+        self.usernames = {}      # user_id -> username
+        self.themes = {}         # theme_name -> theme_id
+        self.theme_names = {}    # theme_id -> theme_name
+        self.seed_hashes = {}
+
+        # Questions : lignes au format de theme_questions (sans le groupe)
+        self.questions = {}      # question_id -> ligne
+        self.by_theme = {}       # theme_id -> [question_id]
+        self.clusters = {}       # question_id -> groupe de doublons
+        self.features = {}       # question_id -> QuestionFeatures
+        self.fingerprints = {}   # (theme_id, empreinte) -> groupe de doublons
+        self.buckets = {}        # seau LSH -> [question_id]
+        self.search_words = {}   # question_id -> (mots de la question, de la réponse, des mauvaises réponses)
+
+        # Scores
+        self.scores = {}         # score_id -> (user_id, theme_id, score, total_time, played_at)
+        self.score_keys = {0: []}   # theme_id (0 : tous) -> [(-score, total_time, score_id)] triés
+        self.week_best = {}      # (user_id, theme_id, semaine) -> (meilleur score, temps)
+        self.user_stats = {}     # (user_id, theme_id) -> [parties, meilleur score, total, ...]
+
+        self.question_cache = QuestionCache(self.load_theme_questions, self.apply_usage_updates)
+        self.question_cache.start()
+        self.leaderboard = Leaderboard()
+        self.rank_index = RankIndex()
+
+    def add_user(self, username, password):
+        """Ajoute un nouvel utilisateur"""
+        password_hash = self.password_hasher.hash(password)
+        with self.lock:
+            if username in self.users:
+                return False
+            user_id = next(self.user_ids)
+            self.users[username] = [user_id, password_hash]
+            self.usernames[user_id] = username
+        return True
+
+    def verify_user(self, username, password):
+        """Vérifie les identifiants d'un utilisateur"""
+        with self.lock:
+            credentials = self.users.get(username)
+        if credentials is None:
+            return None
+        user_id, stored_hash = credentials
+        valid, needs_rehash = self.password_hasher.check(password, stored_hash)
+        if not valid:
+            return None
+        if needs_rehash:
+            credentials[1] = self.password_hasher.hash(password)
+        return user_id
+
+    def get_username(self, user_id):
+        return self.usernames.get(user_id)
+
+    def get_or_create_theme(self, theme_name):
+        """Retourne l'identifiant d'un thème, en le créant s'il n'existe pas"""
+        with self.lock:
+            theme_id = self.themes.get(theme_name)
+            if theme_id is None:
+                theme_id = self.themes[theme_name] = next(self.theme_ids)
+                self.theme_names[theme_id] = theme_name
+            return theme_id
+
+    def get_theme_name(self, theme_id):
+        return self.theme_names.get(theme_id)
+
+    def get_all_themes(self):
+        """Récupère tous les thèmes"""
+        with self.lock:
+            return sorted(self.theme_names.items())
+
+    def add_question(self, theme_id, question_type, question_text, correct_answer, wrong_answers=None):
+        """Ajoute une nouvelle question (False si elle existe déjà à la normalisation près)"""
+        try:
+            return self.add_questions([(theme_id, question_type, question_text,
+                                        correct_answer, wrong_answers)]) == 1
+        except Exception as e:
+            print(f"Erreur lors de l'ajout de la question: {e}")
+            return False
+
+    def add_questions(self, rows):
+        """Ajoute un lot de questions, avec la même détection de doublons que la base
+
+        Retourne le nombre de questions ajoutées.
+        """
+        prepared = []
+        for theme_id, question_type, question_text, correct_answer, wrong_answers in rows:
+            wrong_answers = list(wrong_answers or [])[:3]
+            wrong_answers += [None] * (3 - len(wrong_answers))
+            prepared.append((theme_id, question_type, question_text, correct_answer, wrong_answers,
+                             QuestionFeatures(theme_id, question_text, correct_answer)))
+
+        inserted = 0
+        theme_ids = set()
+        with self.lock:
+            for theme_id, question_type, question_text, correct_answer, wrong_answers, features in prepared:
+                if (theme_id, features.fingerprint) in self.fingerprints:
+                    continue
+                question_id = next(self.question_ids)
+                cluster_id = self.similar_cluster(features) or question_id
+                self.questions[question_id] = (question_id, theme_id, question_type.value, question_type.value,
+                                               question_text, correct_answer, *wrong_answers, 0, None)
+                self.by_theme.setdefault(theme_id, []).append(question_id)
+                self.clusters[question_id] = cluster_id
+                self.features[question_id] = features
+                self.fingerprints[(theme_id, features.fingerprint)] = cluster_id
+                for bucket in features.buckets:
+                    self.buckets.setdefault(bucket, []).append(question_id)
+                self.search_words[question_id] = (
+                    set(normalize_text(question_text).split()),
+                    set(normalize_text(correct_answer).split()),
+                    set(normalize_text(' '.join(answer for answer in wrong_answers if answer)).split()))
+                theme_ids.add(theme_id)
+                inserted += 1
+
+        for theme_id in theme_ids:
+            self.question_cache.invalidate(theme_id)
+        self.notify_questions_changed(theme_ids)
+        return inserted
+
+    def similar_cluster(self, features):
+        """Groupe de la question la plus proche au-delà du seuil, ou None (appelé avec le verrou)
+
+        Comme similar_questions : au plus BUCKET_SCAN questions lues par
+        seau, puis les MAX_CANDIDATES qui partagent le plus de seaux.
+        """
+        shared = Counter()
+        for bucket in features.buckets:
+            shared.update(self.buckets.get(bucket, ())[:BUCKET_SCAN])
+        best, best_similarity = None, SIMILARITY_THRESHOLD
+        for question_id, _ in shared.most_common(MAX_CANDIDATES):
+            candidate = self.features[question_id]
+            if estimated_similarity(features.signature, candidate.signature) < SIMILARITY_THRESHOLD - ESTIMATE_MARGIN:
+                continue
+            similarity = jaccard(features.shingles, candidate.shingles)
+            if similarity >= best_similarity:
+                best, best_similarity = self.clusters[question_id], similarity
+        return best
+
+    def get_seed_hash(self, seed_name):
+        return self.seed_hashes.get(seed_name)
+
+    def set_seed_hash(self, seed_name, content_hash):
+        self.seed_hashes[seed_name] = content_hash
+
+    def load_theme_questions(self, theme_id):
+        """Questions d'un thème suivies de leur groupe (utilisé par le cache)"""
+        with self.lock:
+            return [self.questions[question_id] + (self.clusters[question_id],)
+                    for question_id in self.by_theme.get(theme_id, ())]
+
+    def apply_usage_updates(self, updates):
+        """Reporte les compteurs d'utilisation cumulés par le cache"""
+        with self.lock:
+            for increment, last_used, question_id in updates:
+                row = self.questions.get(question_id)
+                if row is not None:
+                    self.questions[question_id] = row[:9] + ((row[9] or 0) + increment, last_used)
+
+    def get_questions_for_game(self, theme_id):
+        """Récupère les questions pour une partie en évitant les répétitions"""
+        return self.question_cache.sample(theme_id, {
+            QuestionType.OPEN: 5,
+            QuestionType.QUAD: 10,
+            QuestionType.DUAL: 20
+        })
+
+    def record_question_usage(self, question_ids):
+        """Compte une utilisation des questions d'une partie qui commence"""
+        self.question_cache.record_usage(question_ids)
+
+    def search_questions(self, text, theme_id=None, limit=20, offset=0):
+        """Recherche des questions : tous les mots doivent être présents (`mot*` : préfixe)
+
+        Même format de résultat que QuizDatabase.search_questions ; tri par
+        pertinence (mots trouvés dans la question d'abord), puis question_id.
+        """
+        terms = [(normalize_text(word), star == '*') for word, star in re.findall(r'(\w+)(\*?)', text or '')]
+        terms = [(word, prefix) for word, prefix in terms if word]
+        if not terms:
+            return [], False
+        limit = max(1, min(int(limit), MAX_SEARCH_PAGE))
+        offset = max(0, int(offset))
+
+        def found(word, prefix, words):
+            if prefix:
+                return any(candidate.startswith(word) for candidate in words)
+            return word in words
+
+        matches = []
+        with self.lock:
+            question_ids = self.by_theme.get(theme_id, ()) if theme_id else self.questions
+            for question_id in question_ids:
+                fields = self.search_words[question_id]
+                relevance = 0
+                for word, prefix in terms:
+                    hits = [weight for weight, words in zip(SEARCH_WEIGHTS, fields) if found(word, prefix, words)]
+                    if not hits:
+                        break
+                    relevance += sum(hits)
+                else:
+                    matches.append((-relevance, question_id))
+            matches.sort()
+            rows = []
+            for _, question_id in matches[offset:offset + limit + 1]:
+                row = self.questions[question_id]
+                rows.append((question_id, self.theme_names.get(row[1]), row[2], row[4], row[5]))
+        return rows[:limit], len(rows) > limit
+
+    def save_score(self, user_id, theme_id, score, total_time, answers=None):
+        """Enregistre un score et met à jour les agrégats
+
+        `answers` : détail facultatif des réponses [(valeur du QuestionType,
+        bonne réponse, temps de réponse)] pour les statistiques du joueur.
+        """
+        week = current_week_start()
+        with self.lock:
+            if user_id not in self.usernames:
+                return False
+            score_id = next(self.score_ids)
+            self.scores[score_id] = (user_id, theme_id, score, total_time, utc_timestamp())
+            key = (-score, total_time, score_id)
+            bisect.insort(self.score_keys[0], key)
+            bisect.insort(self.score_keys.setdefault(theme_id, []), key)
+
+            best = self.week_best.get((user_id, theme_id, week))
+            if best is None or (score, -total_time) > (best[0], -best[1]):
+                self.week_best[(user_id, theme_id, week)] = (score, total_time)
+
+            for params in user_stats_params(user_id, theme_id, score, total_time, answers):
+                stats = self.user_stats.get(params[:2])
+                if stats is None:
+                    self.user_stats[params[:2]] = [1, *params[2:]]
+                else:
+                    stats[0] += 1
+                    stats[1] = max(stats[1], params[2])
+                    for index in range(2, len(stats)):
+                        stats[index] += params[index + 1]
+
+        self.rank_index.add_score(user_id, theme_id, score)
+        self.leaderboard.add_score(user_id, week, self.usernames[user_id], theme_id,
+                                   self.get_theme_name(theme_id), score, total_time)
+        return True
+
+    def archive_old_scores(self, max_age_days, chunk_size=1000):
+        """Oublie les scores bruts plus anciens que `max_age_days`
+
+        Les agrégats (meilleurs scores par semaine, statistiques des joueurs)
+        sont conservés. Retourne le nombre de scores retirés.
+        """
+        cutoff = utc_timestamp(datetime.now(timezone.utc) - timedelta(days=int(max_age_days)))
+        with self.lock:
+            old = {score_id for score_id, record in self.scores.items() if record[4] < cutoff}
+            if not old:
+                return 0
+            for score_id in old:
+                del self.scores[score_id]
+            for theme_id, keys in self.score_keys.items():
+                self.score_keys[theme_id] = [key for key in keys if key[2] not in old]
+        return len(old)
+
+    def get_user_stats(self, user_id):
+        """Statistiques d'un joueur : globales et par thème"""
+        overall = None
+        themes = []
+        with self.lock:
+            rows = sorted((theme_id, self.theme_names.get(theme_id), *stats)
+                          for (owner, theme_id), stats in self.user_stats.items() if owner == user_id)
+        for row in rows:
+            stats = format_user_stats(row)
+            if stats['theme_id'] == 0:
+                overall = stats
+            else:
+                themes.append(stats)
+        return {'overall': overall, 'themes': themes}
+
+    def get_user_rank(self, user_id, theme_id=None, count=5):
+        """Rang d'un joueur selon son meilleur score (même format que QuizDatabase)"""
+        count = max(0, min(int(count), MAX_RANK_NEIGHBOURS))
+        rank, total, around = self.rank_index.get(user_id, theme_id, count)
+        return {
+            'rank': rank,
+            'total': total,
+            'around': [(position, self.get_username(other), score) for position, other, score in around]
+        }
+
+    def get_top_scores(self, theme_id=None, limit=10):
+        """Meilleurs scores par joueur et par semaine"""
+        with self.lock:
+            bests = sorted((-score, total_time, user_id, best_theme)
+                           for (user_id, best_theme, _), (score, total_time) in self.week_best.items()
+                           if not theme_id or best_theme == theme_id)
+        if theme_id:
+            return [(self.usernames[user_id], -score, total_time) for score, total_time, user_id, _ in bests[:limit]]
+        return [(self.usernames[user_id], self.theme_names[best_theme], -score, total_time)
+                for score, total_time, user_id, best_theme in bests[:limit]]
+
+    def get_scores_page(self, theme_id=None, cursor=None, limit=20, since=None, until=None):
+        """Une page de tous les scores, du meilleur au moins bon (même curseur que QuizDatabase)"""
+        limit = max(1, min(int(limit), MAX_SCORES_PAGE))
+        if cursor is None:
+            score, total_time, score_id = SCORE_CURSOR_START, 0, 0
+        else:
+            score, total_time, score_id = int(cursor[0]), float(cursor[1]), int(cursor[2])
+
+        rows = []
+        last_key = None
+        with self.lock:
+            keys = self.score_keys.get(theme_id or 0, [])
+            index = bisect.bisect_right(keys, (-score, total_time, score_id))
+            while index < len(keys) and len(rows) <= limit:
+                key = keys[index]
+                index += 1
+                user_id, score_theme, value, time_taken, played_at = self.scores[key[2]]
+                if (since is not None and played_at < since) or (until is not None and played_at >= until):
+                    continue
+                if len(rows) == limit:
+                    # Il reste au moins un score : la page a une suite
+                    return rows, [-last_key[0], last_key[1], last_key[2]]
+                rows.append((self.usernames[user_id], self.theme_names[score_theme], value, time_taken, played_at))
+                last_key = key
+        return rows, None
+
+    def get_leaderboard(self, theme_id=None, limit=10):
+        """Récupère le classement (get_top_scores au-delà du top K)"""
+        scores = self.leaderboard.get(theme_id, limit)
+        if scores is None:
+            scores = self.get_top_scores(theme_id, limit)
+        return scores
+
+    def close(self):
+        self.question_cache.close()
+        self.password_hasher.close()
@@ -0,0 +1,433 @@
+import argparse
+import sqlite3
+import time
+from quiz_similarity import DuplicateMatcher, QuestionFeatures
+
+# Migrations du schéma, suivies par PRAGMA user_version.
+#
+# Chaque migration est une suite d'étapes exécutées dans l'ordre. Une étape
+# « simple » (liste d'instructions SQL ou fonction recevant la connexion) est
+# exécutée dans sa propre transaction ; une étape Backfill met à jour une
+# table par tranches de clés primaires, avec un commit par tranche. L'avancement
+# est enregistré dans schema_migration_progress : une migration interrompue
+# reprend à l'étape (ou à la tranche) où elle s'était arrêtée.
+
+
+# Fusion d'un agrégat de score_rollups avec une ligne existante (mêmes période,
+# joueur et thème) : garde le meilleur score et son temps, cumule le reste.
+ROLLUP_CONFLICT = '''
+    ON CONFLICT (period, period_start, user_id, theme_id) DO UPDATE SET
+        best_time = CASE
+            WHEN excluded.best_score > best_score THEN excluded.best_time
+            WHEN excluded.best_score = best_score THEN MIN(best_time, excluded.best_time)
+            ELSE best_time
+        END,
+        best_score = MAX(best_score, excluded.best_score),
+        games_played = games_played + excluded.games_played,
+        total_time = total_time + excluded.total_time
+'''
+
+# Fusion d'une ligne de user_stats avec la ligne existante du même joueur et thème
+USER_STATS_CONFLICT = '''
+    ON CONFLICT (user_id, theme_id) DO UPDATE SET
+        games_played = games_played + excluded.games_played,
+        best_score = MAX(best_score, excluded.best_score),
+        total_score = total_score + excluded.total_score,
+        total_answer_time = total_answer_time + excluded.total_answer_time,
+        answers_count = answers_count + excluded.answers_count,
+        correct_dual = correct_dual + excluded.correct_dual,
+        total_dual = total_dual + excluded.total_dual,
+        correct_quad = correct_quad + excluded.correct_quad,
+        total_quad = total_quad + excluded.total_quad,
+        correct_open = correct_open + excluded.correct_open,
+        total_open = total_open + excluded.total_open
+'''
+
+# Reprise de l'historique dans user_stats : le détail des réponses n'était pas
+# conservé, chaque partie compte pour une réponse de durée égale à son temps moyen.
+USER_STATS_BACKFILL = '''
+    INSERT INTO user_stats (user_id, theme_id, games_played, best_score, total_score,
+                            total_answer_time, answers_count)
+    SELECT user_id, {theme}, COUNT(*), MAX(score), SUM(score), SUM(total_time), COUNT(*)
+    FROM {table}
+    WHERE score_id >= ? AND score_id < ? AND user_id IS NOT NULL
+    GROUP BY user_id{group}
+''' + USER_STATS_CONFLICT
+
+
+class Backfill:
+    """Mise à jour d'une table par tranches de clés primaires
+
+    `sql` reçoit deux paramètres : le début (inclus) et la fin (exclue) de
+    la tranche, par exemple `UPDATE t SET ... WHERE id >= ? AND id < ?`.
+    Ce peut aussi être une fonction `sql(conn, début, fin)` pour une mise à
+    jour calculée en Python ; elle est exécutée dans la transaction de la tranche.
+    """
+
+    def __init__(self, table, key, sql, chunk_size=1000):
+        self.table = table
+        self.key = key
+        self.sql = sql
+        self.chunk_size = chunk_size
+
+
+class Migration:
+    def __init__(self, version, description, steps):
+        self.version = version
+        self.description = description
+        self.steps = steps
+
+
+def cluster_existing_questions(conn, start, end):
+    """Calcule empreintes, seaux et groupes de doublons des questions déjà en base
+
+    Appelée par tranche de question_id (Backfill) : les questions des
+    tranches précédentes sont déjà dans les seaux et servent de candidates.
+    Les doublons existants sont regroupés, pas supprimés.
+    """
+    from quiz_queries import QueryRunner  # quiz_queries importe ce module
+    queries = QueryRunner(conn)
+    matcher = DuplicateMatcher(queries)
+    rows = conn.execute('''
+        SELECT question_id, theme_id, question_text, correct_answer
+        FROM questions WHERE question_id >= ? AND question_id < ? ORDER BY question_id
+    ''', (start, end)).fetchall()
+    for question_id, theme_id, question_text, correct_answer in rows:
+        features = QuestionFeatures(theme_id, question_text, correct_answer)
+        cluster_id = matcher.exact_duplicate(features) or matcher.similar_cluster(features)
+        queries.execute('set_question_cluster',
+                        (features.fingerprint, features.signature, cluster_id, question_id))
+        matcher.add(question_id, features)
+
+
+MIGRATIONS = [
+    Migration(1, "Schéma initial", [[
+        # Table des utilisateurs
+        '''
+        CREATE TABLE IF NOT EXISTS users (
+            user_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            username TEXT UNIQUE NOT NULL,
+            password_hash TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        ''',
+        # Table des thèmes
+        '''
+        CREATE TABLE IF NOT EXISTS themes (
+            theme_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            theme_name TEXT UNIQUE NOT NULL
+        )
+        ''',
+        # Table des questions
+        '''
+        CREATE TABLE IF NOT EXISTS questions (
+            question_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            theme_id INTEGER,
+            question_type INTEGER NOT NULL,
+            points INTEGER NOT NULL,
+            question_text TEXT NOT NULL,
+            correct_answer TEXT NOT NULL,
+            wrong_answer1 TEXT,
+            wrong_answer2 TEXT,
+            wrong_answer3 TEXT,
+            used_count INTEGER DEFAULT 0,
+            last_used TIMESTAMP,
+            FOREIGN KEY (theme_id) REFERENCES themes (theme_id)
+        )
+        ''',
+        # Table des scores
+        '''
+        CREATE TABLE IF NOT EXISTS scores (
+            score_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER,
+            theme_id INTEGER,
+            score INTEGER NOT NULL,
+            total_time FLOAT NOT NULL,
+            played_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (user_id) REFERENCES users (user_id),
+            FOREIGN KEY (theme_id) REFERENCES themes (theme_id)
+        )
+        ''',
+    ]]),
+    Migration(2, "Versions des données initiales", [[
+        # Versions des données initiales déjà chargées (empreinte du fichier)
+        '''
+        CREATE TABLE IF NOT EXISTS seed_versions (
+            seed_name TEXT PRIMARY KEY,
+            content_hash TEXT NOT NULL,
+            applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        ''',
+    ]]),
+    Migration(3, "Index de sélection des questions et des classements", [
+        Backfill('questions', 'question_id', '''
+            UPDATE questions SET used_count = 0
+            WHERE question_id >= ? AND question_id < ? AND used_count IS NULL
+        '''),
+        # Un index par étape : le verrou d'écriture n'est tenu que le temps d'un index
+        ['CREATE INDEX IF NOT EXISTS idx_questions_theme_type ON questions (theme_id, question_type)'],
+        ['CREATE INDEX IF NOT EXISTS idx_scores_theme_rank ON scores (theme_id, score DESC, total_time)'],
+        ['CREATE INDEX IF NOT EXISTS idx_scores_rank ON scores (score DESC, total_time)'],
+    ]),
+    Migration(4, "Agrégats de scores par jour et par semaine, archive des scores", [
+        [
+            # Meilleur score, parties jouées et temps cumulé par joueur, thème et période
+            '''
+            CREATE TABLE IF NOT EXISTS score_rollups (
+                period TEXT NOT NULL,
+                period_start DATE NOT NULL,
+                user_id INTEGER NOT NULL,
+                theme_id INTEGER NOT NULL,
+                best_score INTEGER NOT NULL,
+                best_time FLOAT NOT NULL,
+                games_played INTEGER NOT NULL,
+                total_time FLOAT NOT NULL,
+                PRIMARY KEY (period, period_start, user_id, theme_id)
+            )
+            ''',
+            # Scores bruts sortis de la table scores par la rétention
+            '''
+            CREATE TABLE IF NOT EXISTS scores_archive (
+                score_id INTEGER PRIMARY KEY,
+                user_id INTEGER,
+                theme_id INTEGER,
+                score INTEGER NOT NULL,
+                total_time FLOAT NOT NULL,
+                played_at TIMESTAMP
+            )
+            ''',
+        ],
+        Backfill('scores', 'score_id', '''
+            INSERT INTO score_rollups (period, period_start, user_id, theme_id,
+                                       best_score, best_time, games_played, total_time)
+            SELECT 'day', date(played_at), user_id, theme_id,
+                   MAX(score), total_time, COUNT(*), SUM(total_time)
+            FROM scores
+            WHERE score_id >= ? AND score_id < ?
+            GROUP BY date(played_at), user_id, theme_id
+        ''' + ROLLUP_CONFLICT),
+        Backfill('scores', 'score_id', '''
+            INSERT INTO score_rollups (period, period_start, user_id, theme_id,
+                                       best_score, best_time, games_played, total_time)
+            SELECT 'week', date(played_at, '-6 days', 'weekday 1'), user_id, theme_id,
+                   MAX(score), total_time, COUNT(*), SUM(total_time)
+            FROM scores
+            WHERE score_id >= ? AND score_id < ?
+            GROUP BY date(played_at, '-6 days', 'weekday 1'), user_id, theme_id
+        ''' + ROLLUP_CONFLICT),
+        ['CREATE INDEX IF NOT EXISTS idx_rollups_theme_rank ON score_rollups (period, theme_id, best_score DESC, best_time)'],
+        ['CREATE INDEX IF NOT EXISTS idx_rollups_rank ON score_rollups (period, best_score DESC, best_time)'],
+        ['CREATE INDEX IF NOT EXISTS idx_scores_played_at ON scores (played_at)'],
+    ]),
+    Migration(5, "Statistiques par joueur", [
+        [
+            # Une ligne par joueur et par thème, theme_id = 0 pour tous thèmes confondus
+            '''
+            CREATE TABLE IF NOT EXISTS user_stats (
+                user_id INTEGER NOT NULL,
+                theme_id INTEGER NOT NULL,
+                games_played INTEGER NOT NULL DEFAULT 0,
+                best_score INTEGER NOT NULL DEFAULT 0,
+                total_score INTEGER NOT NULL DEFAULT 0,
+                total_answer_time FLOAT NOT NULL DEFAULT 0,
+                answers_count INTEGER NOT NULL DEFAULT 0,
+                correct_dual INTEGER NOT NULL DEFAULT 0,
+                total_dual INTEGER NOT NULL DEFAULT 0,
+                correct_quad INTEGER NOT NULL DEFAULT 0,
+                total_quad INTEGER NOT NULL DEFAULT 0,
+                correct_open INTEGER NOT NULL DEFAULT 0,
+                total_open INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (user_id, theme_id)
+            )
+            ''',
+        ],
+        Backfill('scores', 'score_id',
+                 USER_STATS_BACKFILL.format(table='scores', theme='theme_id', group=', theme_id')),
+        Backfill('scores', 'score_id',
+                 USER_STATS_BACKFILL.format(table='scores', theme='0', group='')),
+        Backfill('scores_archive', 'score_id',
+                 USER_STATS_BACKFILL.format(table='scores_archive', theme='theme_id', group=', theme_id')),
+        Backfill('scores_archive', 'score_id',
+                 USER_STATS_BACKFILL.format(table='scores_archive', theme='0', group='')),
+    ]),
+    Migration(6, "Index plein texte des questions", [[
+        # Index FTS5 à contenu externe : le texte reste dans questions, sans accents
+        # ni casse pour la recherche
+        '''
+        CREATE VIRTUAL TABLE IF NOT EXISTS questions_fts USING fts5(
+            question_text, correct_answer, wrong_answer1, wrong_answer2, wrong_answer3,
+            content='questions', content_rowid='question_id',
+            tokenize='unicode61 remove_diacritics 2'
+        )
+        ''',
+        # Synchronisation par déclencheurs ; les mises à jour de used_count ne
+        # touchent pas à l'index
+        '''
+        CREATE TRIGGER IF NOT EXISTS questions_fts_insert AFTER INSERT ON questions BEGIN
+            INSERT INTO questions_fts (rowid, question_text, correct_answer,
+                                       wrong_answer1, wrong_answer2, wrong_answer3)
+            VALUES (new.question_id, new.question_text, new.correct_answer,
+                    new.wrong_answer1, new.wrong_answer2, new.wrong_answer3);
+        END
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS questions_fts_delete AFTER DELETE ON questions BEGIN
+            INSERT INTO questions_fts (questions_fts, rowid, question_text, correct_answer,
+                                       wrong_answer1, wrong_answer2, wrong_answer3)
+            VALUES ('delete', old.question_id, old.question_text, old.correct_answer,
+                    old.wrong_answer1, old.wrong_answer2, old.wrong_answer3);
+        END
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS questions_fts_update
+        AFTER UPDATE OF question_text, correct_answer, wrong_answer1, wrong_answer2, wrong_answer3
+        ON questions BEGIN
+            INSERT INTO questions_fts (questions_fts, rowid, question_text, correct_answer,
+                                       wrong_answer1, wrong_answer2, wrong_answer3)
+            VALUES ('delete', old.question_id, old.question_text, old.correct_answer,
+                    old.wrong_answer1, old.wrong_answer2, old.wrong_answer3);
+            INSERT INTO questions_fts (rowid, question_text, correct_answer,
+                                       wrong_answer1, wrong_answer2, wrong_answer3)
+            VALUES (new.question_id, new.question_text, new.correct_answer,
+                    new.wrong_answer1, new.wrong_answer2, new.wrong_answer3);
+        END
+        ''',
+        # Indexation des questions existantes, dans la même transaction que les
+        # déclencheurs pour qu'aucune question ne soit oubliée ou indexée deux fois
+        "INSERT INTO questions_fts (questions_fts) VALUES ('rebuild')",
+    ]]),
+    Migration(7, "Groupes de questions en double", [
+        [
+            # Empreinte du texte normalisé, signature MinHash et groupe de doublons
+            # (NULL : la question est seule dans son groupe, identifié par son question_id)
+            'ALTER TABLE questions ADD COLUMN fingerprint INTEGER',
+            'ALTER TABLE questions ADD COLUMN signature BLOB',
+            'ALTER TABLE questions ADD COLUMN cluster_id INTEGER',
+            'CREATE INDEX IF NOT EXISTS idx_questions_fingerprint ON questions (theme_id, fingerprint)',
+            # Seaux LSH des signatures MinHash, pour trouver les quasi-doublons
+            '''
+            CREATE TABLE IF NOT EXISTS question_buckets (
+                bucket INTEGER NOT NULL,
+                question_id INTEGER NOT NULL
+            )
+            ''',
+            'CREATE INDEX IF NOT EXISTS idx_question_buckets ON question_buckets (bucket)',
+        ],
+        Backfill('questions', 'question_id', cluster_existing_questions, chunk_size=500),
+    ]),
+]
+
+
+def get_schema_version(conn):
+    return conn.execute('PRAGMA user_version').fetchone()[0]
+
+
+def run_step(conn, step):
+    if callable(step):
+        step(conn)
+    else:
+        for sql in step:
+            conn.execute(sql)
+
+
+def record_progress(conn, version, steps_done, last_key=None):
+    conn.execute('''
+    INSERT OR REPLACE INTO schema_migration_progress (version, steps_done, last_key)
+    VALUES (?, ?, ?)
+    ''', (version, steps_done, last_key))
+
+
+def run_backfill(conn, version, step_index, backfill, last_key, pause):
+    """Exécute un Backfill tranche par tranche, en reprenant après `last_key`"""
+    bounds = conn.execute(f'SELECT MIN({backfill.key}), MAX({backfill.key}) FROM {backfill.table}').fetchone()
+    if bounds[0] is None:
+        return
+    start = bounds[0] if last_key is None else last_key
+    while start <= bounds[1]:
+        end = start + backfill.chunk_size
+        conn.execute('BEGIN')
+        try:
+            if callable(backfill.sql):
+                backfill.sql(conn, start, end)
+            else:
+                conn.execute(backfill.sql, (start, end))
+            record_progress(conn, version, step_index, end)
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        start = end
+        # Laisse passer les écritures du serveur entre deux tranches
+        if pause:
+            time.sleep(pause)
+
+
+def migrate(conn, migrations=MIGRATIONS, pause=0.0, verbose=False):
+    """Applique les migrations dont la version dépasse PRAGMA user_version"""
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS schema_migration_progress (
+        version INTEGER PRIMARY KEY,
+        steps_done INTEGER NOT NULL,
+        last_key INTEGER
+    )
+    ''')
+    conn.commit()
+
+    current = get_schema_version(conn)
+    for migration in sorted(migrations, key=lambda m: m.version):
+        if migration.version <= current:
+            continue
+        if verbose:
+            print(f"Migration {migration.version}: {migration.description}")
+
+        progress = conn.execute(
+            'SELECT steps_done, last_key FROM schema_migration_progress WHERE version = ?',
+            (migration.version,)).fetchone()
+        steps_done, last_key = progress if progress else (0, None)
+
+        for index, step in enumerate(migration.steps):
+            if index < steps_done:
+                continue
+            if isinstance(step, Backfill):
+                run_backfill(conn, migration.version, index, step, last_key, pause)
+                last_key = None
+                conn.execute('BEGIN')
+                record_progress(conn, migration.version, index + 1)
+                conn.commit()
+            else:
+                conn.execute('BEGIN')
+                try:
+                    run_step(conn, step)
+                    record_progress(conn, migration.version, index + 1)
+                    conn.commit()
+                except BaseException:
+                    conn.rollback()
+                    raise
+            if pause:
+                time.sleep(pause)
+
+        conn.execute('BEGIN')
+        conn.execute(f'PRAGMA user_version = {int(migration.version)}')
+        conn.execute('DELETE FROM schema_migration_progress WHERE version = ?', (migration.version,))
+        conn.commit()
+        current = migration.version
+    return current
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Met à jour le schéma d'une base quiz")
+    parser.add_argument('db', nargs='?', default='quiz.db')
+    parser.add_argument('--pause', type=float, default=0.05,
+                        help="pause en secondes entre deux tranches (base utilisée par un serveur)")
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(args.db, timeout=30)
+    try:
+        version = migrate(conn, pause=args.pause, verbose=True)
+        print(f"Schéma à jour (version {version})")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
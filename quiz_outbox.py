@@ -0,0 +1,41 @@
+import json
+import queue
+import threading
+
+
+class ClientOutbox:
+    """File d'envoi d'une connexion client, vidée par un thread dédié
+
+    Les réponses aux commandes et les messages poussés (questions passées
+    d'office par la roue des échéances) sont mis en file, une ligne JSON par
+    message, sans jamais attendre le réseau : un client lent ou bloqué ne
+    retarde que sa propre connexion.
+    """
+
+    def __init__(self, client_socket):
+        self.client_socket = client_socket
+        self.queue = queue.Queue()
+        self.thread = None
+
+    def start(self):
+        if self.thread is None:
+            self.thread = threading.Thread(target=self.run, daemon=True)
+            self.thread.start()
+
+    def send(self, message):
+        self.queue.put((json.dumps(message) + '\n').encode('utf-8'))
+
+    def run(self):
+        while True:
+            data = self.queue.get()
+            if data is None:
+                return
+            try:
+                self.client_socket.sendall(data)
+            except OSError as e:
+                print(f"Erreur lors de l'envoi au client: {e}")
+                return
+
+    def close(self):
+        """Arrête le thread après les messages déjà en file"""
+        self.queue.put(None)
@@ -0,0 +1,103 @@
+import queue
+import threading
+from collections import deque
+
+
+class GamePacks:
+    """Files de parties prêtes à jouer, par thème
+
+    Un thread prépare à l'avance, pour chaque thème joué, jusqu'à `depth`
+    paquets de questions (tirées, dédoublonnées et mélangées par
+    `build_pack(theme_id)`). Démarrer une partie revient alors à retirer un
+    paquet de la file ; le thread en prépare un autre aussitôt. Quand les
+    questions d'un thème changent, `invalidate` jette ses paquets : ceux en
+    cours de préparation sont ignorés grâce au numéro de génération du thème.
+    Un paquet jeté sans avoir été joué est rendu à `discard_pack(paquet)` ;
+    un paquet remis à une partie est signalé à `use_pack(paquet)`.
+    """
+
+    def __init__(self, build_pack, depth=2, discard_pack=None, use_pack=None):
+        self.build_pack = build_pack    # theme_id -> paquet, ou None si pas assez de questions
+        self.discard_pack = discard_pack
+        self.use_pack = use_pack
+        self.depth = depth
+        self.ready = {}                 # theme_id -> deque de paquets
+        self.generations = {}           # theme_id -> numéro, augmenté à chaque invalidation
+        self.requests = queue.Queue()   # thèmes à compléter
+        self.lock = threading.Lock()
+        self.thread = None
+
+    def start(self):
+        if self.thread is None:
+            self.thread = threading.Thread(target=self.run, daemon=True)
+            self.thread.start()
+
+    def take(self, theme_id):
+        """Retire un paquet prêt (ou le prépare tout de suite si la file est vide)"""
+        with self.lock:
+            packs = self.ready.get(theme_id)
+            pack = packs.popleft() if packs else None
+        self.request(theme_id)
+        if pack is None:
+            pack = self.build_pack(theme_id)
+        if pack is not None and self.use_pack is not None:
+            self.use_pack(pack)
+        return pack
+
+    def request(self, theme_id):
+        """Demande au thread de compléter la file d'un thème"""
+        self.requests.put(theme_id)
+
+    def invalidate(self, theme_id=None):
+        """Jette les paquets d'un thème (ou de tous) dont les questions ont changé"""
+        dropped = []
+        with self.lock:
+            theme_ids = list(self.ready) if theme_id is None else [theme_id]
+            for changed in theme_ids:
+                dropped.extend(self.ready.pop(changed, ()))
+                self.generations[changed] = self.generations.get(changed, 0) + 1
+        self.discard(dropped)
+        for changed in theme_ids:
+            self.request(changed)
+
+    def discard(self, packs):
+        if self.discard_pack is not None:
+            for pack in packs:
+                self.discard_pack(pack)
+
+    def run(self):
+        while True:
+            theme_id = self.requests.get()
+            if theme_id is None:
+                return
+            try:
+                self.refill(theme_id)
+            except Exception as e:
+                print(f"Erreur lors de la préparation des parties du thème {theme_id}: {e}")
+
+    def refill(self, theme_id):
+        while True:
+            with self.lock:
+                if len(self.ready.get(theme_id, ())) >= self.depth:
+                    return
+                generation = self.generations.get(theme_id, 0)
+            pack = self.build_pack(theme_id)
+            if pack is None:
+                return
+            with self.lock:
+                # Paquet préparé avant une invalidation : ses questions ne sont plus à jour
+                stale = self.generations.get(theme_id, 0) != generation
+                if not stale:
+                    self.ready.setdefault(theme_id, deque()).append(pack)
+            if stale:
+                self.discard([pack])
+
+    def close(self):
+        if self.thread is not None:
+            self.requests.put(None)
+            self.thread.join()
+            self.thread = None
+        with self.lock:
+            dropped = [pack for packs in self.ready.values() for pack in packs]
+            self.ready.clear()
+        self.discard(dropped)
@@ -0,0 +1,322 @@
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+from quiz_migrations import ROLLUP_CONFLICT, USER_STATS_CONFLICT
+from quiz_similarity import BANDS, BUCKET_SCAN, MAX_CANDIDATES
+
+# Page de scores en pagination par curseur, dans l'ordre (score décroissant,
+# temps croissant, score_id croissant). Le curseur est la clé de la dernière
+# ligne vue ; la suite est l'union de deux parcours d'index bornés : la fin
+# des ex aequo du score du curseur, puis les scores inférieurs. `{theme}`
+# est remplacé par le filtre de thème.
+SCORES_PAGE = '''
+    SELECT users.username, themes.theme_name, page.score, page.total_time,
+           page.played_at, page.score_id
+    FROM (
+        SELECT * FROM (
+            SELECT score_id, user_id, theme_id, score, total_time, played_at
+            FROM scores
+            WHERE {theme} score = :score AND (total_time, score_id) > (:total_time, :score_id)
+              AND (:since IS NULL OR played_at >= :since) AND (:until IS NULL OR played_at < :until)
+            ORDER BY total_time, score_id
+            LIMIT :limit
+        )
+        UNION ALL
+        SELECT * FROM (
+            SELECT score_id, user_id, theme_id, score, total_time, played_at
+            FROM scores
+            WHERE {theme} score < :score
+              AND (:since IS NULL OR played_at >= :since) AND (:until IS NULL OR played_at < :until)
+            ORDER BY score DESC, total_time, score_id
+            LIMIT :limit
+        )
+    ) AS page
+    JOIN users ON page.user_id = users.user_id
+    JOIN themes ON page.theme_id = themes.theme_id
+    ORDER BY page.score DESC, page.total_time, page.score_id
+    LIMIT :limit
+'''
+
+# Recherche plein texte dans les questions (index FTS5 questions_fts), triée
+# par pertinence : le texte de la question pèse plus que la bonne réponse,
+# elle-même plus que les mauvaises réponses. `{theme}` est le filtre de thème.
+SEARCH_QUESTIONS = '''
+    SELECT questions.question_id, themes.theme_name, questions.question_type,
+           questions.question_text, questions.correct_answer
+    FROM questions_fts
+    JOIN questions ON questions.question_id = questions_fts.rowid
+    LEFT JOIN themes ON questions.theme_id = themes.theme_id
+    WHERE questions_fts MATCH ? {theme}
+    ORDER BY bm25(questions_fts, 10.0, 4.0, 1.0, 1.0, 1.0), questions.question_id
+    LIMIT ? OFFSET ?
+'''
+
+# Questions d'un seau LSH (une sous-requête par bande dans similar_questions)
+BUCKET_MEMBERS = f'SELECT * FROM (SELECT question_id FROM question_buckets WHERE bucket = ? LIMIT {BUCKET_SCAN})'
+
+# Requêtes nommées : le texte SQL est fixe, donc chaque requête n'est
+# analysée et planifiée qu'une fois par connexion puis reprise dans le
+# cache d'instructions de sqlite3.
+STATEMENTS = {
+    'insert_user': '''
+        INSERT INTO users (username, password_hash)
+        VALUES (?, ?)
+    ''',
+    'user_credentials': 'SELECT user_id, password_hash FROM users WHERE username = ?',
+    'update_password_hash': 'UPDATE users SET password_hash = ? WHERE user_id = ?',
+    'username': 'SELECT username FROM users WHERE user_id = ?',
+    'all_themes': 'SELECT theme_id, theme_name FROM themes',
+    'theme_name': 'SELECT theme_name FROM themes WHERE theme_id = ?',
+    'insert_theme': 'INSERT OR IGNORE INTO themes (theme_name) VALUES (?)',
+    'theme_id': 'SELECT theme_id FROM themes WHERE theme_name = ?',
+    'insert_question': '''
+        INSERT INTO questions (
+            theme_id, question_type, points, question_text,
+            correct_answer, wrong_answer1, wrong_answer2, wrong_answer3,
+            fingerprint, signature, cluster_id
+        )
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ''',
+    # Colonnes envoyées au client, puis le groupe de doublons de la question
+    'theme_questions': '''
+        SELECT question_id, theme_id, question_type, points, question_text,
+               correct_answer, wrong_answer1, wrong_answer2, wrong_answer3,
+               used_count, last_used, IFNULL(cluster_id, question_id)
+        FROM questions
+        WHERE theme_id = ?
+    ''',
+    # Doublons et quasi-doublons (voir quiz_similarity)
+    'question_by_fingerprint': '''
+        SELECT IFNULL(cluster_id, question_id) FROM questions
+        WHERE theme_id = ? AND fingerprint = ?
+        LIMIT 1
+    ''',
+    # Candidates partageant le plus de seaux (les vrais doublons en partagent
+    # plusieurs) ; la lecture de chaque seau est bornée pour que les seaux très
+    # fréquents ne coûtent pas plus cher que les autres
+    'similar_questions': f'''
+        SELECT questions.signature, questions.question_text, questions.correct_answer,
+               IFNULL(questions.cluster_id, questions.question_id)
+        FROM (
+            SELECT question_id, COUNT(*) AS shared
+            FROM ({' UNION ALL '.join([BUCKET_MEMBERS] * BANDS)})
+            GROUP BY question_id
+            ORDER BY shared DESC
+            LIMIT {MAX_CANDIDATES}
+        ) AS candidates
+        JOIN questions ON questions.question_id = candidates.question_id
+    ''',
+    'insert_question_bucket': 'INSERT INTO question_buckets (bucket, question_id) VALUES (?, ?)',
+    'set_question_cluster': '''
+        UPDATE questions SET fingerprint = ?, signature = ?, cluster_id = ?
+        WHERE question_id = ?
+    ''',
+    'search_questions_theme': SEARCH_QUESTIONS.format(theme='AND questions.theme_id = ?'),
+    'search_questions_all': SEARCH_QUESTIONS.format(theme=''),
+    'update_usage': '''
+        UPDATE questions
+        SET used_count = used_count + ?,
+            last_used = ?
+        WHERE question_id = ?
+    ''',
+    'insert_score': '''
+        INSERT INTO scores (user_id, theme_id, score, total_time)
+        VALUES (?, ?, ?, ?)
+    ''',
+    'seed_hash': 'SELECT content_hash FROM seed_versions WHERE seed_name = ?',
+    'set_seed_hash': '''
+        INSERT OR REPLACE INTO seed_versions (seed_name, content_hash, applied_at)
+        VALUES (?, ?, CURRENT_TIMESTAMP)
+    ''',
+    'rollup_day': '''
+        INSERT INTO score_rollups (period, period_start, user_id, theme_id,
+                                   best_score, best_time, games_played, total_time)
+        VALUES ('day', date('now'), ?, ?, ?, ?, 1, ?)
+    ''' + ROLLUP_CONFLICT,
+    'rollup_week': '''
+        INSERT INTO score_rollups (period, period_start, user_id, theme_id,
+                                   best_score, best_time, games_played, total_time)
+        VALUES ('week', date('now', '-6 days', 'weekday 1'), ?, ?, ?, ?, 1, ?)
+    ''' + ROLLUP_CONFLICT,
+    'upsert_user_stats': '''
+        INSERT INTO user_stats (user_id, theme_id, games_played, best_score, total_score,
+                                total_answer_time, answers_count, correct_dual, total_dual,
+                                correct_quad, total_quad, correct_open, total_open)
+        VALUES (?, ?, 1, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ''' + USER_STATS_CONFLICT,
+    'user_stats': '''
+        SELECT user_stats.theme_id, themes.theme_name, games_played, best_score, total_score,
+               total_answer_time, answers_count, correct_dual, total_dual,
+               correct_quad, total_quad, correct_open, total_open
+        FROM user_stats
+        LEFT JOIN themes ON user_stats.theme_id = themes.theme_id
+        WHERE user_stats.user_id = ?
+        ORDER BY user_stats.theme_id
+    ''',
+    # Classements : meilleur score de chaque joueur par semaine (agrégats)
+    'user_best_scores': 'SELECT user_id, theme_id, best_score FROM user_stats',
+    'top_scores_theme': '''
+        SELECT users.username, score_rollups.best_score, score_rollups.best_time
+        FROM score_rollups
+        JOIN users ON score_rollups.user_id = users.user_id
+        WHERE score_rollups.period = 'week' AND score_rollups.theme_id = ?
+        ORDER BY score_rollups.best_score DESC, score_rollups.best_time ASC
+        LIMIT ?
+    ''',
+    'top_scores_all': '''
+        SELECT users.username, themes.theme_name, score_rollups.best_score, score_rollups.best_time
+        FROM score_rollups
+        JOIN users ON score_rollups.user_id = users.user_id
+        JOIN themes ON score_rollups.theme_id = themes.theme_id
+        WHERE score_rollups.period = 'week'
+        ORDER BY score_rollups.best_score DESC, score_rollups.best_time ASC
+        LIMIT ?
+    ''',
+    'leaderboard_theme_rows': '''
+        SELECT score_rollups.user_id, score_rollups.period_start,
+               users.username, score_rollups.best_score, score_rollups.best_time
+        FROM score_rollups
+        JOIN users ON score_rollups.user_id = users.user_id
+        WHERE score_rollups.period = 'week' AND score_rollups.theme_id = ?
+        ORDER BY score_rollups.best_score DESC, score_rollups.best_time ASC
+        LIMIT ?
+    ''',
+    'leaderboard_all_rows': '''
+        SELECT score_rollups.user_id, score_rollups.period_start, score_rollups.theme_id,
+               users.username, themes.theme_name, score_rollups.best_score, score_rollups.best_time
+        FROM score_rollups
+        JOIN users ON score_rollups.user_id = users.user_id
+        JOIN themes ON score_rollups.theme_id = themes.theme_id
+        WHERE score_rollups.period = 'week'
+        ORDER BY score_rollups.best_score DESC, score_rollups.best_time ASC
+        LIMIT ?
+    ''',
+    'scores_page_theme': SCORES_PAGE.format(theme='theme_id = :theme_id AND'),
+    'scores_page_all': SCORES_PAGE.format(theme=''),
+    # Rétention des scores bruts
+    'retention_cutoff': "SELECT datetime('now', ?)",
+    'archive_bound': '''
+        SELECT MAX(score_id) FROM (
+            SELECT score_id FROM scores
+            WHERE played_at < ?
+            ORDER BY score_id
+            LIMIT ?
+        )
+    ''',
+    'archive_scores': '''
+        INSERT OR REPLACE INTO scores_archive (score_id, user_id, theme_id, score, total_time, played_at)
+        SELECT score_id, user_id, theme_id, score, total_time, played_at
+        FROM scores
+        WHERE score_id <= ? AND played_at < ?
+    ''',
+    'delete_archived_scores': 'DELETE FROM scores WHERE score_id <= ? AND played_at < ?',
+}
+
+
+def scalar_row(cursor, row):
+    """Fabrique de lignes pour les requêtes à une colonne : renvoie la valeur seule"""
+    return row[0]
+
+
+# Les requêtes absentes de ce dictionnaire renvoient les tuples natifs de
+# sqlite3, sans reconstruction de ligne.
+ROW_FACTORIES = {
+    'username': scalar_row,
+    'theme_name': scalar_row,
+    'theme_id': scalar_row,
+    'seed_hash': scalar_row,
+    'question_by_fingerprint': scalar_row,
+    'retention_cutoff': scalar_row,
+    'archive_bound': scalar_row,
+}
+
+# Marge pour les requêtes construites ailleurs (création des tables, etc.)
+STATEMENT_CACHE_SIZE = len(STATEMENTS) + 32
+
+
+def connect(db_name):
+    """Ouvre une connexion dont le cache d'instructions contient toutes les requêtes nommées"""
+    return sqlite3.connect(db_name, check_same_thread=False,
+                           cached_statements=STATEMENT_CACHE_SIZE)
+
+
+class QueryRunner:
+    """Exécution thread-safe des requêtes nommées sur une connexion
+
+    Chaque requête garde son propre curseur, configuré une fois avec sa
+    fabrique de lignes ; un verrou réentrant sérialise l'accès à la
+    connexion partagée entre les threads du serveur.
+    """
+
+    def __init__(self, conn, statements=STATEMENTS, row_factories=ROW_FACTORIES):
+        self.conn = conn
+        self.statements = statements
+        self.row_factories = row_factories
+        self.cursors = {}
+        self.lock = threading.RLock()
+
+    def cursor(self, name):
+        """Retourne le curseur dédié à une requête (à utiliser avec le verrou)"""
+        cursor = self.cursors.get(name)
+        if cursor is None:
+            cursor = self.cursors[name] = self.conn.cursor()
+            cursor.row_factory = self.row_factories.get(name)
+        return cursor
+
+    def fetchone(self, name, params=()):
+        with self.lock:
+            return self.cursor(name).execute(self.statements[name], params).fetchone()
+
+    def fetchall(self, name, params=()):
+        with self.lock:
+            return self.cursor(name).execute(self.statements[name], params).fetchall()
+
+    def execute(self, name, params=()):
+        """Exécute une requête d'écriture et retourne l'identifiant de la ligne insérée"""
+        with self.lock:
+            return self.cursor(name).execute(self.statements[name], params).lastrowid
+
+    def execute_count(self, name, params=()):
+        """Exécute une requête d'écriture et retourne le nombre de lignes modifiées"""
+        with self.lock:
+            return self.cursor(name).execute(self.statements[name], params).rowcount
+
+    def executemany(self, name, seq_of_params):
+        with self.lock:
+            self.cursor(name).executemany(self.statements[name], seq_of_params)
+
+
+class ReaderPool:
+    """Groupe de connexions de lecture, partagées entre les threads du serveur
+
+    Même interface de lecture que QueryRunner (`fetchone`, `fetchall`) : chaque
+    appel emprunte une connexion libre, ce qui permet plusieurs lectures en
+    parallèle pendant que le thread d'écriture travaille (mode WAL).
+    """
+
+    def __init__(self, db_name, size=4):
+        self.runners = queue.Queue()
+        self.all_runners = [QueryRunner(connect(db_name)) for _ in range(size)]
+        for runner in self.all_runners:
+            self.runners.put(runner)
+
+    @contextmanager
+    def runner(self):
+        runner = self.runners.get()
+        try:
+            yield runner
+        finally:
+            self.runners.put(runner)
+
+    def fetchone(self, name, params=()):
+        with self.runner() as runner:
+            return runner.fetchone(name, params)
+
+    def fetchall(self, name, params=()):
+        with self.runner() as runner:
+            return runner.fetchall(name, params)
+
+    def close(self):
+        for runner in self.all_runners:
+            runner.conn.close()
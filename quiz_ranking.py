@@ -0,0 +1,153 @@
+import bisect
+import threading
+
+
+class FenwickTree:
+    """Arbre de Fenwick : compteurs par indice, somme d'un préfixe en O(log n)"""
+
+    def __init__(self, size):
+        self.size = size
+        self.tree = [0] * (size + 1)
+
+    def add(self, index, delta):
+        index += 1
+        while index <= self.size:
+            self.tree[index] += delta
+            index += index & -index
+
+    def prefix_sum(self, index):
+        """Somme des compteurs d'indice 0 à `index` inclus"""
+        total = 0
+        index = min(index, self.size - 1) + 1
+        while index > 0:
+            total += self.tree[index]
+            index -= index & -index
+        return total
+
+
+class ScoreRanking:
+    """Rang des joueurs selon leur meilleur score, pour un thème ou tous thèmes
+
+    Un arbre de Fenwick compte les joueurs par valeur de meilleur score :
+    le rang d'un joueur (1 + nombre de joueurs ayant un meilleur score
+    strictement supérieur) s'obtient en O(log S), S étant le score maximal.
+    Les joueurs de chaque score sont aussi rangés par identifiant pour
+    lister les voisins d'un joueur.
+    """
+
+    def __init__(self, size=128):
+        self.counts = FenwickTree(size)
+        self.best = {}       # user_id -> meilleur score
+        self.members = {}    # score -> [user_id triés]
+        self.scores = []     # scores présents, triés
+
+    def grow(self, score):
+        """Agrandit l'arbre pour accueillir `score` (reconstruction, rare)"""
+        size = self.counts.size
+        while size <= score:
+            size *= 2
+        self.counts = FenwickTree(size)
+        for value, users in self.members.items():
+            self.counts.add(value, len(users))
+
+    def update(self, user_id, score):
+        """Prend en compte un score ; ne change rien s'il ne bat pas le meilleur du joueur"""
+        score = max(0, int(score))
+        old = self.best.get(user_id)
+        if old is not None and score <= old:
+            return
+        if score >= self.counts.size:
+            self.grow(score)
+        if old is not None:
+            self.remove_member(old, user_id)
+        self.best[user_id] = score
+        users = self.members.get(score)
+        if users is None:
+            users = self.members[score] = []
+            bisect.insort(self.scores, score)
+        bisect.insort(users, user_id)
+        self.counts.add(score, 1)
+
+    def remove_member(self, score, user_id):
+        users = self.members[score]
+        del users[bisect.bisect_left(users, user_id)]
+        if not users:
+            del self.members[score]
+            del self.scores[bisect.bisect_left(self.scores, score)]
+        self.counts.add(score, -1)
+
+    def rank(self, user_id):
+        """Rang du joueur (ex aequo au même rang), ou None s'il n'a pas de score"""
+        score = self.best.get(user_id)
+        if score is None:
+            return None
+        return len(self.best) - self.counts.prefix_sum(score) + 1
+
+    def around(self, user_id, count=5):
+        """Jusqu'à `count` joueurs avant et après `user_id` : [(rang, user_id, score)]"""
+        score = self.best.get(user_id)
+        if score is None:
+            return []
+        users = self.members[score]
+        position = bisect.bisect_left(users, user_id)
+        rank = self.rank(user_id)
+
+        # Joueurs mieux classés, du plus proche au plus éloigné
+        above = [(rank, other, score) for other in reversed(users[max(0, position - count):position])]
+        index = bisect.bisect_right(self.scores, score)
+        while len(above) < count and index < len(self.scores):
+            value = self.scores[index]
+            value_rank = len(self.best) - self.counts.prefix_sum(value) + 1
+            for other in reversed(self.members[value]):
+                if len(above) == count:
+                    break
+                above.append((value_rank, other, value))
+            index += 1
+
+        # Joueurs moins bien classés
+        below = [(rank, other, score) for other in users[position + 1:position + 1 + count]]
+        index = bisect.bisect_left(self.scores, score) - 1
+        while len(below) < count and index >= 0:
+            value = self.scores[index]
+            value_rank = len(self.best) - self.counts.prefix_sum(value) + 1
+            for other in self.members[value]:
+                if len(below) == count:
+                    break
+                below.append((value_rank, other, value))
+            index -= 1
+
+        return list(reversed(above)) + [(rank, user_id, score)] + below
+
+
+class RankIndex:
+    """Rangs des joueurs par thème et tous thèmes confondus (theme_id 0, comme user_stats)"""
+
+    def __init__(self):
+        self.rankings = {}
+        self.lock = threading.Lock()
+
+    def load(self, rows):
+        """Initialise les rangs à partir des lignes (user_id, theme_id, meilleur score)"""
+        with self.lock:
+            self.rankings = {}
+            for user_id, theme_id, best_score in rows:
+                self.ranking(theme_id).update(user_id, best_score)
+
+    def ranking(self, theme_id):
+        ranking = self.rankings.get(theme_id)
+        if ranking is None:
+            ranking = self.rankings[theme_id] = ScoreRanking()
+        return ranking
+
+    def add_score(self, user_id, theme_id, score):
+        with self.lock:
+            self.ranking(theme_id).update(user_id, score)
+            self.ranking(0).update(user_id, score)
+
+    def get(self, user_id, theme_id=0, count=5):
+        """Retourne (rang, nombre de joueurs classés, voisins) pour un joueur"""
+        with self.lock:
+            ranking = self.rankings.get(theme_id or 0)
+            if ranking is None:
+                return None, 0, []
+            return ranking.rank(user_id), len(ranking.best), ranking.around(user_id, count)
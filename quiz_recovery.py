@@ -0,0 +1,180 @@
+import json
+import os
+import queue
+import threading
+import time
+
+# Catégories d'état conservées d'un démarrage à l'autre
+STATE_KINDS = ('games', 'rooms', 'sessions', 'questions')
+
+
+class StateJournal:
+    """Sauvegarde de l'état en cours du serveur (parties, salons, sessions)
+
+    Les threads clients décrivent chaque modification (`set`, `update`,
+    `delete`) ; elle est convertie en JSON tout de suite, puis mise en file
+    sans aucun accès disque. Un thread unique l'ajoute au journal
+    (`state.log`, une ligne numérotée par modification, un fsync par groupe)
+    et l'applique à sa propre copie de l'état. Toutes les
+    `snapshot_interval` secondes, cette copie est écrite en entier dans
+    `state.json` (fichier temporaire puis renommage) et le journal repart
+    de zéro.
+
+    Au démarrage, `restore` relit l'instantané puis rejoue les lignes du
+    journal plus récentes que lui : seules les dernières modifications pas
+    encore écrites sont perdues. Avec `directory` à None, rien n'est
+    sauvegardé.
+    """
+
+    def __init__(self, directory, snapshot_interval=30.0, flush_interval=0.2):
+        self.directory = directory
+        self.snapshot_path = os.path.join(directory or '', 'state.json')
+        self.log_path = os.path.join(directory or '', 'state.log')
+        self.snapshot_interval = snapshot_interval
+        self.flush_interval = flush_interval
+        self.state = {kind: {} for kind in STATE_KINDS}
+        self.sequence = 0             # numéro de la dernière modification appliquée
+        self.snapshot_sequence = 0    # numéro de la dernière modification de state.json
+        self.queue = queue.Queue()
+        self.log = None
+        self.thread = None
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+
+    # Modifications, appelées par les threads clients
+    def record(self, operation, kind, key, *values):
+        if self.directory is None:
+            return
+        # Clé en chaîne, comme elle sera relue depuis le JSON
+        change = (operation, kind, str(key)) + values
+        self.queue.put(json.dumps(change, separators=(',', ':')))
+
+    def set(self, kind, key, value):
+        """Remplace (ou crée) une entrée"""
+        self.record('set', kind, key, value)
+
+    def update(self, kind, key, fields=None, appends=None):
+        """Modifie les champs `fields` d'une entrée et ajoute `appends` ({champ: élément}) à ses listes"""
+        self.record('update', kind, key, fields or {}, appends or {})
+
+    def delete(self, kind, key):
+        self.record('delete', kind, key)
+
+    def apply(self, change):
+        """Applique une modification à la copie de l'état"""
+        operation, kind, key = change[:3]
+        entries = self.state[kind]
+        if operation == 'set':
+            entries[key] = change[3]
+        elif operation == 'update':
+            entry = entries.get(key)
+            if entry is not None:
+                entry.update(change[3])
+                for field, item in change[4].items():
+                    entry.setdefault(field, []).append(item)
+        elif operation == 'delete':
+            entries.pop(key, None)
+
+    def restore(self):
+        """Relit l'instantané et le journal ; retourne {catégorie: {clé: entrée}}
+
+        À appeler avant `start`. Une dernière ligne incomplète (arrêt brutal
+        pendant l'écriture) est ignorée.
+        """
+        if self.directory is None:
+            return json.loads(json.dumps(self.state))
+        if os.path.exists(self.snapshot_path):
+            with open(self.snapshot_path, encoding='utf-8') as snapshot:
+                saved = json.load(snapshot)
+            self.sequence = self.snapshot_sequence = saved['sequence']
+            for kind in STATE_KINDS:
+                self.state[kind] = saved['state'].get(kind, {})
+
+        if os.path.exists(self.log_path):
+            with open(self.log_path, encoding='utf-8') as log:
+                for line in log:
+                    try:
+                        sequence, change = line.split(' ', 1)
+                        sequence, change = int(sequence), json.loads(change)
+                    except ValueError:
+                        break
+                    # Lignes déjà comprises dans l'instantané (arrêt juste après son écriture)
+                    if sequence <= self.snapshot_sequence:
+                        continue
+                    self.apply(change)
+                    self.sequence = sequence
+
+        # Compacte tout de suite : le journal repart d'un instantané à jour
+        self.write_snapshot()
+        return json.loads(json.dumps(self.state))
+
+    def start(self):
+        """Démarre le thread d'écriture"""
+        if self.thread is None and self.directory is not None:
+            self.log = open(self.log_path, 'a', encoding='utf-8')
+            self.thread = threading.Thread(target=self.run, daemon=True)
+            self.thread.start()
+
+    def run(self):
+        last_snapshot = time.monotonic()
+        running = True
+        while running:
+            try:
+                changes = [self.queue.get(timeout=self.flush_interval)]
+            except queue.Empty:
+                changes = []
+            # Regroupe tout ce qui est déjà en file : un seul fsync pour le groupe
+            while True:
+                try:
+                    changes.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            if None in changes:
+                running = False
+                changes = changes[:changes.index(None)]
+
+            try:
+                if changes:
+                    self.append(changes)
+                if (not running or time.monotonic() - last_snapshot >= self.snapshot_interval) \
+                        and self.sequence > self.snapshot_sequence:
+                    self.write_snapshot()
+                    last_snapshot = time.monotonic()
+            except Exception as e:
+                print(f"Erreur lors de la sauvegarde de l'état des parties: {e}")
+
+    def append(self, changes):
+        """Écrit un groupe de modifications dans le journal et les applique à la copie"""
+        lines = []
+        for change in changes:
+            self.sequence += 1
+            lines.append(f"{self.sequence} {change}\n")
+            self.apply(json.loads(change))
+        self.log.write(''.join(lines))
+        self.log.flush()
+        os.fsync(self.log.fileno())
+
+    def write_snapshot(self):
+        """Écrit la copie de l'état dans state.json puis vide le journal"""
+        temporary = self.snapshot_path + '.tmp'
+        with open(temporary, 'w', encoding='utf-8') as snapshot:
+            json.dump({'sequence': self.sequence, 'state': self.state}, snapshot, separators=(',', ':'))
+            snapshot.flush()
+            os.fsync(snapshot.fileno())
+        os.replace(temporary, self.snapshot_path)
+        self.snapshot_sequence = self.sequence
+        # Les lignes du journal sont toutes dans l'instantané
+        if self.log is not None:
+            self.log.truncate(0)
+            self.log.seek(0)
+        else:
+            open(self.log_path, 'w').close()
+
+    def close(self):
+        """Écrit les dernières modifications et un instantané final"""
+        if self.thread is not None:
+            self.queue.put(None)
+            self.thread.join()
+            self.thread = None
+            self.log.close()
+            self.log = None
@@ -0,0 +1,71 @@
+import threading
+
+
+class StripedRegistry:
+    """Dictionnaire partagé entre threads, protégé par un verrou par tranche de clés
+
+    Les clés sont réparties sur `stripes` tranches, chacune avec son
+    dictionnaire et son verrou : deux clients qui jouent des parties
+    différentes ne s'attendent presque jamais, sans un verrou global qui
+    sérialiserait tout le serveur. `lock(key)` donne le verrou de la
+    tranche d'une clé pour les opérations en plusieurs étapes sur une même
+    partie ou un même salon (lire, vérifier, modifier).
+    """
+
+    def __init__(self, stripes=64):
+        self.stripes = [{} for _ in range(stripes)]
+        self.locks = [threading.RLock() for _ in range(stripes)]
+
+    def index(self, key):
+        return hash(key) % len(self.stripes)
+
+    def lock(self, key):
+        """Verrou (réentrant) de la tranche de `key`"""
+        return self.locks[self.index(key)]
+
+    def get(self, key, default=None):
+        index = self.index(key)
+        with self.locks[index]:
+            return self.stripes[index].get(key, default)
+
+    def put(self, key, value):
+        index = self.index(key)
+        with self.locks[index]:
+            self.stripes[index][key] = value
+
+    def put_if_absent(self, key, value):
+        """Ajoute `value` si `key` est libre ; retourne True si elle a été ajoutée"""
+        index = self.index(key)
+        with self.locks[index]:
+            entries = self.stripes[index]
+            if key in entries:
+                return False
+            entries[key] = value
+            return True
+
+    def pop(self, key, default=None):
+        index = self.index(key)
+        with self.locks[index]:
+            return self.stripes[index].pop(key, default)
+
+    def __contains__(self, key):
+        index = self.index(key)
+        with self.locks[index]:
+            return key in self.stripes[index]
+
+    def __len__(self):
+        return sum(len(entries) for entries in self.stripes)
+
+    def items(self):
+        """Copie des entrées, tranche par tranche (pas d'instantané global)"""
+        items = []
+        for lock, entries in zip(self.locks, self.stripes):
+            with lock:
+                items.extend(entries.items())
+        return items
+
+    def values(self):
+        return [value for _, value in self.items()]
+
+    def keys(self):
+        return [key for key, _ in self.items()]
@@ -0,0 +1,99 @@
+import bisect
+import random
+
+
+class UsageSampler:
+    """Tirage « moins utilisées d'abord, puis aléatoire » pour un couple thème/type
+
+    Les questions sont rangées dans des seaux indexés par leur compteur
+    d'utilisation. Un tirage parcourt les seaux du moins utilisé au plus
+    utilisé et ne touche que les questions retenues : son coût dépend du
+    nombre de questions demandées et du nombre de niveaux d'utilisation,
+    pas de la taille de la banque de questions.
+    """
+
+    def __init__(self, usage=()):
+        self.buckets = {}    # used_count -> liste des question_id
+        self.positions = {}  # question_id -> (used_count, position dans le seau)
+        self.levels = []     # used_count non vides, triés
+        for question_id, used_count in usage:
+            self.add(question_id, used_count or 0)
+
+    def __len__(self):
+        return len(self.positions)
+
+    def __contains__(self, question_id):
+        return question_id in self.positions
+
+    def add(self, question_id, used_count=0):
+        """Ajoute une question dans le seau de son compteur d'utilisation"""
+        if question_id in self.positions:
+            self.remove(question_id)
+        bucket = self.buckets.get(used_count)
+        if bucket is None:
+            bucket = self.buckets[used_count] = []
+            bisect.insort(self.levels, used_count)
+        self.positions[question_id] = (used_count, len(bucket))
+        bucket.append(question_id)
+
+    def remove(self, question_id):
+        """Retire une question (échange avec le dernier élément du seau, O(1))"""
+        used_count, index = self.positions.pop(question_id)
+        bucket = self.buckets[used_count]
+        last = bucket.pop()
+        if last != question_id:
+            bucket[index] = last
+            self.positions[last] = (used_count, index)
+        if not bucket:
+            del self.buckets[used_count]
+            del self.levels[bisect.bisect_left(self.levels, used_count)]
+        return used_count
+
+    def candidates(self, bucket, wanted):
+        """Parcourt un seau dans un ordre aléatoire, sans le copier s'il est grand"""
+        if len(bucket) <= 4 * wanted:
+            order = list(bucket)
+            random.shuffle(order)
+            yield from order
+            return
+        seen = set()
+        for _ in range(4 * wanted):
+            question_id = random.choice(bucket)
+            if question_id not in seen:
+                seen.add(question_id)
+                yield question_id
+        # Beaucoup de refus : parcours complet du reste du seau
+        rest = [question_id for question_id in bucket if question_id not in seen]
+        random.shuffle(rest)
+        yield from rest
+
+    def sample(self, count, accept=None):
+        """Tire jusqu'à `count` questions parmi les moins utilisées et les marque comme utilisées
+
+        À compteur égal, le choix est aléatoire (l'ancien tri sur `last_used`
+        n'est pas conservé à l'intérieur d'un même niveau). `accept`, s'il est
+        donné, est appelé sur chaque candidate retenue et peut la refuser.
+        """
+        selected = []
+        for used_count in self.levels:
+            remaining = count - len(selected)
+            if remaining <= 0:
+                break
+            bucket = self.buckets[used_count]
+            if accept is None:
+                if len(bucket) <= remaining:
+                    picked = list(bucket)
+                    random.shuffle(picked)
+                else:
+                    picked = random.sample(bucket, remaining)
+                selected.extend(picked)
+                continue
+            for question_id in self.candidates(bucket, remaining):
+                if accept(question_id):
+                    selected.append(question_id)
+                    if len(selected) == count:
+                        break
+
+        for question_id in selected:
+            self.add(question_id, self.positions[question_id][0] + 1)
+        return selected
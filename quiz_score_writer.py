@@ -0,0 +1,93 @@
+import threading
+import time
+
+
+class ScoreWriter:
+    """File d'attente des scores, écrits en base par groupes (group commit)
+
+    Les scores sont regroupés et écrits en une seule transaction dès que
+    `batch_size` scores sont en attente ou que le plus ancien attend depuis
+    `flush_interval` secondes. En cas d'arrêt brutal, on perd au plus les
+    scores de cette fenêtre ; au-delà de `max_pending` scores en attente,
+    `add` écrit lui-même le lot pour ne jamais dépasser cette borne.
+    `close` écrit tout ce qui reste.
+    """
+
+    def __init__(self, write_batch, batch_size=50, flush_interval=1.0, max_pending=1000):
+        self.write_batch = write_batch    # [(user_id, theme_id, score, total_time, answers)] -> None
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.pending = []
+        self.oldest = None                # date d'arrivée du plus ancien score en attente
+        self.condition = threading.Condition()
+        self.write_lock = threading.Lock()  # Un seul lot écrit à la fois
+        self.closed = False
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def add(self, user_id, theme_id, score, total_time, answers=None):
+        """Met un score en attente d'écriture (`answers` : détail des réponses, facultatif)"""
+        with self.condition:
+            if self.closed:
+                raise RuntimeError("Le journal des scores est fermé")
+            if not self.pending:
+                self.oldest = time.monotonic()
+            self.pending.append((user_id, theme_id, score, total_time, answers))
+            full = len(self.pending) >= self.max_pending
+            # Réveille le thread pour armer la fenêtre de temps ou écrire un lot complet
+            if len(self.pending) == 1 or len(self.pending) >= self.batch_size:
+                self.condition.notify()
+        if full:
+            self.flush()
+
+    def take_batch(self):
+        """Récupère tous les scores en attente (appelé avec la condition verrouillée)"""
+        batch, self.pending = self.pending, []
+        self.oldest = None
+        return batch
+
+    def run(self):
+        while True:
+            with self.condition:
+                while not self.closed:
+                    if len(self.pending) >= self.batch_size:
+                        break
+                    if self.pending:
+                        remaining = self.oldest + self.flush_interval - time.monotonic()
+                        if remaining <= 0:
+                            break
+                        self.condition.wait(remaining)
+                    else:
+                        self.condition.wait()
+                if self.closed:
+                    return
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"Erreur lors de l'écriture des scores: {e}")
+                time.sleep(self.flush_interval)
+
+    def flush(self):
+        """Écrit immédiatement les scores en attente en une transaction"""
+        with self.write_lock:
+            with self.condition:
+                batch = self.take_batch()
+            if not batch:
+                return
+            try:
+                self.write_batch(batch)
+            except Exception:
+                # Remet le lot en tête de file pour la prochaine tentative
+                with self.condition:
+                    self.pending[:0] = batch
+                    self.oldest = time.monotonic()
+                raise
+
+    def close(self):
+        """Arrête le thread et écrit durablement les scores restants"""
+        with self.condition:
+            self.closed = True
+            self.condition.notify()
+        self.thread.join()
+        self.flush()
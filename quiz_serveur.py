@@ -1,22 +1,71 @@
+import argparse
+from array import array
 import socket
 import threading
 import json
-from quiz_database import QuizDatabase, QuestionType
+from quiz_database import QuestionType
+from quiz_games import SKIPPED, GameSession, QuestionStore, answer_choice
+from quiz_import import import_seed_file
+from quiz_lifecycle import SessionLifecycle
+from quiz_outbox import ClientOutbox
+from quiz_packs import GamePacks
+from quiz_registry import StripedRegistry
+from quiz_recovery import StateJournal
+from quiz_sessions import SessionStore
+from quiz_timers import TimerWheel
+from quiz_storage import STORAGE_BACKENDS, open_storage
 import time
 import random
-import unicodedata
-
-# Fonction pour normaliser une chaîne (supprime les accents et met en minuscules)
-def normalize_string(input_string):
-    return unicodedata.normalize('NFD', input_string).encode('ascii', 'ignore').decode('utf-8').lower()
-
-# Fonction pour vérifier si la réponse est correcte
-def is_correct_answer(user_answer, correct_answer):
-    return normalize_string(user_answer) == normalize_string(correct_answer)
+import secrets
+
+# Rétention des scores bruts (les agrégats par jour et par semaine sont conservés)
+SCORE_RETENTION_DAYS = 365
+RETENTION_INTERVAL = 6 * 3600  # secondes entre deux passages
+
+# Copie en mémoire pour les lectures de classements, thèmes et statistiques :
+# None pour lire la base directement, sinon les options de ReadSnapshot
+# (copie toutes les 2 s si la base a changé ou toutes les 200 écritures,
+# lecture sur la base si la copie a plus de 10 s)
+READ_SNAPSHOT = None  # ex. {'refresh_interval': 2.0, 'refresh_after_writes': 200, 'max_staleness': 10.0}
+
+# Parties, salons et sessions en cours, sauvegardés pour être repris après un
+# redémarrage : instantané toutes les SNAPSHOT_INTERVAL secondes et journal
+# des modifications entre deux instantanés
+STATE_DIRECTORY = 'quiz_state'
+SNAPSHOT_INTERVAL = 30
+
+# Durée de conservation en mémoire sans activité (secondes) : une partie
+# terminée est gardée le temps d'en demander le résumé, une partie abandonnée
+# est enregistrée puis retirée, un salon de duel inactif est fermé
+FINISHED_GAME_TTL = 15 * 60
+IDLE_GAME_TTL = 2 * 3600
+IDLE_ROOM_TTL = 2 * 3600
+SWEEP_INTERVAL = 30
+
+# Parties préparées à l'avance par thème (questions tirées et mélangées)
+READY_PACKS_PER_THEME = 2
+
+# Temps de réponse à une question (secondes), vérifié par le serveur : passé
+# ce délai et la marge pour le réseau, la question est passée d'office et la
+# suite est envoyée au joueur
+QUESTION_TIME_LIMIT = 30
+QUESTION_TIME_MARGIN = 2
+TIMER_TICK = 0.25
+
+# Commandes accessibles sans jeton de session
+PUBLIC_COMMANDS = {'login', 'register', 'get_themes', 'get_leaderboard', 'get_scores_page'}
+
+# Commandes de maintenance (les résultats contiennent les bonnes réponses),
+# réservées aux administrateurs donnés au démarrage (--admin)
+ADMIN_COMMANDS = {'search_questions'}
 
 class QuizServer:
-    def __init__(self, host='localhost', port=12345):
+    def __init__(self, host='localhost', port=12345, storage=None, state_directory=STATE_DIRECTORY, admins=()):
+        """`storage` : stockage à utiliser (QuizStorage) ; par défaut la base SQLite quiz.db
+        `state_directory` : dossier de sauvegarde des parties en cours (None : pas de reprise)
+        `admins` : noms des utilisateurs autorisés à lancer les commandes de maintenance"""
         self.host = host
+        self.admins = set(admins)
         self.port = port
         
         try:
@@ -30,10 +79,201 @@ class QuizServer:
             print(f"Erreur lors du démarrage du serveur: {e}")
             raise
         
-        self.db = QuizDatabase('quiz.db')
-        self.clients = {}
-        self.active_games = {}
-        self.duel_rooms = {}
+        if storage is None:
+            storage = open_storage('sqlite', 'quiz.db', read_snapshot=READ_SNAPSHOT)
+        self.db = storage
+        self.clients = {}       # socket -> file d'envoi (réponses et messages poussés)
+        self.user_sockets = {}  # user_id -> dernier socket utilisé par le joueur
+        # Parties et salons partagés par les threads clients : un verrou par tranche de clés
+        self.active_games = StripedRegistry()
+        self.duel_rooms = StripedRegistry()
+        # Questions des parties en cours, partagées : les parties n'en gardent que les identifiants
+        self.questions = QuestionStore()
+        self.journal = StateJournal(state_directory, SNAPSHOT_INTERVAL)
+        self.sessions = SessionStore(journal=self.journal)
+        # Retire les parties et salons inactifs (voir FINISHED_GAME_TTL, IDLE_GAME_TTL, IDLE_ROOM_TTL)
+        self.lifecycle = SessionLifecycle(self.expire, SWEEP_INTERVAL)
+        # Échéance de la question en cours de chaque partie
+        self.timers = TimerWheel(self.question_timeout, TIMER_TICK)
+        self.restore_state()
+        self.journal.start()
+        self.lifecycle.start()
+        self.timers.start()
+        # Parties prêtes à jouer, préparées par un thread et refaites quand les questions changent
+        self.packs = GamePacks(self.build_pack, READY_PACKS_PER_THEME, self.release_questions,
+                               self.db.record_question_usage)
+        self.db.on_questions_changed(self.packs.invalidate)
+        self.packs.start()
+        for theme_id, _ in self.db.get_all_themes():
+            self.packs.request(theme_id)
+
+        retention_thread = threading.Thread(target=self.run_score_retention, daemon=True)
+        retention_thread.start()
+
+    def restore_state(self):
+        """Reprend les parties, salons et sessions en cours avant l'arrêt du serveur"""
+        state = self.journal.restore()
+        self.questions.load(state['questions'].values())
+        for room in state['rooms'].values():
+            # Les clés JSON sont des chaînes : les user_id redeviennent des entiers
+            room['scores'] = {int(player_id): score for player_id, score in room['scores'].items()}
+            room['question_ids'] = array('I', room['question_ids'])
+        for room_code, room in state['rooms'].items():
+            self.duel_rooms.put(room_code, room)
+            self.questions.acquire(room['question_ids'])
+            self.touch_room(room_code)
+        for game_id, saved_game in state['games'].items():
+            game = GameSession.from_state(saved_game)
+            # Les joueurs d'un duel partagent de nouveau la liste des questions du salon
+            room = state['rooms'].get(game.room_code)
+            if room is not None and room['question_ids'] == game.question_ids:
+                game.question_ids = room['question_ids']
+            self.active_games.put(game_id, game)
+            self.questions.acquire(game.question_ids)
+            self.touch_game(game_id, game)
+            self.start_question_timer(game_id, game)
+        # Questions des paquets prêts avant l'arrêt : plus aucune partie ne les utilise
+        for question_id in self.questions.prune():
+            self.journal.delete('questions', question_id)
+        self.sessions.restore(state['sessions'])
+        if len(self.active_games) or len(self.duel_rooms):
+            print(f"{len(self.active_games)} parties et {len(self.duel_rooms)} salons repris")
+
+    def store_questions(self, rows):
+        """Enregistre les questions d'une partie dans le magasin partagé ; retourne leurs identifiants"""
+        question_ids, new_rows = self.questions.add(rows)
+        for row in new_rows:
+            self.journal.set('questions', row[0], row)
+        return question_ids
+
+    def release_questions(self, question_ids):
+        """Rend les questions d'un paquet, d'une partie ou d'un salon retiré"""
+        for question_id in self.questions.release(question_ids):
+            self.journal.delete('questions', question_id)
+
+    def build_pack(self, theme_id):
+        """Prépare les questions d'une partie : tirage, mélange et rangement dans le magasin
+
+        Retourne les identifiants des questions, ou None s'il n'y en a aucune.
+        """
+        questions = self.db.get_questions_for_game(theme_id)
+        formatted_questions = []
+        # Ajoute les questions selon leur type (une seule question par groupe
+        # de doublons, déjà garanti par le tirage)
+        for question_type in (QuestionType.OPEN, QuestionType.QUAD, QuestionType.DUAL):
+            formatted_questions.extend(questions.get(question_type, []))
+        if not formatted_questions:
+            return None
+        random.shuffle(formatted_questions)
+        return self.store_questions(formatted_questions)
+
+    def save_game(self, game_id, game):
+        self.journal.set('games', game_id, game.to_state())
+        self.touch_game(game_id, game)
+        self.start_question_timer(game_id, game)
+
+    def save_room(self, room_code, room):
+        self.journal.set('rooms', room_code, dict(room, question_ids=room['question_ids'].tolist()))
+        self.touch_room(room_code)
+
+    def touch_game(self, game_id, game):
+        """Repousse l'expiration d'une partie après une activité"""
+        self.lifecycle.touch(('games', game_id), FINISHED_GAME_TTL if game.is_finished() else IDLE_GAME_TTL)
+
+    def touch_room(self, room_code):
+        self.lifecycle.touch(('rooms', room_code), IDLE_ROOM_TTL)
+
+    def start_question_timer(self, game_id, game):
+        """Programme l'échéance de la question en cours (aucune si la partie est terminée)
+
+        L'heure à laquelle la question est servie sert à calculer le temps de
+        réponse côté serveur.
+        """
+        if game.is_finished():
+            self.timers.cancel(game_id)
+        else:
+            game.question_started = time.time()
+            self.timers.schedule(game_id, QUESTION_TIME_LIMIT + QUESTION_TIME_MARGIN, game.current_index)
+
+    def question_timeout(self, game_id, question_index):
+        """Passe la question restée sans réponse et envoie la suite au joueur (appelé par TimerWheel)"""
+        with self.active_games.lock(game_id):
+            game = self.active_games.get(game_id)
+            # Réponse arrivée entre-temps
+            if game is None or game.current_index != question_index:
+                return
+            result = self.submit_answer(game_id, game.user_id, None, QUESTION_TIME_LIMIT)
+        client_socket = self.user_sockets.get(game.user_id)
+        if client_socket is not None:
+            self.send_message(client_socket, dict(result, event='question_timeout', game_id=game_id, timed_out=True))
+
+    def expire(self, key):
+        """Retire une partie ou un salon inactif (appelé par SessionLifecycle)
+
+        Le score d'une partie commencée mais jamais enregistrée (résumé non
+        demandé, joueur parti) est enregistré avant de la retirer.
+        """
+        kind, name = key
+        if kind == 'games':
+            with self.active_games.lock(name):
+                game = self.active_games.get(name)
+                if game is not None and game.current_index > 0:
+                    self.save_game_score(name, game, self.game_history(game))
+                self.active_games.pop(name)
+                self.timers.cancel(name)
+                self.journal.delete(kind, name)
+                if game is not None:
+                    self.release_questions(game.question_ids)
+        else:
+            with self.duel_rooms.lock(name):
+                room = self.duel_rooms.pop(name)
+                self.journal.delete(kind, name)
+                if room is not None:
+                    self.release_questions(room['question_ids'])
+
+    def game_history(self, game):
+        """Historique détaillé d'une partie, reconstruit à partir des enregistrements compacts"""
+        history = []
+        for position, choice, points, time_taken in game.answers():
+            question = self.questions.get(game.question_ids[position])
+            history.append({
+                'question': question[4],
+                'question_type': question[2],
+                'user_answer': game.answer_text(position, question, choice),
+                'correct_answer': question[5],
+                'is_correct': choice == 0,
+                'points': points,
+                'time_taken': time_taken
+            })
+        return history
+
+    def save_game_score(self, game_id, game, history):
+        """Enregistre le score d'une partie, une seule fois, avec le temps moyen de réponse"""
+        if game.saved:
+            return
+        total_time = sum(answer['time_taken'] for answer in history)
+        average_time = total_time / len(history) if history else 0
+        self.db.save_score(
+            game.user_id,
+            game.theme_id,
+            game.score,
+            average_time,
+            [(answer['question_type'], answer['is_correct'], answer['time_taken'])
+             for answer in history]
+        )
+        game.saved = True
+        self.journal.update('games', game_id, {'saved': True})
+
+    def run_score_retention(self):
+        """Archive périodiquement les scores bruts trop anciens"""
+        while True:
+            try:
+                archived = self.db.archive_old_scores(SCORE_RETENTION_DAYS)
+                if archived:
+                    print(f"{archived} scores archivés")
+            except Exception as e:
+                print(f"Erreur lors de l'archivage des scores: {e}")
+            time.sleep(RETENTION_INTERVAL)
 
     def start(self):
         print("En attente de connexions...")
@@ -53,38 +293,77 @@ class QuizServer:
             except Exception as e:
                 print(f"Erreur de connexion: {e}")
 
+        # Écrit les données encore en mémoire avant de quitter
+        self.timers.close()
+        self.packs.close()
+        self.lifecycle.close()
+        self.journal.close()
+        self.db.close()
+
     def handle_client(self, client_socket, address):
         print(f"Gestion du client {address}")
+        outbox = ClientOutbox(client_socket)
+        self.clients[client_socket] = outbox
+        outbox.start()
         try:
-            while True:
-                data = client_socket.recv(4096).decode('utf-8')
-                if not data:
-                    break
+            # Un message JSON par ligne, dans les deux sens
+            for data in client_socket.makefile('r', encoding='utf-8'):
+                if not data.strip():
+                    continue
 
                 print(f"Reçu de {address}: {data}")
                 command = json.loads(data)
                 response = self.process_command(command, client_socket)
                 
                 print(f"Envoi à {address}: {response}")
-                client_socket.send(json.dumps(response).encode('utf-8'))
+                self.send_message(client_socket, response)
                 
         except Exception as e:
             print(f"Erreur avec le client {address}: {e}")
         finally:
             if client_socket in self.clients:
                 del self.clients[client_socket]
+            for user_id, user_socket in list(self.user_sockets.items()):
+                if user_socket is client_socket:
+                    self.user_sockets.pop(user_id, None)
+            outbox.close()
+            try:
+                # Débloque aussi un envoi en cours vers un client qui ne lit plus
+                client_socket.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
             client_socket.close()
             print(f"Connexion fermée avec {address}")
 
+    def send_message(self, client_socket, message):
+        """Met un message dans la file d'envoi de la connexion (sans attendre le réseau)"""
+        outbox = self.clients.get(client_socket)
+        if outbox is not None:
+            outbox.send(message)
+
     def process_command(self, command, client_socket):
         cmd_type = command.get('type')
         data = command.get('data', {})
         
         try:
+            # L'utilisateur est celui du jeton de session, jamais celui envoyé par le client
+            if cmd_type not in PUBLIC_COMMANDS:
+                user_id = self.sessions.resolve(command.get('token'))
+                if user_id is None:
+                    return {'status': 'error', 'message': 'Session invalide ou expirée'}
+                data = dict(data, user_id=user_id)
+                if cmd_type in ADMIN_COMMANDS and self.db.get_username(user_id) not in self.admins:
+                    return {'status': 'error', 'message': 'Commande réservée aux administrateurs'}
+                # Socket auquel envoyer les questions passées d'office
+                if client_socket is not None:
+                    self.user_sockets[user_id] = client_socket
+
             if cmd_type == 'login':
                 return self.handle_login(data)
             elif cmd_type == 'register':
                 return self.handle_register(data)
+            elif cmd_type == 'logout':
+                return self.handle_logout(command)
             elif cmd_type == 'get_themes':
                 return self.handle_get_themes()
             elif cmd_type == 'start_game':
@@ -95,6 +374,14 @@ class QuizServer:
                 return self.handle_get_game_summary(data)
             elif cmd_type == 'get_leaderboard':
                 return self.handle_get_leaderboard(data)
+            elif cmd_type == 'get_scores_page':
+                return self.handle_get_scores_page(data)
+            elif cmd_type == 'search_questions':
+                return self.handle_search_questions(data)
+            elif cmd_type == 'get_user_rank':
+                return self.handle_get_user_rank(data)
+            elif cmd_type == 'get_user_stats':
+                return self.handle_get_user_stats(data)
             elif cmd_type == 'create_duel_room':
                 return self.handle_create_duel_room(data)
             elif cmd_type == 'join_duel_room':
@@ -114,9 +401,13 @@ class QuizServer:
         password = data.get('password')
         user_id = self.db.verify_user(username, password)
         if user_id:
-            return {'status': 'success', 'user_id': user_id}
+            return {'status': 'success', 'user_id': user_id, 'token': self.sessions.create(user_id)}
         return {'status': 'error', 'message': 'Identifiants invalides'}
 
+    def handle_logout(self, command):
+        self.sessions.revoke(command.get('token'))
+        return {'status': 'success'}
+
     def handle_register(self, data):
         username = data.get('username')
         password = data.get('password')
@@ -136,48 +427,25 @@ class QuizServer:
             if not theme_id or not user_id:
                 return {'status': 'error', 'message': 'Données manquantes'}
 
-            # Récupère les questions
-            questions = self.db.get_questions_for_game(theme_id)
-            formatted_questions = []
-            used_questions = set()  # Pour suivre les questions déjà utilisées
-
-            # Fonction pour ajouter des questions uniques
-            def add_unique_questions(question_list, count):
-                added = []
-                for q in question_list:
-                    question_text = q[4]
-                    if question_text not in used_questions and len(added) < count:
-                        used_questions.add(question_text)
-                        added.append(q)
-                return added
-
-            # Ajoute les questions selon leur type
-            if QuestionType.OPEN in questions:
-                formatted_questions.extend(add_unique_questions(questions[QuestionType.OPEN], 5))
-            if QuestionType.QUAD in questions:
-                formatted_questions.extend(add_unique_questions(questions[QuestionType.QUAD], 10))
-            if QuestionType.DUAL in questions:
-                formatted_questions.extend(add_unique_questions(questions[QuestionType.DUAL], 20))
-
-            if not formatted_questions:
+            # Questions préparées à l'avance pour ce thème
+            question_ids = self.packs.take(theme_id)
+            if question_ids is None:
                 return {'status': 'error', 'message': 'Pas assez de questions disponibles'}
-
-            random.shuffle(formatted_questions)
             
-            game_id = f"game_{int(time.time())}_{user_id}"
-            self.active_games[game_id] = {
-                'questions': formatted_questions,
-                'current_index': 0,
-                'score': 0,
-                'user_id': user_id,
-                'answers_history': [],
-                'start_time': time.time()
-            }
+            game = GameSession(user_id, theme_id, question_ids)
+            # Identifiant unique, réservé atomiquement (plusieurs parties par seconde possibles)
+            while True:
+                game_id = f"game_{int(time.time())}_{user_id}_{secrets.token_hex(4)}"
+                with self.active_games.lock(game_id):
+                    if self.active_games.put_if_absent(game_id, game):
+                        self.save_game(game_id, game)
+                        break
 
             return {
                 'status': 'success',
                 'game_id': game_id,
-                'question': formatted_questions[0]
+                'question': self.questions.get(question_ids[0]),
+                'question_index': 0
             }
             
         except Exception as e:
@@ -189,86 +457,123 @@ class QuizServer:
         try:
             game_id = data.get('game_id')
             answer = data.get('answer')
-            time_taken = data.get('time_taken', 30)
-            
-            if game_id not in self.active_games:
-                return {'status': 'error', 'message': 'Partie non trouvée'}
-                
-            game = self.active_games[game_id]
-            current_question = game['questions'][game['current_index']]
-            
-            # Si la question est passée
-            if answer is None:
-                points = 0
-                is_correct = False
-            else:
-                # Vérifie la réponse (insensible à la casse)
-                is_correct = False
-                if current_question[2] == QuestionType.OPEN.value:
-                    is_correct = is_correct_answer(answer, current_question[5])
-                else:
-                    is_correct = answer.lower() == current_question[5].lower()
-                
-                points = current_question[3]
-                if is_correct:
-                    time_bonus = max(0, (30 - time_taken) / 30 * 0.2)
-                    points = int(points * (1 + time_bonus))
-                    game['score'] += points
-            
-            game['answers_history'].append({
-                'question': current_question[4],
-                'user_answer': answer,
-                'correct_answer': current_question[5],
-                'is_correct': is_correct,
-                'points': points,
-                'time_taken': time_taken
-            })
-            
-            game['current_index'] += 1
-            next_question = None
-            if game['current_index'] < len(game['questions']):
-                next_question = game['questions'][game['current_index']]
-            
-            return {
-                'status': 'success',
-                'is_correct': is_correct,
-                'correct_answer': current_question[5],
-                'points': points,
-                'time_taken': time_taken,
-                'next_question': next_question,
-                'game_finished': next_question is None
-            }
             
+            # Toute la soumission sous le verrou de la partie : deux réponses
+            # simultanées ne peuvent pas porter sur la même question
+            with self.active_games.lock(game_id):
+                return self.submit_answer(game_id, data.get('user_id'), answer,
+                                          question_index=data.get('question_index'))
         except Exception as e:
             print(f"Erreur submit_answer: {e}")
             return {'status': 'error', 'message': str(e)}
+
+    def submit_answer(self, game_id, user_id, answer, time_taken=None, question_index=None):
+        """Enregistre la réponse à la question en cours (appelé avec le verrou de la partie)
+
+        `time_taken` : par défaut, temps écoulé depuis que la question a été
+        servie, mesuré par le serveur (le temps annoncé par le client est ignoré).
+        `question_index` : position de la question à laquelle le client répond ;
+        si elle a déjà été traitée (passée d'office, ou réponse renvoyée en
+        double), la nouvelle réponse est ignorée et le résultat enregistré est renvoyé.
+        """
+        game = self.active_games.get(game_id)
+        if game is None or game.user_id != user_id:
+            return {'status': 'error', 'message': 'Partie non trouvée'}
+        if question_index is not None and question_index != game.current_index:
+            return self.late_answer(game, question_index)
+        question_id = game.current_question_id()
+        if question_id is None:
+            return {'status': 'error', 'message': 'Partie terminée'}
+        current_question = self.questions.get(question_id)
+        if time_taken is None:
+            time_taken = round(min(max(time.time() - game.question_started, 0), QUESTION_TIME_LIMIT), 3)
+        
+        # Si la question est passée
+        if answer is None:
+            points = 0
+            is_correct = False
+        else:
+            # Vérifie la réponse avec la clé préparée au chargement de la question
+            is_correct = self.questions.answer_key(question_id).matches(answer)
+            
+            points = current_question[3]
+            if is_correct:
+                time_bonus = max(0, (30 - time_taken) / 30 * 0.2)
+                points = int(points * (1 + time_bonus))
+                game.score += points
+        
+        choice, typed = answer_choice(current_question, answer, is_correct)
+        game.record_answer(choice, points, time_taken, typed)
+        fields = {'current_index': game.current_index, 'score': game.score}
+        if typed is not None:
+            fields['typed'] = game.typed
+        self.journal.update('games', game_id, fields, {'history': [choice, points, time_taken]})
+        self.touch_game(game_id, game)
+        self.start_question_timer(game_id, game)
+
+        next_question = None
+        if game.current_question_id() is not None:
+            next_question = self.questions.get(game.current_question_id())
+        
+        return {
+            'status': 'success',
+            'is_correct': is_correct,
+            'correct_answer': current_question[5],
+            'points': points,
+            'time_taken': time_taken,
+            'next_question': next_question,
+            'question_index': game.current_index,
+            'game_finished': next_question is None
+        }
+
+    def late_answer(self, game, question_index):
+        """Réponse à une question déjà traitée (passée d'office, ou réponse renvoyée en double)
+
+        Retourne le résultat enregistré pour cette question, sans le modifier,
+        et la suite de la partie.
+        """
+        answers = game.answers()
+        if not 0 <= question_index < len(answers):
+            return {'status': 'error', 'message': 'Question invalide'}
+        _, choice, points, time_taken = answers[question_index]
+        question = self.questions.get(game.question_ids[question_index])
+        next_question_id = game.current_question_id()
+        return {
+            'status': 'success',
+            'timed_out': choice == SKIPPED,
+            'is_correct': choice == 0,
+            'correct_answer': question[5],
+            'points': points,
+            'time_taken': time_taken,
+            'next_question': self.questions.get(next_question_id) if next_question_id is not None else None,
+            'question_index': game.current_index,
+            'game_finished': next_question_id is None
+        }
         
     def handle_get_game_summary(self, data):
         """Récupère le résumé d'une partie"""
         try:
             game_id = data.get('game_id')
-            if game_id not in self.active_games:
-                return {'status': 'error', 'message': 'Partie non trouvée'}
-            
-            game = self.active_games[game_id]
-            total_time = sum(answer['time_taken'] for answer in game['answers_history'])
-            average_time = total_time / len(game['answers_history']) if game['answers_history'] else 0
-            
-            # Sauvegarde le score avec le temps moyen
-            self.db.save_score(
-                game['user_id'],
-                game['questions'][0][1],  # theme_id
-                game['score'],
-                average_time
-            )
-            
-            return {
-                'status': 'success',
-                'score': game['score'],
-                'total_time': total_time,
-                'average_time': average_time,
-                'history': game['answers_history']
-            }
+            with self.active_games.lock(game_id):
+                game = self.active_games.get(game_id)
+                if game is None or game.user_id != data.get('user_id'):
+                    return {'status': 'error', 'message': 'Partie non trouvée'}
+            
+                history = self.game_history(game)
+                total_time = sum(answer['time_taken'] for answer in history)
+                average_time = total_time / len(history) if history else 0
+            
+                # Sauvegarde le score avec le temps moyen (une seule fois par partie)
+                self.save_game_score(game_id, game, history)
+                self.touch_game(game_id, game)
+            
+                return {
+                    'status': 'success',
+                    'score': game.score,
+                    'total_time': total_time,
+                    'average_time': average_time,
+                    'history': history
+                }
         except Exception as e:
             print(f"Erreur get_game_summary: {e}")
             return {'status': 'error', 'message': str(e)}
@@ -280,21 +585,21 @@ class QuizServer:
             if not theme_id or not user_id:
                 return {'status': 'error', 'message': 'Données manquantes'}
             
-            # Génère un code unique de 4 chiffres
-            while True:
-                room_code = str(random.randint(1000, 9999))
-                if room_code not in self.duel_rooms:
-                    break
-            
-            # Crée le salon
-            self.duel_rooms[room_code] = {
+            room = {
                 'theme_id': theme_id,
                 'players': [user_id],  # Le créateur est le premier joueur
                 'max_players': 6,
                 'status': 'waiting',  # waiting, playing, finished
-                'questions': [],  # Sera rempli au démarrage
+                'question_ids': array('I'),  # Sera rempli au démarrage
                 'scores': {}
             }
+            # Génère un code unique de 4 chiffres, réservé atomiquement
+            while True:
+                room_code = str(random.randint(1000, 9999))
+                with self.duel_rooms.lock(room_code):
+                    if self.duel_rooms.put_if_absent(room_code, room):
+                        self.save_room(room_code, room)
+                        break
             
             return {'status': 'success', 'room_code': room_code}
         except Exception as e:
@@ -310,21 +615,25 @@ class QuizServer:
             if not room_code or not user_id:
                 return {'status': 'error', 'message': 'Données manquantes'}
             
-            room = self.duel_rooms.get(room_code)
-            if not room:
-                return {'status': 'error', 'message': 'Salon introuvable'}
+            # Vérifications et ajout sous le verrou du salon : pas de place prise deux fois
+            with self.duel_rooms.lock(room_code):
+                room = self.duel_rooms.get(room_code)
+                if not room:
+                    return {'status': 'error', 'message': 'Salon introuvable'}
             
-            if room['status'] != 'waiting':
-                return {'status': 'error', 'message': 'Le salon n\'accepte plus de joueurs'}
+                if room['status'] != 'waiting':
+                    return {'status': 'error', 'message': 'Le salon n\'accepte plus de joueurs'}
             
-            if len(room['players']) >= room['max_players']:
-                return {'status': 'error', 'message': 'Le salon est complet'}
+                if len(room['players']) >= room['max_players']:
+                    return {'status': 'error', 'message': 'Le salon est complet'}
             
-            if user_id in room['players']:
-                return {'status': 'error', 'message': 'Vous êtes déjà dans ce salon'}
+                if user_id in room['players']:
+                    return {'status': 'error', 'message': 'Vous êtes déjà dans ce salon'}
             
-            room['players'].append(user_id)
-            return {'status': 'success', 'message': 'Salon rejoint avec succès'}
+                room['players'].append(user_id)
+                self.journal.update('rooms', room_code, appends={'players': user_id})
+                self.touch_room(room_code)
+                return {'status': 'success', 'message': 'Salon rejoint avec succès'}
         except Exception as e:
             print(f"Erreur join_duel_room: {e}")
             return {'status': 'error', 'message': str(e)}    
@@ -340,6 +649,70 @@ class QuizServer:
         except Exception as e:
             print(f"Erreur get_leaderboard: {e}")
             return {'status': 'error', 'message': str(e)}
+    def handle_get_scores_page(self, data):
+        """Récupère une page de tous les scores (pagination par curseur)"""
+        try:
+            scores, next_cursor = self.db.get_scores_page(
+                data.get('theme_id'),
+                data.get('cursor'),
+                data.get('limit', 20),
+                data.get('since'),
+                data.get('until')
+            )
+            return {
+                'status': 'success',
+                'scores': scores,
+                'next_cursor': next_cursor
+            }
+        except Exception as e:
+            print(f"Erreur get_scores_page: {e}")
+            return {'status': 'error', 'message': str(e)}
+    def handle_search_questions(self, data):
+        """Recherche des questions par mots du texte ou des réponses"""
+        try:
+            text = data.get('query')
+            if not text:
+                return {'status': 'error', 'message': 'Données manquantes'}
+            questions, has_more = self.db.search_questions(
+                text,
+                data.get('theme_id'),
+                data.get('limit', 20),
+                data.get('offset', 0)
+            )
+            return {
+                'status': 'success',
+                'questions': questions,
+                'has_more': has_more
+            }
+        except Exception as e:
+            print(f"Erreur search_questions: {e}")
+            return {'status': 'error', 'message': str(e)}
+    def handle_get_user_rank(self, data):
+        """Récupère le rang d'un joueur et ses voisins au classement"""
+        try:
+            user_id = data.get('user_id')
+            if not user_id:
+                return {'status': 'error', 'message': 'Données manquantes'}
+            rank = self.db.get_user_rank(user_id, data.get('theme_id'), data.get('count', 5))
+            return dict(rank, status='success')
+        except Exception as e:
+            print(f"Erreur get_user_rank: {e}")
+            return {'status': 'error', 'message': str(e)}
+    def handle_get_user_stats(self, data):
+        """Récupère les statistiques d'un joueur"""
+        try:
+            user_id = data.get('user_id')
+            if not user_id:
+                return {'status': 'error', 'message': 'Données manquantes'}
+            stats = self.db.get_user_stats(user_id)
+            return {
+                'status': 'success',
+                'stats': stats['overall'],
+                'themes': stats['themes']
+            }
+        except Exception as e:
+            print(f"Erreur get_user_stats: {e}")
+            return {'status': 'error', 'message': str(e)}
     def handle_get_room_players(self, data):
         """Récupère la liste des joueurs dans un salon"""
         try:
@@ -347,54 +720,47 @@ class QuizServer:
             if not room_code:
                 return {'status': 'error', 'message': 'Code de salon manquant'}
             
-            room = self.duel_rooms.get(room_code)
-            if not room:
-                return {'status': 'error', 'message': 'Salon introuvable'}
+            with self.duel_rooms.lock(room_code):
+                room = self.duel_rooms.get(room_code)
+                if not room:
+                    return {'status': 'error', 'message': 'Salon introuvable'}
+                self.touch_room(room_code)
             
-            # Récupère les noms des joueurs
-            players = []
-            # Crée un nouveau curseur pour cette opération
-            with self.db.conn:
-                cursor = self.db.conn.cursor()
+                # Récupère les noms des joueurs
+                players = []
                 for player_id in room['players']:
-                    cursor.execute('''
-                    SELECT username FROM users WHERE user_id = ?
-                    ''', (player_id,))
-                    result = cursor.fetchone()
-                    if result:
+                    username = self.db.get_username(player_id)
+                    if username:
                         players.append({
                             'user_id': player_id,
-                            'username': result[0],
+                            'username': username,
                             'is_host': player_id == room['players'][0]
                         })
             
-            response = {
-                'status': 'success',
-                'players': players,
-                'is_host': data.get('user_id') == room['players'][0],
-                'game_started': room['status'] == 'playing',
-                'theme_id': room['theme_id']
-            }
+                response = {
+                    'status': 'success',
+                    'players': players,
+                    'is_host': data.get('user_id') == room['players'][0],
+                    'game_started': room['status'] == 'playing',
+                    'theme_id': room['theme_id']
+                }
             
-            # Si la partie a démarré, ajoute les informations nécessaires
-            if room['status'] == 'playing':
-                game_id = f"duel_{room_code}_{data.get('user_id')}_{int(time.time())}"
-                if data.get('user_id') in room['players']:  # Vérifie que le joueur est dans la partie
-                    if game_id not in self.active_games:  # Crée le jeu s'il n'existe pas déjà
-                        self.active_games[game_id] = {
-                            'questions': room['questions'].copy(),
-                            'current_index': 0,
-                            'score': 0,
-                            'user_id': data.get('user_id'),
-                            'room_code': room_code,
-                            'answers_history': [],
-                            'start_time': time.time(),
-                            'theme_id': room['theme_id']
-                        }
-                    response['game_id'] = game_id
-                    response['first_question'] = room['questions'][0] if room['questions'] else None
+                # Si la partie a démarré, ajoute les informations nécessaires
+                if room['status'] == 'playing':
+                    # Même identifiant que la partie créée au lancement du duel
+                    started_at = room.get('started_at', int(time.time()))
+                    game_id = f"duel_{room_code}_{data.get('user_id')}_{started_at}"
+                    if data.get('user_id') in room['players']:  # Vérifie que le joueur est dans la partie
+                        # Partie créée par start_duel ; elle n'est jamais recréée
+                        # (une partie terminée et retirée reste terminée)
+                        if game_id not in self.active_games:
+                            return {'status': 'error', 'message': 'Partie introuvable ou terminée'}
+                        response['game_id'] = game_id
+                        response['first_question'] = (self.questions.get(room['question_ids'][0])
+                                                      if room['question_ids'] else None)
+                        response['question_index'] = 0
                 
-            return response
+                return response
         except Exception as e:
             print(f"Erreur get_room_players: {e}")
             return {'status': 'error', 'message': str(e)}
@@ -405,860 +771,77 @@ class QuizServer:
             room_code = data.get('room_code')
             user_id = data.get('user_id')
             
-            room = self.duel_rooms.get(room_code)
-            if not room:
-                return {'status': 'error', 'message': 'Salon introuvable'}
+            with self.duel_rooms.lock(room_code):
+                room = self.duel_rooms.get(room_code)
+                if not room:
+                    return {'status': 'error', 'message': 'Salon introuvable'}
             
-            if user_id != room['players'][0]:
-                return {'status': 'error', 'message': 'Seul l\'hôte peut démarrer la partie'}
+                if user_id != room['players'][0]:
+                    return {'status': 'error', 'message': 'Seul l\'hôte peut démarrer la partie'}
             
-            if len(room['players']) < 2:
-                return {'status': 'error', 'message': 'Il faut au moins 2 joueurs pour démarrer'}
+                if len(room['players']) < 2:
+                    return {'status': 'error', 'message': 'Il faut au moins 2 joueurs pour démarrer'}
             
-            room['status'] = 'playing'
-            # Initialisation des questions comme dans une partie normale
-            questions = self.db.get_questions_for_game(room['theme_id'])
-            formatted_questions = []
-            used_questions = set()
-
-            if QuestionType.OPEN in questions:
-                formatted_questions.extend(self.add_unique_questions(questions[QuestionType.OPEN], 5, used_questions))
-            if QuestionType.QUAD in questions:
-                formatted_questions.extend(self.add_unique_questions(questions[QuestionType.QUAD], 10, used_questions))
-            if QuestionType.DUAL in questions:
-                formatted_questions.extend(self.add_unique_questions(questions[QuestionType.DUAL], 20, used_questions))
-
-            random.shuffle(formatted_questions)
+                if room['status'] != 'waiting':
+                    return {'status': 'error', 'message': 'La partie a déjà commencé'}
             
-            # Initialise la partie pour chaque joueur
-            for player_id in room['players']:
-                game_id = f"duel_{room_code}_{player_id}_{int(time.time())}"
-                self.active_games[game_id] = {
-                    'questions': formatted_questions.copy(),
-                    'current_index': 0,
-                    'score': 0,
-                    'user_id': player_id,
-                    'room_code': room_code,
-                    'answers_history': [],
-                    'start_time': time.time(),
-                    'theme_id': room['theme_id']  # Ajout du theme_id ici
-                }
-                room['scores'][player_id] = 0
-
-            room['questions'] = formatted_questions
-            room['current_question_index'] = 0
+                # Questions préparées comme pour une partie normale
+                question_ids = self.packs.take(room['theme_id'])
+                if question_ids is None:
+                    return {'status': 'error', 'message': 'Pas assez de questions disponibles'}
+                room['status'] = 'playing'
             
-            return {
-                'status': 'success',
-                'message': 'La partie va commencer',
-                'first_question': formatted_questions[0],
-                'game_id': f"duel_{room_code}_{user_id}_{int(time.time())}",
-                'theme_id': room['theme_id']  # Ajout du theme_id ici aussi
-            }
+                # Initialise la partie pour chaque joueur (liste des questions partagée ;
+                # le salon garde la référence du paquet, chaque partie en prend une)
+                started_at = int(time.time())
+                for player_id in room['players']:
+                    game_id = f"duel_{room_code}_{player_id}_{started_at}"
+                    game = GameSession(player_id, room['theme_id'], question_ids, room_code)
+                    with self.active_games.lock(game_id):
+                        self.active_games.put(game_id, game)
+                        self.questions.acquire(question_ids)
+                        self.save_game(game_id, game)
+                    room['scores'][player_id] = 0
+
+                room['question_ids'] = question_ids
+                room['current_question_index'] = 0
+                room['started_at'] = started_at
+                self.save_room(room_code, room)
+            
+                return {
+                    'status': 'success',
+                    'message': 'La partie va commencer',
+                    'first_question': self.questions.get(question_ids[0]),
+                    'question_index': 0,
+                    'game_id': f"duel_{room_code}_{user_id}_{started_at}",
+                    'theme_id': room['theme_id']  # Ajout du theme_id ici aussi
+                }
         except Exception as e:
             print(f"Erreur start_duel: {e}")
             return {'status': 'error', 'message': str(e)}
 
-    def add_unique_questions(self, question_list, count, used_questions):
-        """Helper pour ajouter des questions uniques"""
-        added = []
-        for q in question_list:
-            question_text = q[4]
-            if question_text not in used_questions and len(added) < count:
-                used_questions.add(question_text)
-                added.append(q)
-        return added       
-
 def initialize_test_data(db):
-    """Initialise les données de test"""
-    themes = [
-        "Histoire",
-        "Sciences",
-        "Géographie",
-        "Sport",
-        "Culture Générale"
-    ]
-    
-    for theme_name in themes:
-        db.cursor.execute("INSERT OR IGNORE INTO themes (theme_name) VALUES (?)", (theme_name,))
-    
-    theme_ids = {}
-    for theme_name in themes:
-        db.cursor.execute("SELECT theme_id FROM themes WHERE theme_name = ?", (theme_name,))
-        theme_ids[theme_name] = db.cursor.fetchone()[0]
-        test_questions = {
-        "Histoire": [
-            {
-                "type": QuestionType.DUAL,
-                "question": "La Seconde Guerre mondiale a-t-elle commencé en 1939?",
-                "correct": "Oui",
-                "wrong": ["Non"]
-            },
-            {
-                "type": QuestionType.QUAD,
-                "question": "Qui a découvert l'Amérique?",
-                "correct": "Christophe Colomb",
-                "wrong": ["Marco Polo", "Vasco de Gama", "Magellan"]
-            },
-            {
-                "type": QuestionType.OPEN,
-                "question": "En quelle année la Révolution française a-t-elle commencé ?",
-                "correct": "1789",
-                "wrong": []
-            },
-            {
-                "type": QuestionType.OPEN,
-                "question": "Qui a été le premier empereur de France ?",
-                "correct": "Napoléon",
-                "wrong": []
-            },
-            {
-                "type": QuestionType.OPEN,
-                "question": "En quelle année a eu lieu la Révolution russe ?",
-                "correct": "1917",
-                "wrong": []
-            },
-            {
-                "type": QuestionType.OPEN,
-                "question": "Quelle civilisation a construit les Pyramides",
-                "correct": "Égyptiens",
-                "wrong": []
-            },
-            {
-                "type": QuestionType.OPEN,
-                "question": "Qui a été le premier empereur de Rome",
-                "correct": "Auguste",
-                "wrong": []
-            },
-            {
-                "type": QuestionType.QUAD,
-                "question": "Qui a été le premier PRésident des États-Unis?",
-                "correct": "George Washington",
-                "wrong": ["Abraham Lincoln", "Thomas Jefferson", "Franklin Rosevelt"]
-            },
-            {
-                "type": QuestionType.QUAD,
-                "question": "Quelle bataille a eu lieu en 1066",
-                "correct": "Bataille d'Hastings",
-                "wrong": ["Bataille de Waterloo", "Bataille de Normanide", "Bataille de Gaugamela"]
-            },
-            {
-                "type": QuestionType.QUAD,
-                "question": "Qui a été le premier ministre du Royaaume-Uni pendant la Seconde Guerre mondiale ?",
-                "correct": "Winston Churchill",
-                "wrong": ["Neville Chamberlain", "Clement Attlee", "David Cameron"]
-            },
-            {
-                "type": QuestionType.QUAD,
-                "question": "En quelle anné a été signé le traité de Versailles ?",
-                "correct": "1919",
-                "wrong": ["1914", "1939", "1945"]
-            },
-            {
-                "type": QuestionType.QUAD,
-                "question": "Qui a fondé l'Empire Mongol ?",
-                "correct": "Gengis Khan",
-                "wrong": ["Kublai Khan", "Attila le Hun", "Tamerlan"]
-            },
-            {
-                "type": QuestionType.QUAD,
-                "question": "Quel évènement a marqué la fin de l'empire romain d'Occident",
-                "correct": "La chute de Rome en 476",
-                "wrong": ["Bataille de Hastings", "La conquête de Constantinople", "Le sac de ROme par les Gaulois"]
-            },
-            {
-                "type": QuestionType.QUAD,
-                "question": "Qui était le leader de l'URSS pendanrt la crise des missiles de Cuba",
-                "correct": "Nikita Krouchtchev",
-                "wrong": ["Joseph Staline", "Leonid Brejnev", "Mikhail Gorbatchev"]
-            },
-            {
-                "type": QuestionType.QUAD,
-                "question": "Quel évènement a marqué le début de la Révolution Industrielle ?",
-                "correct": "L'invention de la machine à vapeur",
-                "wrong": ["La découverte de l'électricité", "L'invention de l'ampoule", "L'invention du téléphone"]
-            },
-            {
-                "type": QuestionType.QUAD,
-                "question": "En quelle anné a eu lieu le débarquement en Normandie",
-                "correct": "1944",
-                "wrong": ["1943", "1940", "1918"]
-            },
-            {
-                "type": QuestionType.DUAL,
-                "question": "Qui a été le denrier roi de France ?",
-                "correct": "Charles X",
-                "wrong": ["Louis XVI"]
-            },
-            {
-                "type": QuestionType.DUAL,
-                "question": "Quel pays a été le principal adversaire de Napoléon Bonaparte lors de sguerres napoléoniennes",
-                "correct": "Royaume-Uni",
-                "wrong": ["Prusse"]
-            },
-            {
-                "type": QuestionType.DUAL,
-                "question": "Quel traité a mit fin à la Première Guerre mondiale",
-                "correct": "Traité de Versailles",
-                "wrong": ["Traité de Paris"]
-            },
-            {
-                "type": QuestionType.DUAL,
-                "question": "Qui a mené la conquête de l'Égypte par les Romains ?",
-                "correct": "Jules César",
-                "wrong": ["Octave"]
-            },
-            {
-                "type": QuestionType.DUAL,
-                "question": "Quel empereur romain a divisé l'Empire en deux parties ?",
-                "correct": "Dioclétien",
-                "wrong": ["Augustus"]
-            },
-            {
-                "type": QuestionType.DUAL,
-                "question": "Quel évènement a conduit à la fin de la monarchie absolue en France",
-                "correct": "Révolutoin français",
-                "wrong": ["Abolition de l'esclavagisme"]
-            },
-            {
-                "type": QuestionType.DUAL,
-                "question": "Qui a écrit << Le Prince >> au XVIe siècle ?",
-                "correct": "Nicolas Machiavel",
-                "wrong": ["Jean Bodin"]
-            },
-            {
-                "type": QuestionType.DUAL,
-                "question": "Qui a été le dirigeant de l'Allemagne nazie pendant la Seconde Guerre mondiale ?",
-                "correct": "Adolf Hitler",
-                "wrong": ["Kaiser Wilhelm II"]
-            },
-
-        ],
-        "Sciences": [
-            {
-                "type": QuestionType.DUAL,
-                "question": "L'eau bout-elle à 100°C au niveau de la mer?",
-                "correct": "Oui",
-                "wrong": ["Non"]
-            },
-            {
-                "type": QuestionType.QUAD,
-                "question": "Quel est le symbole chimique de l'or?",
-                "correct": "Au",
-                "wrong": ["Ag", "Fe", "Cu"]
-            },
-            {
-                "type": QuestionType.OPEN,
-                "question": "Quelle est la vitesse de la lumière en km/s?",
-                "correct": "299792",
-                "wrong": []
-            },
-            {
-                "type": QuestionType.OPEN,
-                "question": "D’après Charles Darwin, quel phénomène permet à chaque espèce de s’adapter à son environnement par une transmission des gènes avantageux ?",
-                "correct": "Sélection naturelle",
-                "wrong": []
-            },
-            {
-                "type": QuestionType.OPEN,
-                "question": "Quel est le symbole chimique du Potassium ?",
-                "correct": "K",
-                "wrong": []
-            },
-            {
-                "type": QuestionType.OPEN,
-                "question": "En géographie, combien y'a t-il de fuseaux horaires ?",
-                "correct": "24",
-                "wrong": []
-            },
-            {
-                "type": QuestionType.OPEN,
-                "question": "Quelle membrane tapissant le fond de l’œil nous sert à capter les images et la lumière ?",
-                "correct": "La rétine",
-                "wrong": []
-            },
-            {
-                "type": QuestionType.DUAL,
-                "question": "Après l’éléphant, quel animal terrestre est le plus lourd ? ",
-                "correct": "rhinocéros",
-                "wrong": ["hippopotame"]
-            },
-            {
-                "type": QuestionType.DUAL,
-                "question": "Quel est le nom complet de l’organisation spatiale américaine connue sous le sigle NASA ?",
-                "correct": "National Aeronautics and Space Administration",
-                "wrong": ["National aeronautics and Space America "]
-            },
-            {
-                "type": QuestionType.DUAL,
-                "question": "Le joule est une unité de mesure …",
-                "correct": "d'énergie",
-                "wrong": ["de puissance"]
-            },
-            {
-                "type": QuestionType.DUAL,
-                "question": "Lors de la combustion, le combustible réagit avec…",
-                "correct": "un comburant",
-                "wrong": ["un carburant"]
-            },
-            {
-                "type": QuestionType.DUAL,
-                "question": "Dans un triangle rectangle, le carré de la longueur de l’hypoténuse est égal à…",
-                "correct": "la somme des carrés de ses deux autres côtés",
-                "wrong": ["la somme de la longueur de ses autres côtés"]
-            },
-            {
-                "type": QuestionType.DUAL,
-                "question": "Qu’est qu’une « zone de subduction » ?",
-                "correct": "L’endroit où une plaque tectonique plonge sous une autre",
-                "wrong": ["Le lieu où se forment les cyclones"]
-            },
-            {
-                "type": QuestionType.DUAL,
-                "question": "Quelle est l’épaisseur moyenne de l’atmosphère terrestre ?",
-                "correct": "600 km",
-                "wrong": ["100 km"]
-            },
-
-            {
-                "type": QuestionType.DUAL,
-                "question": "Quel élément chimique a pour symbole la lettre N ?",
-                "correct": "Azote",
-                "wrong": ["Néptunium"]
-            },
-            {
-                "type": QuestionType.DUAL,
-                "question": "Comment appelle-t-on un réseau internet hertzien (sans fil) ?",
-                "correct": "Hertzien",
-                "wrong": ["TNT"]
-            },
-            {
-                "type": QuestionType.QUAD,
-                "question": "Le centre de contrôle hormonal humain est :",
-                "correct": "L’hypothalamus",
-                "wrong": ["Le foie", "Le coeur", "l'épiphyse"]
-            },
-            {
-                "type": QuestionType.QUAD,
-                "question": "Quel scientifique a énoncé la loi de gravitation ?",
-                "correct": "Isaac Newton",
-                "wrong": ["Nikola Tesla", "Johannes Kepler", "Huygens"]
-            },
-            {
-                "type": QuestionType.QUAD,
-                "question": "On attribue la phrase : «Rien ne se perd, tout se transforme» à :",
-                "correct": "Antoine Lavoisier",
-                "wrong": ["Robert Boyle", "Amadéo Avogadro", "Albert Einstein"]
-            },
-            {
-                "type": QuestionType.QUAD,
-                "question": "De qui sont les quatre équations qui décrivent le comportement et les relations du champ électromagnétique ainsi que son interaction avec la matière ?",
-                "correct": "Maxwell",
-                "wrong": ["Fabre", "Chakaroun", "Becquerel"]
-            },
-            {
-                "type": QuestionType.QUAD,
-                "question": "En réseaux, un réseau local est défini par quel sigle ?",
-                "correct": "LAN",
-                "wrong": ["WOMAN", "MAN", "WAN"]
-            },
-            {
-                "type": QuestionType.QUAD,
-                "question": "Le système d’assurance maladie de type beveridgien a pour pays d’origine :",
-                "correct": "Le Royaume-Uni",
-                "wrong": ["Allemagne", "France", "Suisse"]
-            },
-            {
-                "type": QuestionType.QUAD,
-                "question": "Pour laquelle de ces maladies aucun vaccin n’est-il disponible ?",
-                "correct": "VIH",
-                "wrong": ["grippe", "Rougeole", "Varicelle"]
-            },
-            {
-                "type": QuestionType.QUAD,
-                "question": "Les diurétiques sont des médicaments :",
-                "correct": "Augmentant les urines",
-                "wrong": ["Augmentant les selles", "Augmentant la pression artérielle", "Augmentant la pression veineuse"]
-            },
-            {
-                "type": QuestionType.QUAD,
-                "question": "Quel câble est utilisé dans la fibre optique ? ",
-                "correct": "Câble en fibre de verre",
-                "wrong": ["Câble en cuivre", "Câble coaxial", "Câble à paire torsadée"]
-            },
-        ],
-        "Géographie": [
-            {
-                "type": QuestionType.DUAL,
-                "question": "Le Nil est-il le plus long fleuve du monde?",
-                "correct": "Oui",
-                "wrong": ["Non"]
-            },
-            {
-                "type": QuestionType.QUAD,
-                "question": "Quelle est la capitale de l'Australie?",
-                "correct": "Canberra",
-                "wrong": ["Sydney", "Melbourne", "Perth"]
-            },
-            {
-                "type": QuestionType.OPEN,
-                "question": "Combien y a-t-il de continents ?",
-                "correct": "7",
-                "wrong": []
-            },
-            {
-                "type": QuestionType.OPEN,
-                "question": "Quelle est la capitale de l'Australie",
-                "correct": "Canberra",
-                "wrong": []
-            },
-            {
-                "type": QuestionType.OPEN,
-                "question": "Quel est le fleuve le plus long du monde ?",
-                "correct": "Amazone",
-                "wrong": []
-            },
-            {
-                "type": QuestionType.OPEN,
-                "question": "Quel est le désert le plus grand du monde ?",
-                "correct": "Sahara",
-                "wrong": []
-            },
-            {
-                "type": QuestionType.OPEN,
-                "question": "Quelle montagne est la plus haute du monde ?",
-                "correct": "Everest",
-                "wrong": []
-            },
-            {
-                "type": QuestionType.DUAL,
-                "question": "Quel océan est le plus grand ?",
-                "correct": "Pacifique",
-                "wrong": ["Atlantique"]
-            },
-            {
-                "type": QuestionType.DUAL,
-                "question": "Quelle est la plus grande île du monde ?",
-                "correct": "Groenland",
-                "wrong": ["Madagascar"]
-            },
-            {
-                "type": QuestionType.DUAL,
-                "question": "Quel pays possède le plus de lacs ?",
-                "correct": "Canada",
-                "wrong": ["Russie"]
-            },
-            {
-                "type": QuestionType.DUAL,
-                "question": "Quel est le continent le plus peuplé ?",
-                "correct": "Asie",
-                "wrong": ["Afrique"]
-            },
-            {
-                "type": QuestionType.DUAL,
-                "question": "Quelle est la mer la plus salée ?",
-                "correct": "Mer Morte",
-                "wrong": ["Mer Rouge"]
-            },
-            {
-                "type": QuestionType.DUAL,
-                "question": "Quel est la plus petite nation du monde ?",
-                "correct": "Vatican",
-                "wrong": ["Monaco"]
-            },
-            {
-                "type": QuestionType.DUAL,
-                "question": "Quel est le point le plus bas sur Terre ?",
-                "correct": "Mer Morte",
-                "wrong": ["Vallée de la Mort"]
-            },
-            {
-                "type": QuestionType.DUAL,
-                "question": "Quel est le pljus grand pays du monde en superficie ?",
-                "correct": "Russie",
-                "wrong": ["Chine"]
-            },
-            {
-                "type": QuestionType.QUAD,
-                "question": "Quelle est la capitale de l'Argentine",
-                "correct": "Buenos Aires",
-                "wrong": ["Lima", "Montevideo", "Santiago"]
-            },
-            {
-                "type": QuestionType.QUAD,
-                "question": "Quelle est lae plus petit continent en superficie ?",
-                "correct": "Europe",
-                "wrong": ["Amérique du Sud", "Australie", "Océanie"]
-            },
-            {
-                "type": QuestionType.QUAD,
-                "question": "Quel fleuve traverse la ville de Paris ?",
-                "correct": "Seine",
-                "wrong": ["Rhin", "Loire", "Tamise"]
-            },
-            {
-                "type": QuestionType.QUAD,
-                "question": "Quelle chaîne dem ontagne est la pljus longue du monde ?",
-                "correct": "Andes",
-                "wrong": ["Himalaya", "Rocheuses", "Alpes"]
-            },
-            {
-                "type": QuestionType.QUAD,
-                "question": "Quelle est la plus grande mer intérieure du monde ?",
-                "correct": "Mer Caspienne",
-                "wrong": ["Mer Méditerranée", "Mer Noire", "Mer Rouge"]
-            },
-            {
-                "type": QuestionType.QUAD,
-                "question": "Quel pays es t traversé par le Nil Bleu ?",
-                "correct": "Éthiophie",
-                "wrong": ["Ouganda", "Égypte", "Soudan"]
-            },
-            {
-                "type": QuestionType.QUAD,
-                "question": "Quel pays a le plus de frontières terrestrres ?",
-                "correct": "Chine",
-                "wrong": ["Brésil", "Inde", "Russie"]
-            },
-            {
-                "type": QuestionType.QUAD,
-                "question": "Quel est le plus grand désert froid du monde ?",
-                "correct": "Antarctique",
-                "wrong": ["Sahara", "Arctique", "Gobi"]
-            },
-            {
-                "type": QuestionType.QUAD,
-                "question": "Quelle Ville est surnomée la ville éternelle",
-                "correct": "Rome",
-                "wrong": ["Jérusalem", "Athènes", "Istanbul"]
-            },
-        ],
-        "Sport": [
-            {
-                "type": QuestionType.DUAL,
-                "question": "Le football se joue-t-il à 11 contre 11?",
-                "correct": "Oui",
-                "wrong": ["Non"]
-            },
-            {
-                "type": QuestionType.QUAD,
-                "question": "Quel pays a gagné le plus de Coupes du Monde de football?",
-                "correct": "Brésil",
-                "wrong": ["Allemagne", "Italie", "Argentine"]
-            },
-            {
-                "type": QuestionType.OPEN,
-                "question": "Combien de joueurs composent une équipe de basketball sur le terrain?",
-                "correct": "5",
-                "wrong": []
-            },
-            {
-                "type": QuestionType.OPEN,
-                "question": "Quel est le club détenant le plus de défaites d’affilée en Ligue des Champions ? ",
-                "correct": "Marseille",
-                "wrong": []
-            },
-            {
-                "type": QuestionType.OPEN,
-                "question": "Quel pays a remporté le plus de médailles dans l’histoire des jeux olympiques ?",
-                "correct": "Étas-Unis",
-                "wrong": []
-            },
-            {
-                "type": QuestionType.OPEN,
-                "question": "Quel est le meilleur buteur de l'histoire de la premier league ? ",
-                "correct": "Alan Shearer",
-                "wrong": []
-            },
-            {
-                "type": QuestionType.OPEN,
-                "question": "Quelle est l’année  de création du PSG ? ",
-                "correct": "1970",
-                "wrong": []
-            },
-            {
-                "type": QuestionType.QUAD,
-                "question": "Quel pays a remporté la Coupe du Monde de football 2018 ?",
-                "correct": "France",
-                "wrong": ["Allemagne", "Italie", "Argentine"]
-            },
-            {
-                "type": QuestionType.QUAD,
-                "question": "Quelle est la hauteur d'un filet dans un match de volleyball masculin ?",
-                "correct": "2,43 m",
-                "wrong": ["2,24 m", "2,50 m ", "2,15"]
-            },
-            {
-                "type": QuestionType.QUAD,
-                "question": "Qui a remporté le Ballon d'Or en 2022 ?",
-                "correct": "Benzema",
-                "wrong": ["Messi", "Modric", "Hakimi"]
-            },
-            {
-                "type": QuestionType.QUAD,
-                "question": "Dans quelle ville se déroule le marathon le plus célèbre du monde ?",
-                "correct": "Boston",
-                "wrong": ["Paris", "Tokyo", "Alger"]
-            },
-            {
-                "type": QuestionType.QUAD,
-                "question": "Quelle est la discipline sportive de Simone Biles ?",
-                "correct": "Gymnastique artistique",
-                "wrong": ["Natation", "Tennis", "Patinage artistique"]
-            },
-            {
-                "type": QuestionType.QUAD,
-                "question": "Quel est le poste du basketteur Tony Parker ?",
-                "correct": "Menuer",
-                "wrong": ["Pivot", "Ailier fort", "Arrière"]
-            },
-            {
-                "type": QuestionType.QUAD,
-                "question": "Quel héros de cartoon affronte Michael Jordan dans le film « Space Jam » ?",
-                "correct": "Buggs Bunny",
-                "wrong": ["Looney Tunes", "Jerry", "Stich"]
-            },
-            {
-                "type": QuestionType.QUAD,
-                "question": "Quel est le nom de l’entraîneur de l’équipe masculine de France de basket depuis 2009 ?",
-                "correct": "Vincent Collet",
-                "wrong": ["Belarbi Wassim", "Pierre Vincent", "Jacques Monclar"]
-            },
-            {
-                "type": QuestionType.QUAD,
-                "question": "Quel a été le match le plus long de l'histoire de Roland Garros ?",
-                "correct": "Santoro contre Clément",
-                "wrong": ["Nadal contre Federer", "Nadal contre Djokovic", "Noah contre Lendl"]
-            },
-            {
-                "type": QuestionType.DUAL,
-                "question": "Depuis 2011, combien de fois l’Olympique de Marseille a gagné contre le PSG ?",
-                "correct": "1 fois",
-                "wrong": ["2 fois"]
-            },
-            {
-                "type": QuestionType.DUAL,
-                "question": "Quel est le premier pays africain à atteindre les quarts de finale de coupe du monde ? ",
-                "correct": "Cameroun",
-                "wrong": ["Nigéira"]
-            },
-            {
-                "type": QuestionType.DUAL,
-                "question": "Quel fut le score de la confrontation entre l'Algérie et le Maroc en 2011 à Marrakech (Victoire du Maroc évidemment) ",
-                "correct": "4-0",
-                "wrong": ["3-0"]
-            },
-            {
-                "type": QuestionType.DUAL,
-                "question": "Quel joueur est surnommé El Flaco ?",
-                "correct": "Javier Pastore",
-                "wrong": ["Ezequiel Lavezzi"]
-            },
-            {
-                "type": QuestionType.DUAL,
-                "question": "Quel joueur met le troisième but en pleine lucarne lors de la fameuse victoire 4-0 du FC Barcelone contre le Réal Madrid en 2015 ?",
-                "correct": "Andres Iniesta",
-                "wrong": ["Luis Suarez"]
-            },
-            {
-                "type": QuestionType.DUAL,
-                "question": "Quel joueur de tennis détient le record de titres en Grand Chelem (en simple) chez les hommes en 2023 ?",
-                "correct": "Novak Djokovic",
-                "wrong": ["Roger Federer"]
-            },
-            {
-                "type": QuestionType.DUAL,
-                "question": "Quel joueur de basket a été le plus jeune MVP de l'histoire de la NBA ?",
-                "correct": "Lebron James",
-                "wrong": ["Derrick Rose"]
-            },
-            {
-                "type": QuestionType.DUAL,
-                "question": "En Formule 1, quelle écurie a remporté le plus de titres constructeurs ?",
-                "correct": "Ferrari",
-                "wrong": ["McLaren"]
-            },
-            {
-                "type": QuestionType.DUAL,
-                "question": "Quel nageur détient le record du plus grand nombre de médailles olympiques dans l'histoire ?",
-                "correct": "Michael Phelps",
-                "wrong": ["Mark Spitz"]
-            }
-        ],
-        "Culture Générale": [
-            {
-                "type": QuestionType.DUAL,
-                "question": "La Joconde est-elle au Louvre?",
-                "correct": "Oui",
-                "wrong": ["Non"]
-            },
-            {
-                "type": QuestionType.QUAD,
-                "question": "Qui a peint la Joconde?",
-                "correct": "Leonard de Vinci",
-                "wrong": ["Michel-Ange", "Raphaël", "Botticelli"]
-            },
-            {
-                "type": QuestionType.OPEN,
-                "question": "En quelle année est mort Mozart?",
-                "correct": "1791",
-                "wrong": []
-            },
-            {
-                "type": QuestionType.DUAL,
-                "question": "Quelle est la langue officielle du Vatican ?",
-                "correct": "LAtin",
-                "wrong": ["Italien"]
-            },
-            {
-                "type": QuestionType.DUAL,
-                "question": "Quel est le nom de la monnaie utilisée dans le jeu Monopoly ?",
-                "correct": "Dollars Monopoly",
-                "wrong": ["Euro"]
-            },
-            {
-                "type": QuestionType.DUAL,
-                "question": "Dans quel domaine excelle le chef cuisinier Gordon Ramsay ?",
-                "correct": "Cuisine",
-                "wrong": ["Pâtisserie"]
-            },
-            {
-                "type": QuestionType.DUAL,
-                "question": "Quel est le nom de l'arme emblématique de James Bond ?",
-                "correct": "Walther PPK",
-                "wrong": ["Beretta"]
-            },
-            {
-                "type": QuestionType.DUAL,
-                "question": "Quel instrument utilise un chef d'orchestre pour diriger les musiciens ?",
-                "correct": "Baguette",
-                "wrong": ["Archet"]
-            },
-            {
-                "type": QuestionType.DUAL,
-                "question": "Quel est le jeu de société où l'on peut devenir « détective » pour résoudre un meurtre ?",
-                "correct": "Cluedo",
-                "wrong": ["Scrabble"]
-            },
-            {
-                "type": QuestionType.DUAL,
-                "question": "Dans quel sport est attribué le trophée Larry O'Brien ?",
-                "correct": "Basketball",
-                "wrong": ["Tennis"]
-            },
-            {
-                "type": QuestionType.DUAL,
-                "question": "Quel célèbre magicien est connu pour son tour « de l’évasion » ?",
-                "correct": "Harry Houdini",
-                "wrong": ["David Copperfield"]
-            },
-            {
-                "type": QuestionType.DUAL,
-                "question": "Quelle couleur obtient-on en mélangeant du bleu et du jaune ?",
-                "correct": "Vert",
-                "wrong": ["Violet"]
-            },
-            {
-                "type": QuestionType.OPEN,
-                "question": "Quel est le prénom du personnage principal dans le roman Madame Bovary ?",
-                "correct": "Emma",
-                "wrong": []
-            },
-            {
-                "type": QuestionType.OPEN,
-                "question": "Quel film a remporté l'Oscar du meilleur film en 1998 ?",
-                "correct": "Titanic",
-                "wrong": []
-            },
-            {
-                "type": QuestionType.OPEN,
-                "question": "Quelle est la capitale de la mode en Italie ?",
-                "correct": "Milan",
-                "wrong": []
-            },
-            {
-                "type": QuestionType.OPEN,
-                "question": "Quel est le plat principal traditionnel de l'Espagne ?",
-                "correct": "Paella",
-                "wrong": []
-            },
-            {
-                "type": QuestionType.QUAD,
-                "question": "Quel auteur a écrit Les Misérables ?",
-                "correct": "Victor Hugo",
-                "wrong": ["Flaubert", "Émile Zola", "Botticelli"]
-            },
-            {
-                "type": QuestionType.QUAD,
-                "question": "Quelle série met en scène les familles Stark, Lannister et Targaryen ?",
-                "correct": "Games of Thrones",
-                "wrong": ["Breaking Bad", "The Witcher", "VIkings"]
-            },
-            {
-                "type": QuestionType.QUAD,
-                "question": "Quel peintre est célèbre pour ses nénuphars ?",
-                "correct": "Claude Monet",
-                "wrong": ["Salvador Dali", "Pablo Picasso", "Paul Cézanne"]
-            },
-            {
-                "type": QuestionType.QUAD,
-                "question": "Quel est le nombre total de cases sur un échiquier ?",
-                "correct": "64",
-                "wrong": ["48", "54", "100"]
-            },
-            {
-                "type": QuestionType.QUAD,
-                "question": "Quelle est la devise nationale de la France ?",
-                "correct": "Liberté Égalité Fraternité",
-                "wrong": ["Égalité Fraternité Solidarité", "Justice Liberté Respect", "Liberté Impôts RSA"]
-            },
-            {
-                "type": QuestionType.QUAD,
-                "question": "Qui est l'inventeur de l'imprimerie moderne ?",
-                "correct": "Johannes Gutenberg",
-                "wrong": ["Isaac Newton", "Thomas Edison", "Léonard de Vinci"]
-            },
-            {
-                "type": QuestionType.QUAD,
-                "question": "Quel acteur incarne Jack dans Titanic ?",
-                "correct": "Leonardo DiCaprio",
-                "wrong": ["Brad Pitt", "Tom Cruise", "Depardieu"]
-            },
-            {
-                "type": QuestionType.QUAD,
-                "question": "Quelle est la boisson nationale du Japon ?",
-                "correct": "Saké",
-                "wrong": ["Bissap", "Atay", "Thé Matcha"]
-            },
-            {
-                "type": QuestionType.QUAD,
-                "question": "Quel super-héros est connu pour son amour des tacos ?",
-                "correct": "Deadpool",
-                "wrong": ["Batman", "Spider-Man", "Superman"]
-            },
-
-
-
-        ]
-    }
-
-    # Ajout des questions dans la base de données
-    for theme_name, questions in test_questions.items():
-        theme_id = theme_ids[theme_name]
-        for q in questions:
-            db.add_question(
-                theme_id=theme_id,
-                question_type=q["type"],
-                question_text=q["question"],
-                correct_answer=q["correct"],
-                wrong_answers=q["wrong"]
-            )
-
-    db.conn.commit()
+    """Charge les questions initiales (une seule fois par version du fichier)"""
+    report = import_seed_file(db)
+    if report:
+        print(f"{report.inserted} questions initiales ajoutées")
 
 def main():
+    parser = argparse.ArgumentParser(description="Serveur de quiz")
+    parser.add_argument('--stockage', choices=STORAGE_BACKENDS, default='sqlite',
+                        help="'sqlite' (fichier, par défaut) ou 'memoire' (rien n'est écrit sur le disque)")
+    parser.add_argument('--db', default='quiz.db', help="fichier de la base SQLite")
+    parser.add_argument('--sans-reprise', action='store_true',
+                        help="ne pas sauvegarder les parties en cours (toujours le cas avec --stockage memoire)")
+    parser.add_argument('--admin', action='append', default=[], metavar='NOM',
+                        help="utilisateur autorisé à rechercher dans la banque de questions (répétable)")
+    args = parser.parse_args()
     try:
-        server = QuizServer()
+        options = {'read_snapshot': READ_SNAPSHOT} if args.stockage == 'sqlite' else {}
+        # En mémoire, rien n'est écrit sur le disque : pas de reprise des parties
+        state_directory = None if args.sans_reprise or args.stockage == 'memoire' else STATE_DIRECTORY
+        server = QuizServer(storage=open_storage(args.stockage, args.db, **options),
+                            state_directory=state_directory, admins=args.admin)
         print("Initialisation des données de test...")
         initialize_test_data(server.db)
         print("Données initialisées avec succès")
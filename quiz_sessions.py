@@ -0,0 +1,173 @@
+import hashlib
+import heapq
+import hmac
+import multiprocessing
+import os
+import secrets
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+# Hachage des mots de passe : PBKDF2-HMAC-SHA256, stocké sous la forme
+# pbkdf2_sha256$itérations$sel$empreinte. Les anciennes empreintes SHA-256
+# simples (64 caractères hexadécimaux) restent acceptées et sont remplacées
+# à la connexion suivante.
+PBKDF2_ITERATIONS = 200000
+PBKDF2_PREFIX = 'pbkdf2_sha256'
+
+
+def hash_password(password, iterations=PBKDF2_ITERATIONS):
+    """Calcule l'empreinte PBKDF2 d'un mot de passe (appelé dans un processus du pool)"""
+    salt = os.urandom(16)
+    digest = hashlib.pbkdf2_hmac('sha256', password.encode(), salt, iterations)
+    return f"{PBKDF2_PREFIX}${iterations}${salt.hex()}${digest.hex()}"
+
+
+def check_password(password, stored_hash):
+    """Vérifie un mot de passe ; retourne (valide, à rehacher)"""
+    if stored_hash.startswith(PBKDF2_PREFIX + '$'):
+        _, iterations, salt, digest = stored_hash.split('$')
+        candidate = hashlib.pbkdf2_hmac('sha256', password.encode(), bytes.fromhex(salt), int(iterations))
+        return hmac.compare_digest(candidate.hex(), digest), int(iterations) < PBKDF2_ITERATIONS
+    # Ancienne empreinte SHA-256 sans sel
+    legacy = hashlib.sha256(password.encode()).hexdigest()
+    return hmac.compare_digest(legacy, stored_hash), True
+
+
+class PasswordHasher:
+    """Exécute le hachage des mots de passe dans un pool de processus
+
+    PBKDF2 est volontairement lent : le calcul est fait hors des threads
+    clients, pour qu'une vague de connexions ne bloque pas les parties. Si
+    un processus du pool meurt, le pool est recréé et le calcul relancé une fois.
+    """
+
+    def __init__(self, max_workers=2):
+        self.max_workers = max_workers
+        self.pool = None
+        self.lock = threading.Lock()
+
+    def get_pool(self):
+        with self.lock:
+            if self.pool is None:
+                # 'spawn' : les processus ne doivent pas hériter de la socket d'écoute
+                self.pool = ProcessPoolExecutor(max_workers=self.max_workers,
+                                                mp_context=multiprocessing.get_context('spawn'))
+            return self.pool
+
+    def run(self, function, *args):
+        pool = self.get_pool()
+        try:
+            return pool.submit(function, *args).result()
+        except BrokenProcessPool:
+            print("Pool de hachage des mots de passe hors service, redémarrage")
+            self.discard(pool)
+            return self.get_pool().submit(function, *args).result()
+
+    def discard(self, pool):
+        """Oublie un pool hors service (un autre thread a pu le remplacer déjà)"""
+        with self.lock:
+            if self.pool is pool:
+                self.pool = None
+        pool.shutdown(wait=False)
+
+    def hash(self, password):
+        return self.run(hash_password, password)
+
+    def check(self, password, stored_hash):
+        return self.run(check_password, password, stored_hash)
+
+    def close(self):
+        with self.lock:
+            if self.pool is not None:
+                self.pool.shutdown()
+                self.pool = None
+
+
+class SessionStore:
+    """Jetons de session en mémoire, avec expiration et révocation
+
+    Un jeton est créé à la connexion et prolongé à chaque utilisation ; les
+    jetons expirés sont retirés grâce à un tas trié par date d'expiration,
+    sans parcourir toutes les sessions.
+
+    `journal` (StateJournal, facultatif) garde les sessions d'un démarrage à
+    l'autre : les clients restent connectés après un redémarrage.
+
+    Les jetons eux-mêmes ne sont gardés nulle part : les sessions sont
+    rangées sous l'empreinte SHA-256 du jeton (`token_key`), en mémoire
+    comme dans le journal.
+    """
+
+    def __init__(self, ttl=8 * 3600, journal=None):
+        self.ttl = ttl
+        self.journal = journal
+        self.sessions = {}     # empreinte du jeton -> [user_id, date d'expiration]
+        self.deadlines = []    # tas de (date d'expiration, empreinte du jeton)
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def token_key(token):
+        return hashlib.sha256(token.encode()).hexdigest()
+
+    def create(self, user_id):
+        """Crée un jeton pour un utilisateur authentifié"""
+        token = secrets.token_urlsafe(32)
+        key = self.token_key(token)
+        expires_at = time.monotonic() + self.ttl
+        with self.lock:
+            self.sessions[key] = [user_id, expires_at]
+            heapq.heappush(self.deadlines, (expires_at, key))
+            self.purge_expired()
+        if self.journal is not None:
+            self.journal.set('sessions', key, user_id)
+        return token
+
+    def restore(self, sessions):
+        """Reprend les sessions sauvegardées {empreinte: user_id}, avec une durée de validité complète"""
+        expires_at = time.monotonic() + self.ttl
+        with self.lock:
+            for key, user_id in sessions.items():
+                self.sessions[key] = [user_id, expires_at]
+                heapq.heappush(self.deadlines, (expires_at, key))
+
+    def resolve(self, token):
+        """Retourne l'utilisateur d'un jeton valide (et prolonge la session), sinon None"""
+        if not token or not isinstance(token, str):
+            return None
+        key = self.token_key(token)
+        now = time.monotonic()
+        with self.lock:
+            session = self.sessions.get(key)
+            if session is None or session[1] <= now:
+                return None
+            session[1] = now + self.ttl
+            return session[0]
+
+    def revoke(self, token):
+        if not token or not isinstance(token, str):
+            return
+        key = self.token_key(token)
+        with self.lock:
+            if self.sessions.pop(key, None) is not None:
+                self.forget(key)
+
+    def forget(self, key):
+        if self.journal is not None:
+            self.journal.delete('sessions', key)
+
+    def purge_expired(self):
+        """Retire les sessions expirées (appelé avec le verrou)"""
+        now = time.monotonic()
+        while self.deadlines and self.deadlines[0][0] <= now:
+            _, key = heapq.heappop(self.deadlines)
+            session = self.sessions.get(key)
+            if session is None:
+                continue
+            if session[1] <= now:
+                del self.sessions[key]
+                self.forget(key)
+            else:
+                # Session prolongée depuis : nouvelle échéance
+                heapq.heappush(self.deadlines, (session[1], key))
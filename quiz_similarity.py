@@ -0,0 +1,148 @@
+import hashlib
+import re
+import unicodedata
+import zlib
+from array import array
+
+# Détection des questions en double ou presque en double.
+#
+# Une question est comparée sur le texte normalisé « question | bonne réponse »
+# (sans accents, casse ni ponctuation) : deux questions identiques à la
+# normalisation près ont la même empreinte. Pour les quasi-doublons (fautes de
+# frappe, mots ajoutés), le texte est découpé en 4-grammes de caractères
+# résumés par une signature MinHash à une permutation (SIGNATURE_SIZE cases) ;
+# la signature est coupée en BANDS bandes et deux questions d'un même thème
+# qui partagent une bande sont candidates (LSH). Les candidates dont la
+# signature est assez proche sont vérifiées par l'indice de Jaccard exact de
+# leurs 4-grammes.
+
+SHINGLE_SIZE = 4
+SIGNATURE_SIZE = 40
+BANDS = 8
+ROWS_PER_BAND = SIGNATURE_SIZE // BANDS
+SIMILARITY_THRESHOLD = 0.7
+MAX_CANDIDATES = 8           # candidates examinées au plus par question
+BUCKET_SCAN = 16             # questions lues au plus par seau (seaux très fréquents)
+# Écart toléré entre l'estimation MinHash et le seuil avant la vérification exacte
+ESTIMATE_MARGIN = 0.15
+EMPTY_SLOT = 1 << 32
+BUCKET_MASK = (1 << 63) - 1
+WORD = re.compile(r'\w+')
+
+
+def normalize_text(text):
+    """Texte sans accents, en minuscules, ponctuation remplacée par des espaces"""
+    text = text or ''
+    if not text.isascii():
+        text = unicodedata.normalize('NFKD', text)
+        text = ''.join(char for char in text if not unicodedata.combining(char))
+    return ' '.join(WORD.findall(text.casefold()))
+
+
+def hash64(text):
+    """Hachage stable sur 64 bits signés (stockable dans un INTEGER SQLite)"""
+    return int.from_bytes(hashlib.blake2b(text.encode(), digest_size=8).digest(), 'big', signed=True)
+
+
+def shingles(text):
+    """Ensemble des n-grammes de caractères d'un texte normalisé"""
+    if len(text) <= SHINGLE_SIZE:
+        return {text}
+    return {text[i:i + SHINGLE_SIZE] for i in range(len(text) - SHINGLE_SIZE + 1)}
+
+
+def signature(shingle_set):
+    """Signature MinHash à une permutation, densifiée par rotation
+
+    Chaque n-gramme est haché une seule fois : les bits de poids faible
+    choisissent la case, le reste est la valeur dont on garde le minimum.
+    Une case vide reprend la valeur de la case non vide suivante.
+    """
+    slots = [EMPTY_SLOT] * SIGNATURE_SIZE
+    for shingle in shingle_set:
+        value = zlib.crc32(shingle.encode())
+        slot = value % SIGNATURE_SIZE
+        value //= SIGNATURE_SIZE
+        if value < slots[slot]:
+            slots[slot] = value
+    original = list(slots)
+    for i in range(SIGNATURE_SIZE):
+        offset = 0
+        while original[(i + offset) % SIGNATURE_SIZE] == EMPTY_SLOT:
+            offset += 1
+        if offset:
+            # Décalage ajouté pour distinguer une case empruntée de la case d'origine
+            slots[i] = original[(i + offset) % SIGNATURE_SIZE] + offset * EMPTY_SLOT
+    return slots
+
+
+def band_bucket(theme_id, band, values):
+    """Seau LSH d'une bande de signature (le thème en fait partie)"""
+    bucket = (theme_id or 0) * BANDS + band
+    for value in values:
+        bucket = ((bucket * 1000003) ^ value) & BUCKET_MASK
+    return bucket
+
+
+def estimated_similarity(first, second):
+    """Part des cases égales de deux signatures (estimation de l'indice de Jaccard)"""
+    first, second = array('Q', first), array('Q', second)
+    return sum(a == b for a, b in zip(first, second)) / SIGNATURE_SIZE
+
+
+def jaccard(first, second):
+    if not first and not second:
+        return 1.0
+    return len(first & second) / len(first | second)
+
+
+class QuestionFeatures:
+    """Empreinte exacte, n-grammes et seaux LSH d'une question"""
+
+    __slots__ = ('theme_id', 'fingerprint', 'shingles', 'signature', 'buckets')
+
+    def __init__(self, theme_id, question_text, correct_answer):
+        text = f"{normalize_text(question_text)} | {normalize_text(correct_answer)}"
+        self.theme_id = theme_id
+        self.fingerprint = hash64(text)
+        self.shingles = shingles(text)
+        slots = signature(self.shingles)
+        self.signature = array('Q', slots).tobytes()
+        self.buckets = [band_bucket(theme_id, band, slots[band * ROWS_PER_BAND:(band + 1) * ROWS_PER_BAND])
+                        for band in range(BANDS)]
+
+
+class DuplicateMatcher:
+    """Rattache les questions à un groupe de doublons, à travers un QueryRunner
+
+    Utilisé dans une écriture (ou une migration) : les questions et seaux
+    insérés dans la même transaction sont visibles pour les suivantes.
+    """
+
+    def __init__(self, queries, threshold=SIMILARITY_THRESHOLD):
+        self.queries = queries
+        self.threshold = threshold
+
+    def exact_duplicate(self, features):
+        """Groupe d'une question identique à la normalisation près, ou None"""
+        return self.queries.fetchone('question_by_fingerprint', (features.theme_id, features.fingerprint))
+
+    def similar_cluster(self, features):
+        """Groupe de la question la plus proche au-delà du seuil, ou None"""
+        best, best_similarity = None, self.threshold
+        candidates = self.queries.fetchall('similar_questions', features.buckets)
+        for candidate_signature, question_text, correct_answer, cluster_id in candidates:
+            # Tri rapide sur les signatures, vérification exacte pour les plus proches
+            if (candidate_signature is None or
+                    estimated_similarity(features.signature, candidate_signature) < self.threshold - ESTIMATE_MARGIN):
+                continue
+            text = f"{normalize_text(question_text)} | {normalize_text(correct_answer)}"
+            similarity = jaccard(features.shingles, shingles(text))
+            if similarity >= best_similarity:
+                best, best_similarity = cluster_id, similarity
+        return best
+
+    def add(self, question_id, features):
+        """Enregistre les seaux LSH d'une question insérée"""
+        self.queries.executemany('insert_question_bucket',
+                                 [(bucket, question_id) for bucket in features.buckets])
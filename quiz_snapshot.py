@@ -0,0 +1,146 @@
+import threading
+import time
+from quiz_queries import QueryRunner, connect
+
+# Tables lues par les classements, thèmes et statistiques : seules elles sont
+# copiées (ni la banque de questions et son index plein texte, ni la table
+# brute des scores, lue sur la base par la pagination de tous les scores)
+SNAPSHOT_TABLES = ('users', 'themes', 'score_rollups', 'user_stats')
+
+# Ce qui change le contenu de la copie : un nouveau joueur, un nouveau thème ou
+# un nouveau score (agrégats et statistiques ne changent qu'avec un score).
+# Les autres écritures (compteurs d'utilisation des questions, nouvelles
+# questions) changent PRAGMA data_version sans rendre la copie périmée.
+SNAPSHOT_SIGNATURE = '''
+    SELECT (SELECT MAX(user_id) FROM users), (SELECT MAX(theme_id) FROM themes),
+           (SELECT MAX(score_id) FROM scores)
+'''
+
+
+class ReadSnapshot:
+    """Copie en mémoire des tables de classement, en lecture seule, pour les lectures fréquentes
+
+    Les tables SNAPSHOT_TABLES (et leurs index) sont copiées dans une base en
+    mémoire, en une seule transaction de lecture, puis la copie est remplacée
+    par une nouvelle copie toutes les `refresh_interval` secondes si les
+    tables copiées ont changé (SNAPSHOT_SIGNATURE, vérifiée seulement quand
+    PRAGMA data_version a changé), ou dès que `refresh_after_writes`
+    écritures de ces tables ont été signalées par `note_write`. Les lectures ne touchent
+    alors plus au fichier et ne concurrencent pas les rafales d'écriture.
+
+    Même interface de lecture que ReaderPool (`fetchone`, `fetchall`). Si la
+    copie a plus de `max_staleness` secondes, les lectures sont faites sur
+    `fallback` (la base elle-même) jusqu'à la copie suivante.
+    """
+
+    def __init__(self, db_name, fallback, refresh_interval=2.0, refresh_after_writes=200,
+                 max_staleness=10.0):
+        self.db_name = db_name
+        self.source = connect(db_name)
+        self.fallback = fallback
+        self.refresh_interval = refresh_interval
+        self.refresh_after_writes = refresh_after_writes
+        self.max_staleness = max_staleness
+        self.runner = None
+        self.taken_at = 0.0        # date (monotone) à laquelle la copie était à jour
+        self.data_version = None
+        self.signature = None
+        self.writes = 0            # écritures signalées depuis la dernière copie
+        self.lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.running = True
+        self.refresh()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def refresh(self):
+        """Remplace la copie en mémoire par une copie de l'état actuel de la base"""
+        with self.lock:
+            self.writes = 0
+        taken_at = time.monotonic()
+        # Version lue avant la copie : un commit pendant la copie déclenchera la suivante
+        data_version = self.source.execute('PRAGMA data_version').fetchone()[0]
+        signature = self.source.execute(SNAPSHOT_SIGNATURE).fetchone()
+        memory = connect(':memory:')
+        memory.execute('ATTACH DATABASE ? AS source', (self.db_name,))
+        # Une transaction pour toute la copie : les tables sont copiées dans le même état
+        memory.execute('BEGIN')
+        schema = memory.execute(f'''
+            SELECT sql FROM source.sqlite_master
+            WHERE tbl_name IN ({', '.join('?' * len(SNAPSHOT_TABLES))}) AND sql IS NOT NULL
+            ORDER BY type = 'index'
+        ''', SNAPSHOT_TABLES).fetchall()
+        for (sql,) in schema:
+            if sql.upper().startswith('CREATE TABLE'):
+                memory.execute(sql)
+        for table in SNAPSHOT_TABLES:
+            memory.execute(f'INSERT INTO main.{table} SELECT * FROM source.{table}')
+        # Index créés après la copie des lignes (plus rapide)
+        for (sql,) in schema:
+            if not sql.upper().startswith('CREATE TABLE'):
+                memory.execute(sql)
+        memory.commit()
+        memory.execute('DETACH DATABASE source')
+        memory.execute('PRAGMA query_only = ON')
+        self.data_version = data_version
+        self.signature = signature
+        runner = QueryRunner(memory)
+        # L'ancienne copie est libérée quand plus aucune lecture ne l'utilise
+        with self.lock:
+            self.runner = runner
+            self.taken_at = taken_at
+
+    def is_current(self):
+        """Vrai si les tables copiées n'ont pas changé depuis la dernière copie"""
+        data_version = self.source.execute('PRAGMA data_version').fetchone()[0]
+        if data_version == self.data_version:
+            return True
+        if self.source.execute(SNAPSHOT_SIGNATURE).fetchone() != self.signature:
+            return False
+        # Seules d'autres tables ont changé (compteurs d'utilisation, questions)
+        self.data_version = data_version
+        return True
+
+    def run(self):
+        while True:
+            self.wakeup.wait(self.refresh_interval)
+            self.wakeup.clear()
+            if not self.running:
+                return
+            try:
+                if self.writes or not self.is_current():
+                    self.refresh()
+                else:
+                    checked_at = time.monotonic()
+                    with self.lock:
+                        self.taken_at = checked_at
+            except Exception as e:
+                print(f"Erreur lors de la copie en mémoire de la base: {e}")
+
+    def note_write(self):
+        """Signale une écriture ; déclenche une nouvelle copie toutes les N écritures"""
+        with self.lock:
+            self.writes += 1
+            if self.writes >= self.refresh_after_writes:
+                self.wakeup.set()
+
+    def current_runner(self):
+        """Retourne la copie en mémoire, ou None si elle est trop ancienne"""
+        with self.lock:
+            if time.monotonic() - self.taken_at > self.max_staleness:
+                return None
+            return self.runner
+
+    def fetchone(self, name, params=()):
+        runner = self.current_runner() or self.fallback
+        return runner.fetchone(name, params)
+
+    def fetchall(self, name, params=()):
+        runner = self.current_runner() or self.fallback
+        return runner.fetchall(name, params)
+
+    def close(self):
+        self.running = False
+        self.wakeup.set()
+        self.thread.join()
+        self.source.close()
@@ -0,0 +1,132 @@
+from abc import ABC, abstractmethod
+
+
+class QuizStorage(ABC):
+    """Interface de stockage du serveur : utilisateurs, thèmes, questions et scores
+
+    Deux implémentations : QuizDatabase (SQLite, quiz_database.py) et
+    MemoryStorage (dictionnaires en mémoire, quiz_memory_storage.py, sans
+    aucune écriture disque : tests, mesures, séances ponctuelles).
+    Le backend est choisi au démarrage avec `open_storage`.
+    """
+
+    def __init__(self):
+        self.question_listeners = []
+
+    def on_questions_changed(self, callback):
+        """Appelle `callback(theme_id)` après chaque ajout de questions à un thème"""
+        self.question_listeners.append(callback)
+
+    def notify_questions_changed(self, theme_ids):
+        for theme_id in theme_ids:
+            for callback in self.question_listeners:
+                callback(theme_id)
+
+    # Utilisateurs
+    @abstractmethod
+    def add_user(self, username, password):
+        """Ajoute un utilisateur ; False si le nom est déjà pris"""
+
+    @abstractmethod
+    def verify_user(self, username, password):
+        """Retourne l'identifiant de l'utilisateur si le mot de passe est bon, sinon None"""
+
+    @abstractmethod
+    def get_username(self, user_id):
+        ...
+
+    # Thèmes
+    @abstractmethod
+    def get_or_create_theme(self, theme_name):
+        ...
+
+    @abstractmethod
+    def get_theme_name(self, theme_id):
+        ...
+
+    @abstractmethod
+    def get_all_themes(self):
+        """[(theme_id, theme_name)]"""
+
+    # Questions
+    @abstractmethod
+    def add_question(self, theme_id, question_type, question_text, correct_answer, wrong_answers=None):
+        ...
+
+    @abstractmethod
+    def add_questions(self, rows):
+        """Ajoute un lot [(theme_id, QuestionType, texte, réponse, mauvaises réponses)] ;
+        retourne le nombre de questions ajoutées (doublons ignorés)"""
+
+    @abstractmethod
+    def get_seed_hash(self, seed_name):
+        ...
+
+    @abstractmethod
+    def set_seed_hash(self, seed_name, content_hash):
+        ...
+
+    @abstractmethod
+    def get_questions_for_game(self, theme_id):
+        """{QuestionType: [lignes de question]} pour une nouvelle partie"""
+
+    @abstractmethod
+    def record_question_usage(self, question_ids):
+        """Compte une utilisation des questions d'une partie qui commence"""
+
+    @abstractmethod
+    def search_questions(self, text, theme_id=None, limit=20, offset=0):
+        """(lignes, il reste des résultats)"""
+
+    # Scores et classements
+    @abstractmethod
+    def save_score(self, user_id, theme_id, score, total_time, answers=None):
+        ...
+
+    @abstractmethod
+    def archive_old_scores(self, max_age_days, chunk_size=1000):
+        """Retire les scores bruts plus anciens que `max_age_days` ; retourne leur nombre"""
+
+    @abstractmethod
+    def get_user_stats(self, user_id):
+        """{'overall': statistiques globales ou None, 'themes': [statistiques par thème]}"""
+
+    @abstractmethod
+    def get_user_rank(self, user_id, theme_id=None, count=5):
+        """{'rank', 'total', 'around'}"""
+
+    @abstractmethod
+    def get_top_scores(self, theme_id=None, limit=10):
+        ...
+
+    @abstractmethod
+    def get_scores_page(self, theme_id=None, cursor=None, limit=20, since=None, until=None):
+        """(lignes, curseur suivant ou None)"""
+
+    @abstractmethod
+    def get_leaderboard(self, theme_id=None, limit=10):
+        ...
+
+    @abstractmethod
+    def close(self):
+        ...
+
+
+# Backends disponibles pour open_storage
+STORAGE_BACKENDS = ('sqlite', 'memoire')
+
+
+def open_storage(backend='sqlite', db_name='quiz.db', **options):
+    """Ouvre le stockage choisi : 'sqlite' (fichier `db_name`) ou 'memoire'
+
+    `options` est passé au constructeur du backend (par exemple
+    `read_snapshot` pour SQLite).
+    """
+    # Imports ici : les deux modules importent QuizStorage
+    if backend == 'sqlite':
+        from quiz_database import QuizDatabase
+        return QuizDatabase(db_name, **options)
+    if backend == 'memoire':
+        from quiz_memory_storage import MemoryStorage
+        return MemoryStorage(**options)
+    raise ValueError(f"Stockage inconnu: {backend}")
@@ -0,0 +1,87 @@
+import math
+import threading
+import time
+
+
+class TimerWheel:
+    """Échéances courtes (temps de réponse aux questions), gérées par un seul thread
+
+    Roue à cases hachées : le temps est découpé en pas de `tick` secondes et
+    une échéance est rangée dans la case de son pas, modulo le nombre de
+    cases. À chaque pas, le thread ne regarde que la case courante ; les
+    échéances d'un tour suivant y restent. Programmer ou annuler une
+    échéance coûte O(1), et des milliers de parties en cours ne coûtent
+    qu'un réveil par pas. `on_expire(clé, donnée)` est appelé hors du
+    verrou, depuis le thread de la roue.
+    """
+
+    def __init__(self, on_expire, tick=0.25, slots=256):
+        self.on_expire = on_expire
+        self.tick = tick
+        self.slots = [{} for _ in range(slots)]   # case -> {clé: (échéance, donnée)}
+        self.slot_of = {}                         # clé -> case de son échéance
+        self.origin = time.monotonic()
+        self.cursor = 0                           # nombre de pas déjà traités
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    def schedule(self, key, delay, payload=None):
+        """Programme (ou reprogramme) l'échéance de `key` dans `delay` secondes"""
+        deadline = time.monotonic() + delay
+        with self.lock:
+            self.remove(key)
+            step = max(math.ceil((deadline - self.origin) / self.tick), self.cursor + 1)
+            slot = step % len(self.slots)
+            self.slots[slot][key] = (deadline, payload)
+            self.slot_of[key] = slot
+
+    def cancel(self, key):
+        with self.lock:
+            self.remove(key)
+
+    def remove(self, key):
+        """Retire l'échéance de `key` (appelé avec le verrou)"""
+        slot = self.slot_of.pop(key, None)
+        if slot is not None:
+            del self.slots[slot][key]
+
+    def __len__(self):
+        return len(self.slot_of)
+
+    def advance(self):
+        """Traite les pas écoulés ; retourne les (clé, donnée) arrivées à échéance"""
+        now = time.monotonic()
+        due = []
+        with self.lock:
+            while self.origin + (self.cursor + 1) * self.tick <= now:
+                self.cursor += 1
+                entries = self.slots[self.cursor % len(self.slots)]
+                for key, (deadline, payload) in list(entries.items()):
+                    if deadline <= now:
+                        del entries[key]
+                        del self.slot_of[key]
+                        due.append((key, payload))
+        return due
+
+    def start(self):
+        if self.thread is None:
+            self.thread = threading.Thread(target=self.run, daemon=True)
+            self.thread.start()
+
+    def run(self):
+        while True:
+            next_step = self.origin + (self.cursor + 1) * self.tick
+            if self.stop_event.wait(max(0.0, next_step - time.monotonic())):
+                return
+            for key, payload in self.advance():
+                try:
+                    self.on_expire(key, payload)
+                except Exception as e:
+                    print(f"Erreur lors de l'échéance de {key}: {e}")
+
+    def close(self):
+        self.stop_event.set()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
@@ -0,0 +1,90 @@
+import asyncio
+import queue
+import threading
+from concurrent.futures import Future
+from quiz_queries import QueryRunner, connect
+
+
+class DatabaseWriter:
+    """Thread d'écriture unique de la base
+
+    SQLite n'accepte qu'un écrivain à la fois : toutes les écritures passent
+    par une file et sont exécutées par un seul thread, qui possède sa propre
+    connexion. Les tâches en attente sont regroupées (jusqu'à `batch_size`)
+    dans une même transaction ; chacune a son point de sauvegarde, si bien
+    qu'une tâche en erreur n'annule pas les autres. Le résultat d'une tâche
+    n'est publié qu'après le commit.
+
+    Une tâche est une fonction qui reçoit le QueryRunner de la connexion
+    d'écriture ; elle ne doit pas faire elle-même de commit.
+    """
+
+    def __init__(self, db_name, batch_size=100):
+        self.conn = connect(db_name)
+        # Le mode WAL laisse les lecteurs travailler pendant les écritures
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.queries = QueryRunner(self.conn)
+        self.batch_size = batch_size
+        self.jobs = queue.Queue()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def submit(self, job):
+        """Met une écriture en file ; retourne un concurrent.futures.Future"""
+        future = Future()
+        self.jobs.put((job, future))
+        return future
+
+    async def submit_async(self, job):
+        """Version asyncio de submit : `await writer.submit_async(job)`"""
+        return await asyncio.wrap_future(self.submit(job))
+
+    def run(self):
+        running = True
+        while running:
+            batch = [self.jobs.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.jobs.get_nowait())
+                except queue.Empty:
+                    break
+            if None in batch:
+                running = False
+                batch = [item for item in batch if item is not None]
+            if batch:
+                self.execute_batch(batch)
+
+    def execute_batch(self, batch):
+        """Exécute un groupe de tâches en une transaction"""
+        outcomes = []
+        with self.queries.lock:
+            try:
+                self.conn.execute('BEGIN')
+                for job, future in batch:
+                    if not future.set_running_or_notify_cancel():
+                        continue
+                    self.conn.execute('SAVEPOINT job')
+                    try:
+                        outcomes.append((future, job(self.queries), None))
+                    except Exception as e:
+                        self.conn.execute('ROLLBACK TO job')
+                        outcomes.append((future, None, e))
+                    self.conn.execute('RELEASE job')
+                self.conn.commit()
+            except Exception as e:
+                if self.conn.in_transaction:
+                    self.conn.rollback()
+                print(f"Erreur lors de l'écriture en base: {e}")
+                outcomes = [(future, None, e) for _, future in batch if not future.cancelled()]
+
+        for future, result, error in outcomes:
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+
+    def close(self):
+        """Exécute les écritures restantes puis ferme la connexion"""
+        self.jobs.put(None)
+        self.thread.join()
+        self.conn.close()
@@ -0,0 +1,76 @@
+import pytest
+from quiz_answers import AnswerKey, canonical_answer, typo_tolerance, within_distance
+
+
+def levenshtein(first, second):
+    """Distance d'édition de référence (matrice complète)"""
+    previous = list(range(len(second) + 1))
+    for i, char in enumerate(first, 1):
+        current = [i]
+        for j, other in enumerate(second, 1):
+            current.append(min(previous[j - 1] + (char != other), previous[j] + 1, current[j - 1] + 1))
+        previous = current
+    return previous[-1]
+
+
+@pytest.mark.parametrize('first, second', [
+    ('', ''), ('', 'ab'), ('paris', 'paris'), ('paris', 'pairs'), ('kitten', 'sitting'),
+    ('napoleon', 'napoleom'), ('abc', 'xyz'), ('mediterranee', 'mediteranee'), ('a', 'ab'),
+    ('constantinople', 'konstantinopel'),
+])
+def test_within_distance_matches_full_levenshtein(first, second):
+    distance = levenshtein(first, second)
+    for limit in range(4):
+        assert within_distance(first, second, limit) == (distance <= limit)
+        assert within_distance(second, first, limit) == (distance <= limit)
+
+
+def test_canonical_answer():
+    assert canonical_answer('  La Tour Eiffel !') == 'tour eiffel'
+    assert canonical_answer('Élysée') == 'elysee'
+    # Un article seul n'est pas retiré
+    assert canonical_answer('Le') == 'le'
+
+
+def test_tolerance_by_length():
+    assert typo_tolerance('lyon') == 0
+    assert typo_tolerance('mexico') == 1
+    assert typo_tolerance('washington') == 2
+    assert typo_tolerance('apollo 11') == 0
+
+
+def test_choice_question_is_exact_up_to_case():
+    key = AnswerKey('Paris')
+    assert key.matches('Paris')
+    assert key.matches('PARIS')
+    assert not key.matches('Pari')
+    assert not key.matches('Paris ')
+
+
+@pytest.mark.parametrize('correct, answer', [
+    ('Paris', 'paris'),
+    ('La Tour Eiffel', 'tour eiffel'),
+    ('Léonard de Vinci', 'leonard de vinci'),
+    ('Napoléon', 'Napoleom'),                  # une faute à partir de 6 lettres
+    ('Washington', 'Wahsington'),              # deux fautes à partir de 10 lettres
+    ('Armstrong / Neil Armstrong', 'armstrong'),
+    ('Everest (mont)', 'everest'),
+])
+def test_open_question_accepts(correct, answer):
+    assert AnswerKey(correct, fuzzy=True).matches(answer)
+
+
+@pytest.mark.parametrize('correct, answer', [
+    # Autres lieux ou noms réels, pas des fautes de frappe
+    ('Iran', 'Iraq'),
+    ('Mali', 'Bali'),
+    ('Lyon', 'Leon'),
+    ('Mars', 'mais'),
+    ('Mexico', 'Texico'),                      # première lettre jamais corrigée
+    ('Napoléon', 'Napolionxx'),                # trois fautes
+    ('1789', '1788'),
+    ('Apollo 11', 'Apollo 12'),
+    ('Paris', ''),
+])
+def test_open_question_refuses(correct, answer):
+    assert not AnswerKey(correct, fuzzy=True).matches(answer)
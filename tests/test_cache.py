@@ -0,0 +1,124 @@
+import pytest
+from quiz_cache import QuestionCache
+from quiz_database import QuestionType
+
+
+def make_rows(theme_id, count, first_id, question_type=QuestionType.DUAL, used_count=0, cluster=None):
+    """Lignes comme theme_questions : used_count en position 9, groupe de doublons à la fin"""
+    return [(question_id, theme_id, question_type.value, 'Thème', f'Question {question_id}',
+             'Vrai', 'Faux', None, None, used_count, question_id if cluster is None else cluster)
+            for question_id in range(first_id, first_id + count)]
+
+
+class FakeBank:
+    def __init__(self, themes):
+        self.themes = themes
+        self.loads = []
+        self.flushed = []
+        self.fail = False
+
+    def load_theme(self, theme_id):
+        self.loads.append(theme_id)
+        return self.themes.get(theme_id, [])
+
+    def flush_usage(self, updates):
+        if self.fail:
+            raise OSError("base indisponible")
+        self.flushed.append(sorted(updates, key=lambda update: update[2]))
+
+
+def make_cache(bank, **options):
+    # Thread d'écriture non démarré : flush est appelé à la main
+    return QuestionCache(bank.load_theme, bank.flush_usage, **options)
+
+
+def test_theme_is_loaded_once():
+    bank = FakeBank({1: make_rows(1, 30, 1)})
+    cache = make_cache(bank)
+    for _ in range(5):
+        selected = cache.sample(1, {QuestionType.DUAL: 10})
+        assert len(selected[QuestionType.DUAL]) == 10
+    assert bank.loads == [1]
+
+
+def test_least_recently_used_theme_is_evicted():
+    bank = FakeBank({theme_id: make_rows(theme_id, 10, theme_id * 100) for theme_id in (1, 2, 3)})
+    cache = make_cache(bank, max_rows=25)
+    cache.get_theme(1)
+    cache.get_theme(2)
+    cache.get_theme(1)          # 1 redevient le plus récent
+    cache.get_theme(3)          # 30 lignes : le thème 2 est évincé
+    assert list(cache.themes) == [1, 3]
+    assert cache.cached_rows == 20
+    cache.get_theme(1)
+    cache.get_theme(2)
+    assert bank.loads == [1, 2, 3, 2]
+
+
+def test_empty_theme_is_not_cached():
+    bank = FakeBank({})
+    cache = make_cache(bank)
+    assert cache.sample(7, {QuestionType.OPEN: 5}) == {QuestionType.OPEN: []}
+    assert 7 not in cache.themes and cache.cached_rows == 0
+
+
+def test_large_theme_keeps_least_used_rows():
+    rows = make_rows(1, 10, 1, used_count=0) + make_rows(1, 30, 11, used_count=5)
+    cache = make_cache(FakeBank({1: rows}), max_rows=20)
+    entry = cache.get_theme(1)
+    assert entry.partial
+    assert len(entry.rows) == 10
+    assert set(entry.rows) == set(range(1, 11))
+
+
+def test_one_question_per_duplicate_cluster():
+    rows = make_rows(1, 6, 1, cluster=1) + make_rows(1, 4, 7)
+    cache = make_cache(FakeBank({1: rows}))
+    selected = cache.sample(1, {QuestionType.DUAL: 10})[QuestionType.DUAL]
+    clusters = [row[0] if row[0] >= 7 else 1 for row in selected]
+    assert len(selected) == 5 and len(set(clusters)) == 5
+
+
+def test_usage_is_written_behind_in_one_batch():
+    bank = FakeBank({1: make_rows(1, 5, 1)})
+    cache = make_cache(bank)
+    cache.record_usage([1, 2])
+    cache.record_usage([2, 3])
+    assert bank.flushed == []
+    cache.flush()
+    assert [(increment, question_id) for increment, _, question_id in bank.flushed[0]] == [(1, 1), (2, 2), (1, 3)]
+    assert all(last_used is not None for _, last_used, _ in bank.flushed[0])
+    # Rien à écrire : pas d'appel
+    cache.flush()
+    assert len(bank.flushed) == 1
+
+
+def test_failed_flush_keeps_counts_for_next_attempt():
+    bank = FakeBank({})
+    cache = make_cache(bank)
+    cache.record_usage([4, 4])
+    bank.fail = True
+    with pytest.raises(OSError):
+        cache.flush()
+    cache.record_usage([4])
+    bank.fail = False
+    cache.flush()
+    assert [(increment, question_id) for increment, _, question_id in bank.flushed[0]] == [(3, 4)]
+
+
+def test_pending_usage_counts_when_theme_is_reloaded():
+    bank = FakeBank({1: make_rows(1, 2, 1)})
+    cache = make_cache(bank)
+    cache.record_usage([1, 1, 1])
+    entry = cache.get_theme(1)
+    # La question 1 passe après la 2, bien que used_count soit 0 sur le disque
+    assert entry.samplers[QuestionType.DUAL.value].sample(1) == [2]
+
+
+def test_close_flushes_remaining_usage():
+    bank = FakeBank({})
+    cache = make_cache(bank)
+    cache.start()
+    cache.record_usage([9])
+    cache.close()
+    assert [(increment, question_id) for increment, _, question_id in bank.flushed[0]] == [(1, 9)]
@@ -0,0 +1,73 @@
+import pytest
+from quiz_serveur import QuizServer, initialize_test_data
+from quiz_storage import open_storage
+
+
+@pytest.fixture
+def server():
+    server = QuizServer(port=0, storage=open_storage('memoire'), state_directory=None)
+    initialize_test_data(server.db)
+    yield server
+    server.timers.close()
+    server.packs.close()
+    server.lifecycle.close()
+    server.journal.close()
+    server.db.close()
+    server.server_socket.close()
+
+
+def command(server, cmd_type, data, token=None):
+    return server.process_command({'type': cmd_type, 'data': data, 'token': token}, None)
+
+
+def start_game(server):
+    command(server, 'register', {'username': 'joueur', 'password': 'secret'})
+    token = command(server, 'login', {'username': 'joueur', 'password': 'secret'})['token']
+    response = command(server, 'start_game', {'theme_id': 1}, token)
+    assert response['status'] == 'success'
+    return token, response['game_id'], response['question']
+
+
+def submit(server, token, game_id, answer, question_index):
+    return command(server, 'submit_answer', {'game_id': game_id, 'answer': answer,
+                                             'question_index': question_index}, token)
+
+
+def test_repeated_answer_returns_recorded_result(server):
+    token, game_id, question = start_game(server)
+    first = submit(server, token, game_id, question[5], 0)
+    assert first['status'] == 'success' and first['is_correct'] and first['points'] > 0
+
+    # Même réponse renvoyée (reconnexion, doublon arrivé en retard)
+    again = submit(server, token, game_id, question[5], 0)
+    assert again['status'] == 'success'
+    assert not again['timed_out']
+    assert again['is_correct']
+    assert again['points'] == first['points']
+    assert again['time_taken'] == first['time_taken']
+    assert again['question_index'] == 1
+    # Le score n'est compté qu'une fois
+    assert server.active_games.get(game_id).score == first['points']
+
+
+def test_repeated_wrong_answer_stays_wrong(server):
+    token, game_id, _ = start_game(server)
+    first = submit(server, token, game_id, 'réponse sans rapport', 0)
+    assert not first['is_correct']
+    again = submit(server, token, game_id, 'réponse sans rapport', 0)
+    assert not again['is_correct'] and not again['timed_out']
+    assert again['points'] == first['points']
+
+
+def test_answer_after_timeout_is_reported_as_timed_out(server):
+    token, game_id, question = start_game(server)
+    server.question_timeout(game_id, 0)
+    late = submit(server, token, game_id, question[5], 0)
+    assert late['status'] == 'success'
+    assert late['timed_out'] and not late['is_correct'] and late['points'] == 0
+    assert server.active_games.get(game_id).score == 0
+
+
+def test_unknown_question_index(server):
+    token, game_id, _ = start_game(server)
+    assert submit(server, token, game_id, 'x', 5)['status'] == 'error'
@@ -0,0 +1,90 @@
+import sqlite3
+import pytest
+from quiz_migrations import MIGRATIONS, Backfill, Migration, get_schema_version, migrate
+
+
+class Interrupted(Exception):
+    pass
+
+
+def make_items(path, count=50):
+    conn = sqlite3.connect(path)
+    conn.execute('CREATE TABLE items (item_id INTEGER PRIMARY KEY, value INTEGER NOT NULL)')
+    conn.executemany('INSERT INTO items (item_id, value) VALUES (?, ?)',
+                     [(item_id, 0) for item_id in range(1, count + 1)])
+    conn.commit()
+    return conn
+
+
+def counting_migrations(calls, fail_at=None):
+    """Une migration : ajout d'une colonne, puis mise à jour par tranches de 10
+
+    Chaque tranche incrémente `value` : une tranche exécutée deux fois se voit.
+    La tranche commençant à `fail_at` s'interrompt après sa mise à jour.
+    """
+    def bump(conn, start, end):
+        calls.append(start)
+        conn.execute('UPDATE items SET value = value + 1 WHERE item_id >= ? AND item_id < ?', (start, end))
+        if start == fail_at:
+            raise Interrupted()
+
+    return [Migration(1, "Compteur", [
+        ['ALTER TABLE items ADD COLUMN flag INTEGER NOT NULL DEFAULT 0'],
+        Backfill('items', 'item_id', bump, chunk_size=10),
+        ['UPDATE items SET flag = 1'],
+    ])]
+
+
+def test_interrupted_backfill_resumes_after_last_chunk(tmp_path):
+    path = str(tmp_path / 'reprise.db')
+    conn = make_items(path)
+    calls = []
+    with pytest.raises(Interrupted):
+        migrate(conn, counting_migrations(calls, fail_at=21))
+    assert calls == [1, 11, 21]
+    assert get_schema_version(conn) == 0
+    # La tranche interrompue est annulée, les précédentes sont gardées
+    assert conn.execute('SELECT SUM(value) FROM items').fetchone()[0] == 20
+    assert conn.execute('SELECT steps_done, last_key FROM schema_migration_progress').fetchone() == (1, 21)
+    conn.close()
+
+    # Nouvelle connexion, comme après un redémarrage
+    conn = sqlite3.connect(path)
+    calls = []
+    assert migrate(conn, counting_migrations(calls)) == 1
+    # L'ajout de colonne n'est pas rejoué et chaque tranche n'est appliquée qu'une fois
+    assert calls == [21, 31, 41]
+    assert conn.execute('SELECT MIN(value), MAX(value), MIN(flag) FROM items').fetchone() == (1, 1, 1)
+    assert conn.execute('SELECT COUNT(*) FROM schema_migration_progress').fetchone()[0] == 0
+    # Base à jour : plus rien à faire
+    calls = []
+    assert migrate(conn, counting_migrations(calls)) == 1
+    assert calls == []
+    conn.close()
+
+
+def test_interrupted_simple_step_is_rolled_back(tmp_path):
+    path = str(tmp_path / 'etape.db')
+    conn = make_items(path, count=5)
+
+    def failing_step(conn):
+        conn.execute('UPDATE items SET value = 99')
+        raise Interrupted()
+
+    steps = [['UPDATE items SET value = 1'], failing_step]
+    with pytest.raises(Interrupted):
+        migrate(conn, [Migration(1, "Étapes", steps)])
+    assert conn.execute('SELECT MAX(value) FROM items').fetchone()[0] == 1
+    assert conn.execute('SELECT steps_done FROM schema_migration_progress').fetchone()[0] == 1
+
+    # La première étape n'est pas rejouée
+    steps = [['UPDATE items SET value = value + 1'], ['UPDATE items SET value = value * 10']]
+    assert migrate(conn, [Migration(1, "Étapes", steps)]) == 1
+    assert conn.execute('SELECT MAX(value) FROM items').fetchone()[0] == 10
+    conn.close()
+
+
+def test_full_schema_from_empty_database(tmp_path):
+    conn = sqlite3.connect(str(tmp_path / 'vide.db'))
+    assert migrate(conn) == max(migration.version for migration in MIGRATIONS)
+    conn.close()
@@ -0,0 +1,69 @@
+import pytest
+from quiz_storage import open_storage
+
+PLAYERS = 37
+
+
+@pytest.fixture(scope='module', params=['sqlite', 'memoire'])
+def scores(request, tmp_path_factory):
+    """Stockage rempli une fois par module (le hachage des mots de passe est lent)"""
+    if request.param == 'sqlite':
+        storage = open_storage('sqlite', str(tmp_path_factory.mktemp('scores') / 'scores.db'))
+    else:
+        storage = open_storage('memoire')
+    yield storage, fill_scores(storage)
+    storage.close()
+
+
+def fill_scores(storage):
+    """Un score par joueur, avec beaucoup d'ex aequo (même score et même temps)"""
+    theme_id = storage.get_or_create_theme('Pagination')
+    other_theme = storage.get_or_create_theme('Autre')
+    for number in range(PLAYERS):
+        username = f'joueur{number:02d}'
+        storage.add_user(username, 'secret')
+        user_id = storage.verify_user(username, 'secret')
+        storage.save_score(user_id, theme_id, (number % 4) * 10, 12.5 if number % 3 else 8.0)
+        storage.save_score(user_id, other_theme, number, 5.0)
+    if hasattr(storage, 'score_writer'):
+        storage.score_writer.flush()
+    return theme_id
+
+
+def read_pages(storage, theme_id, limit):
+    rows = []
+    cursor = None
+    pages = 0
+    while True:
+        page, cursor = storage.get_scores_page(theme_id, cursor, limit)
+        assert len(page) <= limit
+        rows.extend(page)
+        pages += 1
+        if cursor is None:
+            return rows, pages
+        assert len(page) == limit
+
+
+@pytest.mark.parametrize('limit', [1, 4, 5, 10, 36, 37, 100])
+def test_pages_have_no_duplicates_or_gaps(scores, limit):
+    storage, theme_id = scores
+    rows, pages = read_pages(storage, theme_id, limit)
+    # Chaque joueur exactement une fois, malgré les ex aequo aux limites de page
+    usernames = [row[0] for row in rows]
+    assert len(usernames) == PLAYERS
+    assert set(usernames) == {f'joueur{number:02d}' for number in range(PLAYERS)}
+    assert pages == max(1, -(-PLAYERS // limit))
+    # Du meilleur score au moins bon, puis du temps le plus court au plus long
+    keys = [(-row[2], row[3]) for row in rows]
+    assert keys == sorted(keys)
+    # Même ordre qu'une lecture en une seule page
+    single, cursor = storage.get_scores_page(theme_id, None, 100)
+    assert cursor is None
+    assert rows == single
+
+
+def test_all_themes_pages(scores):
+    storage, _ = scores
+    rows, _ = read_pages(storage, None, 7)
+    assert len(rows) == 2 * PLAYERS
+    assert len(set(rows)) == 2 * PLAYERS
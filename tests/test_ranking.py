@@ -0,0 +1,85 @@
+import random
+from quiz_database import MAX_RANK_NEIGHBOURS
+from quiz_ranking import RankIndex
+from quiz_storage import open_storage
+
+
+def reference_rank(best, user_id):
+    """Rang attendu : 1 + nombre de joueurs ayant un meilleur score strictement supérieur"""
+    return 1 + sum(1 for score in best.values() if score > best[user_id])
+
+
+def check_against_reference(index, best, theme_id):
+    ordered = sorted(best.values(), reverse=True)
+    for user_id, score in best.items():
+        rank, total, around = index.get(user_id, theme_id, count=3)
+        assert total == len(best)
+        assert rank == reference_rank(best, user_id)
+        # Rang donné par la liste triée : première position du score
+        assert rank == ordered.index(score) + 1
+        # Centile : part des joueurs classés strictement devant
+        assert (rank - 1) / total == sum(1 for value in ordered if value > score) / len(ordered)
+        # Voisins dans l'ordre du classement, le joueur lui-même au milieu
+        assert (rank, user_id, score) in around
+        assert [entry[2] for entry in around] == sorted((entry[2] for entry in around), reverse=True)
+        assert all(entry[0] == reference_rank(best, entry[1]) for entry in around)
+
+
+def test_rank_matches_sorted_list():
+    rng = random.Random(7)
+    index = RankIndex()
+    best = {}
+    rows = []
+    for user_id in range(1, 201):
+        score = rng.randint(0, 60)
+        best[user_id] = score
+        rows.append((user_id, 1, score))
+    index.load(rows)
+    check_against_reference(index, best, 1)
+
+
+def test_updates_keep_ranks_consistent():
+    rng = random.Random(11)
+    index = RankIndex()
+    best_theme = {}
+    best_all = {}
+    for _ in range(2000):
+        user_id = rng.randint(1, 150)
+        # Quelques scores au-delà de la taille initiale de l'arbre (agrandissement)
+        score = rng.randint(0, 400)
+        index.add_score(user_id, 2, score)
+        best_theme[user_id] = max(score, best_theme.get(user_id, -1))
+        best_all[user_id] = max(score, best_all.get(user_id, -1))
+    check_against_reference(index, best_theme, 2)
+    check_against_reference(index, best_all, 0)
+
+
+def test_lower_score_does_not_change_rank():
+    index = RankIndex()
+    index.add_score(1, 1, 50)
+    index.add_score(2, 1, 40)
+    index.add_score(2, 1, 10)
+    assert index.get(2, 1)[:2] == (2, 2)
+    index.add_score(2, 1, 60)
+    assert index.get(2, 1)[:2] == (1, 2)
+    assert index.get(1, 1)[:2] == (2, 2)
+
+
+def test_unknown_player_or_theme():
+    index = RankIndex()
+    assert index.get(1, 5) == (None, 0, [])
+    index.add_score(1, 1, 10)
+    rank, total, around = index.get(99, 1)
+    assert rank is None and total == 1 and around == []
+
+
+def test_neighbour_count_is_capped():
+    storage = open_storage('memoire')
+    try:
+        for user_id in range(1, 80):
+            storage.rank_index.add_score(user_id, 1, user_id)
+        around = storage.get_user_rank(40, 1, count=10 ** 6)['around']
+        assert len(around) == 2 * MAX_RANK_NEIGHBOURS + 1
+        assert storage.get_user_rank(40, 1, count=-3)['around'] == [(40, None, 40)]
+    finally:
+        storage.close()
@@ -0,0 +1,85 @@
+import json
+import time
+from quiz_recovery import STATE_KINDS, StateJournal
+
+
+def wait_for(journal, sequence):
+    """Attend que le thread ait écrit les `sequence` premières modifications"""
+    deadline = time.monotonic() + 5
+    while journal.sequence < sequence and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert journal.sequence >= sequence
+
+
+def test_snapshot_and_log_are_replayed_after_a_crash(tmp_path):
+    directory = str(tmp_path)
+    first = StateJournal(directory, snapshot_interval=3600, flush_interval=0.01)
+    first.restore()
+    first.start()
+    first.set('games', 'partie_1', {'score': 0, 'answers': []})
+    first.set('rooms', 1234, {'status': 'waiting'})
+    first.close()    # Arrêt normal : tout est dans state.json
+
+    second = StateJournal(directory, snapshot_interval=3600, flush_interval=0.01)
+    state = second.restore()
+    assert state['games'] == {'partie_1': {'score': 0, 'answers': []}}
+    second.start()
+    second.update('games', 'partie_1', {'score': 5}, {'answers': [0, 5]})
+    second.set('sessions', 'jeton', {'user_id': 3})
+    second.delete('rooms', 1234)
+    second.update('games', 'inconnue', {'score': 1})
+    wait_for(second, second.snapshot_sequence + 4)
+    try:
+        # Arrêt brutal : pas de close, les dernières modifications ne sont que dans le journal
+        with open(tmp_path / 'state.log', encoding='utf-8') as log:
+            assert len(log.readlines()) == 4
+        state = StateJournal(directory).restore()
+    finally:
+        second.close()
+    assert state['games'] == {'partie_1': {'score': 5, 'answers': [[0, 5]]}}
+    assert state['rooms'] == {}
+    assert state['sessions'] == {'jeton': {'user_id': 3}}
+    assert set(state) == set(STATE_KINDS)
+
+
+def test_incomplete_last_line_is_ignored(tmp_path):
+    changes = [(1, ['set', 'games', 'a', {'score': 1}]), (2, ['set', 'games', 'b', {'score': 2}])]
+    with open(tmp_path / 'state.log', 'w', encoding='utf-8') as log:
+        for sequence, change in changes:
+            log.write(f"{sequence} {json.dumps(change)}\n")
+        log.write('3 ["set","games","c",{"sco')
+    journal = StateJournal(str(tmp_path))
+    state = journal.restore()
+    assert state['games'] == {'a': {'score': 1}, 'b': {'score': 2}}
+    assert journal.sequence == 2
+    # Compacté : le journal est vide, l'instantané contient tout
+    assert (tmp_path / 'state.log').read_text() == ''
+    assert json.loads((tmp_path / 'state.json').read_text())['sequence'] == 2
+
+
+def test_log_lines_already_in_snapshot_are_skipped(tmp_path):
+    snapshot = {'sequence': 5, 'state': {'games': {'a': {'score': 10, 'answers': [1]}}}}
+    (tmp_path / 'state.json').write_text(json.dumps(snapshot), encoding='utf-8')
+    with open(tmp_path / 'state.log', 'w', encoding='utf-8') as log:
+        # Ligne 5 déjà comprise dans l'instantané : la rejouer ajouterait une réponse
+        log.write('5 ' + json.dumps(['update', 'games', 'a', {}, {'answers': 1}]) + '\n')
+        log.write('6 ' + json.dumps(['update', 'games', 'a', {'score': 12}, {'answers': 2}]) + '\n')
+    journal = StateJournal(str(tmp_path))
+    assert journal.restore()['games'] == {'a': {'score': 12, 'answers': [1, 2]}}
+    assert journal.sequence == 6
+
+
+def test_restore_returns_a_copy(tmp_path):
+    journal = StateJournal(str(tmp_path))
+    state = journal.restore()
+    state['games']['modifiée'] = {}
+    assert journal.state['games'] == {}
+
+
+def test_no_directory_saves_nothing():
+    journal = StateJournal(None)
+    journal.start()
+    journal.set('games', 'a', {'score': 1})
+    journal.close()
+    assert journal.restore() == {kind: {} for kind in STATE_KINDS}
+    assert journal.queue.empty()
@@ -0,0 +1,57 @@
+from collections import Counter
+from quiz_sampler import UsageSampler
+
+
+def test_least_used_questions_come_first():
+    sampler = UsageSampler([(1, 5), (2, 0), (3, 2), (4, 0), (5, 9), (6, 2)])
+    assert set(sampler.sample(2)) == {2, 4}
+    # Les deux questions tirées sont passées au niveau 1 : le niveau 1 vient ensuite
+    assert set(sampler.sample(2)) == {2, 4}
+    # Tous au niveau 2 maintenant, avant 1 (5) et 5 (9)
+    assert set(sampler.sample(3)) <= {2, 3, 4, 6}
+
+
+def test_sample_crosses_levels_in_order():
+    selected = UsageSampler([(1, 3), (2, 0), (3, 1), (4, 7)]).sample(3)
+    assert set(selected) == {1, 2, 3}
+    assert selected.index(2) < selected.index(3) < selected.index(1)
+
+
+def test_counts_are_incremented():
+    sampler = UsageSampler([(1, 0), (2, 0), (3, 4)])
+    sampler.sample(2)
+    assert sampler.positions[1][0] == 1 and sampler.positions[2][0] == 1
+    assert sampler.positions[3][0] == 4
+    assert sampler.levels == [1, 4]
+
+
+def test_repeated_draws_stay_balanced():
+    sampler = UsageSampler([(question_id, 0) for question_id in range(20)])
+    drawn = Counter()
+    for _ in range(50):
+        drawn.update(sampler.sample(4))
+    # 200 tirages sur 20 questions : chacune exactement 10 fois
+    assert set(drawn.values()) == {10}
+
+
+def test_accept_can_refuse_candidates():
+    sampler = UsageSampler([(question_id, 0) for question_id in range(10)])
+    selected = sampler.sample(3, accept=lambda question_id: question_id % 2 == 0)
+    assert len(selected) == 3 and all(question_id % 2 == 0 for question_id in selected)
+    # Les questions refusées ne sont pas comptées comme utilisées
+    assert all(sampler.positions[question_id][0] == 0 for question_id in range(1, 10, 2))
+
+
+def test_small_bank_returns_everything():
+    sampler = UsageSampler([(1, 0), (2, 3)])
+    assert sorted(sampler.sample(10)) == [1, 2]
+    assert UsageSampler().sample(3) == []
+
+
+def test_remove_keeps_positions_consistent():
+    sampler = UsageSampler([(question_id, 0) for question_id in range(5)])
+    sampler.remove(0)
+    sampler.remove(3)
+    assert len(sampler) == 3 and 0 not in sampler
+    for question_id, (used_count, index) in sampler.positions.items():
+        assert sampler.buckets[used_count][index] == question_id
@@ -0,0 +1,90 @@
+import threading
+import time
+import pytest
+from quiz_score_writer import ScoreWriter
+
+
+class Recorder:
+    def __init__(self):
+        self.batches = []
+        self.written = threading.Event()
+        self.fail = False
+
+    def write_batch(self, batch):
+        if self.fail:
+            raise OSError("base indisponible")
+        self.batches.append(list(batch))
+        self.written.set()
+
+
+def score(number):
+    return (number, 1, number * 10, 12.5, None)
+
+
+def test_full_batch_is_written_in_one_call():
+    recorder = Recorder()
+    writer = ScoreWriter(recorder.write_batch, batch_size=5, flush_interval=60)
+    try:
+        for number in range(5):
+            writer.add(*score(number)[:4])
+        assert recorder.written.wait(2)
+        assert recorder.batches == [[score(number) for number in range(5)]]
+    finally:
+        writer.close()
+
+
+def test_partial_batch_waits_for_the_interval():
+    recorder = Recorder()
+    writer = ScoreWriter(recorder.write_batch, batch_size=50, flush_interval=0.2)
+    try:
+        added = time.monotonic()
+        writer.add(1, 1, 10, 3.0)
+        writer.add(2, 1, 20, 4.0)
+        time.sleep(0.05)
+        assert recorder.batches == []
+        assert recorder.written.wait(2)
+        assert time.monotonic() - added >= 0.2
+        assert recorder.batches == [[(1, 1, 10, 3.0, None), (2, 1, 20, 4.0, None)]]
+    finally:
+        writer.close()
+
+
+def test_close_writes_remaining_scores():
+    recorder = Recorder()
+    writer = ScoreWriter(recorder.write_batch, batch_size=50, flush_interval=60)
+    writer.add(1, 2, 30, 5.0, answers=[(0, 5)])
+    writer.add(2, 2, 40, 6.0)
+    writer.close()
+    assert recorder.batches == [[(1, 2, 30, 5.0, [(0, 5)]), (2, 2, 40, 6.0, None)]]
+
+
+def test_max_pending_writes_from_add():
+    recorder = Recorder()
+    writer = ScoreWriter(recorder.write_batch, batch_size=1000, flush_interval=60, max_pending=3)
+    try:
+        for number in range(3):
+            writer.add(*score(number)[:4])
+        # Écrit par add lui-même, sans attendre le thread
+        assert recorder.batches == [[score(number) for number in range(3)]]
+    finally:
+        writer.close()
+
+
+def test_failed_batch_is_kept_in_order():
+    recorder = Recorder()
+    writer = ScoreWriter(recorder.write_batch, batch_size=1000, flush_interval=60)
+    writer.add(1, 1, 10, 1.0)
+    recorder.fail = True
+    with pytest.raises(OSError):
+        writer.flush()
+    writer.add(2, 1, 20, 2.0)
+    recorder.fail = False
+    writer.close()
+    assert recorder.batches == [[(1, 1, 10, 1.0, None), (2, 1, 20, 2.0, None)]]
+
+
+def test_add_after_close_is_refused():
+    writer = ScoreWriter(Recorder().write_batch)
+    writer.close()
+    with pytest.raises(RuntimeError):
+        writer.add(1, 1, 10, 1.0)
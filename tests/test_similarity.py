@@ -0,0 +1,76 @@
+import pytest
+from quiz_database import QuestionType
+from quiz_similarity import QuestionFeatures, estimated_similarity, normalize_text
+from quiz_storage import open_storage
+
+QUESTION = 'Quelle est la capitale de la France métropolitaine ?'
+
+
+@pytest.fixture(params=['sqlite', 'memoire'])
+def storage(request, tmp_path):
+    if request.param == 'sqlite':
+        storage = open_storage('sqlite', str(tmp_path / 'doublons.db'))
+    else:
+        storage = open_storage('memoire')
+    yield storage
+    storage.close()
+
+
+def clusters(storage, theme_id):
+    """question_text -> groupe de doublons"""
+    return {row[4]: row[-1] for row in storage.load_theme_questions(theme_id)}
+
+
+def test_normalize_text():
+    assert normalize_text("  L'Été, à PARIS !") == 'l ete a paris'
+    assert normalize_text(None) == ''
+
+
+def test_features_ignore_case_accents_and_punctuation():
+    first = QuestionFeatures(1, QUESTION, 'Paris')
+    second = QuestionFeatures(1, 'quelle est la CAPITALE de la france metropolitaine', 'paris.')
+    assert first.fingerprint == second.fingerprint
+    assert estimated_similarity(first.signature, second.signature) == 1.0
+    # Même texte dans un autre thème : autres seaux
+    assert set(QuestionFeatures(2, QUESTION, 'Paris').buckets).isdisjoint(first.buckets)
+
+
+def test_exact_duplicate_is_not_inserted(storage):
+    theme_id = storage.get_or_create_theme('Géographie')
+    rows = [(theme_id, QuestionType.OPEN, QUESTION, 'Paris', None),
+            (theme_id, QuestionType.OPEN, 'quelle est la CAPITALE de la france metropolitaine', 'paris', None)]
+    assert storage.add_questions(rows) == 1
+    # Déjà en base : ignorée aussi lors d'un ajout suivant
+    assert storage.add_questions(rows[:1]) == 0
+    assert len(storage.load_theme_questions(theme_id)) == 1
+
+
+def test_near_duplicate_joins_the_cluster(storage):
+    theme_id = storage.get_or_create_theme('Géographie')
+    storage.add_questions([(theme_id, QuestionType.OPEN, QUESTION, 'Paris', None),
+                           (theme_id, QuestionType.OPEN, 'Quel fleuve traverse la ville de Lyon ?', 'Le Rhône', None)])
+    storage.add_questions([(theme_id, QuestionType.OPEN, 'Quelle est la capitale de la France métropolitaine', 'Paris (75)', None)])
+    groups = clusters(storage, theme_id)
+    assert len(groups) == 3
+    assert groups['Quelle est la capitale de la France métropolitaine'] == groups[QUESTION]
+    assert groups['Quel fleuve traverse la ville de Lyon ?'] != groups[QUESTION]
+
+
+def test_same_question_in_another_theme_is_kept(storage):
+    first = storage.get_or_create_theme('Géographie')
+    second = storage.get_or_create_theme('Culture générale')
+    row = (QuestionType.OPEN, QUESTION, 'Paris', None)
+    assert storage.add_questions([(first,) + row, (second,) + row]) == 2
+
+
+def test_game_never_gets_two_questions_of_a_cluster(storage):
+    theme_id = storage.get_or_create_theme('Géographie')
+    rows = [(theme_id, QuestionType.DUAL, f'{QUESTION} Réponse attendue numéro {suffix}', 'Vrai', ['Faux'])
+            for suffix in 'ABCDEFGH']
+    rows.append((theme_id, QuestionType.DUAL, 'Le Rhône traverse-t-il la ville de Lyon ?', 'Vrai', ['Faux']))
+    storage.add_questions(rows)
+    groups = clusters(storage, theme_id)
+    assert len(set(groups.values())) < len(rows)
+    selected = storage.get_questions_for_game(theme_id)[QuestionType.DUAL]
+    assert len(selected) == len(set(groups.values()))
+    assert len({groups[row[4]] for row in selected}) == len(selected)
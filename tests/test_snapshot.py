@@ -0,0 +1,47 @@
+import time
+import pytest
+from quiz_database import QuestionType, QuizDatabase
+
+
+@pytest.fixture
+def db(tmp_path):
+    # Pas de renouvellement automatique pendant le test : il est déclenché à la main
+    db = QuizDatabase(str(tmp_path / 'copie.db'),
+                      read_snapshot={'refresh_interval': 3600, 'refresh_after_writes': 1000})
+    yield db
+    db.close()
+
+
+def test_snapshot_copies_only_leaderboard_tables(db):
+    tables = {name for (name,) in db.snapshot.runner.conn.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%'")}
+    assert tables == {'users', 'themes', 'score_rollups', 'user_stats'}
+
+
+def test_usage_writes_do_not_make_the_snapshot_stale(db):
+    theme_id = db.get_or_create_theme('Copie')
+    db.add_questions([(theme_id, QuestionType.OPEN, 'Capitale de la France ?', 'Paris', None)])
+    db.snapshot.refresh()
+    writes = db.snapshot.writes
+    question_id = db.load_theme_questions(theme_id)[0][0]
+    db.apply_usage_updates([(1, '2024-01-01 00:00:00', question_id)])
+    assert db.snapshot.writes == writes
+    assert db.snapshot.is_current()
+
+
+def test_score_makes_the_snapshot_stale(db):
+    db.add_user('joueur', 'secret')
+    user_id = db.verify_user('joueur', 'secret')
+    theme_id = db.get_or_create_theme('Copie')
+    db.snapshot.refresh()
+    db.save_score(user_id, theme_id, 30, 12.0)
+    db.score_writer.flush()
+    # Le compteur est mis à jour par le rappel du Future, juste après le commit
+    deadline = time.monotonic() + 2
+    while db.snapshot.writes == 0 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert db.snapshot.writes == 1
+    assert not db.snapshot.is_current()
+    db.snapshot.refresh()
+    assert db.snapshot.is_current()
+    assert db.snapshot.fetchall('user_stats', (user_id,))
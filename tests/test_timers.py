@@ -0,0 +1,64 @@
+import threading
+import time
+from quiz_timers import TimerWheel
+
+
+def test_deadline_fires_at_its_step():
+    wheel = TimerWheel(lambda key, payload: None, tick=0.05, slots=8)
+    wheel.schedule('partie', 0.2, 'donnée')
+    assert len(wheel) == 1
+    # Rien avant l'échéance
+    time.sleep(0.1)
+    assert wheel.advance() == []
+    # Au plus un pas après l'échéance
+    time.sleep(0.2)
+    assert wheel.advance() == [('partie', 'donnée')]
+    assert len(wheel) == 0
+
+
+def test_deadline_beyond_one_turn_waits_for_its_turn():
+    # 4 cases de 0,05 s : un tour dure 0,2 s, l'échéance tombe au tour suivant
+    wheel = TimerWheel(lambda key, payload: None, tick=0.05, slots=4)
+    wheel.schedule('loin', 0.3)
+    time.sleep(0.22)
+    assert wheel.advance() == []
+    time.sleep(0.18)
+    assert wheel.advance() == [('loin', None)]
+
+
+def test_cancel_and_reschedule():
+    wheel = TimerWheel(lambda key, payload: None, tick=0.05, slots=8)
+    wheel.schedule('annulée', 0.1)
+    wheel.schedule('reportée', 0.1, 1)
+    wheel.cancel('annulée')
+    wheel.cancel('inconnue')
+    # Reprogrammer remplace l'échéance précédente
+    wheel.schedule('reportée', 0.3, 2)
+    assert len(wheel) == 1
+    time.sleep(0.15)
+    assert wheel.advance() == []
+    time.sleep(0.25)
+    assert wheel.advance() == [('reportée', 2)]
+
+
+def test_thread_calls_on_expire():
+    fired = []
+    done = threading.Event()
+
+    def on_expire(key, payload):
+        fired.append((key, payload, time.monotonic()))
+        done.set()
+
+    wheel = TimerWheel(on_expire, tick=0.02)
+    wheel.start()
+    try:
+        scheduled = time.monotonic()
+        wheel.schedule('question', 0.1, 3)
+        wheel.schedule('annulée', 0.05)
+        wheel.cancel('annulée')
+        assert done.wait(2)
+    finally:
+        wheel.close()
+    assert [(key, payload) for key, payload, _ in fired] == [('question', 3)]
+    # Jamais avant l'échéance, au plus un pas (et un peu de marge) après
+    assert 0.1 <= fired[0][2] - scheduled < 0.1 + 0.02 + 0.2